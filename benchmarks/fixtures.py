@@ -0,0 +1,155 @@
+"""
+Tushare/AKShare接口的录制与回放
+
+- record模式：调用真实接口，并把每次调用的返回值按(接口名, 参数)保存到fixture目录
+- replay模式：完全离线，优先返回已录制的数据，未录制的调用由SyntheticMarket按种子生成
+
+通过 offline_apis() 上下文管理器替换 tushare.pro_api 以及 akshare 中被
+DataLoader、FutureDataLoader、ETFDividendHandler、get_sentiment_data、
+RealtimeSnapshotProvider 使用的函数。
+"""
+
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from types import SimpleNamespace
+import pandas as pd
+from loguru import logger
+from benchmarks.synthetic import SyntheticMarket
+
+# 需要替换的AKShare函数 -> SyntheticMarket中的生成方法
+AKSHARE_FUNCS = {
+    'fund_etf_hist_em': 'akshare_daily',
+    'stock_hk_daily': 'akshare_daily',
+    'stock_individual_spot_xq': 'spot_xq',
+    'stock_zh_a_spot_em': 'spot_em_stock',
+    'fund_etf_spot_em': 'spot_em_etf',
+    'stock_zh_index_spot_em': 'spot_em_index',
+}
+
+# Tushare pro接口 -> SyntheticMarket中的生成方法
+TUSHARE_FUNCS = {
+    'daily': 'tushare_daily',
+    'fund_daily': 'tushare_daily',
+    'index_daily': 'tushare_daily',
+    'trade_cal': 'trade_cal',
+    'stock_basic': 'stock_basic',
+    'index_weight': 'index_weight',
+    'fund_div': 'fund_div',
+    'fut_basic': 'fut_basic',
+    'fut_daily': 'fut_daily',
+}
+
+
+class FixtureStore:
+    """按(来源, 接口名, 参数)存取录制结果的目录"""
+
+    def __init__(self, fixture_dir):
+        self.fixture_dir = fixture_dir
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, source, name, args, kwargs):
+        key = json.dumps({'args': [str(a) for a in args],
+                          'kwargs': {k: str(v) for k, v in sorted(kwargs.items()) if k != 'token'}},
+                         ensure_ascii=False, sort_keys=True)
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.fixture_dir, source, name, f"{digest}.pkl")
+
+    def load(self, source, name, args, kwargs):
+        path = self._path(source, name, args, kwargs)
+        if os.path.exists(path):
+            self.hits += 1
+            return pd.read_pickle(path)
+        self.misses += 1
+        return None
+
+    def save(self, source, name, args, kwargs, result):
+        path = self._path(source, name, args, kwargs)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pd.to_pickle(result, path)
+
+
+class ReplayApi:
+    """Tushare pro_api / akshare的替身：回放录制数据，或调用真实接口并录制"""
+
+    def __init__(self, source, funcs, store, market, real=None, record=False):
+        self._source = source
+        self._funcs = funcs
+        self._store = store
+        self._market = market
+        self._real = real
+        self._record = record
+        self.calls = {}  # 接口名 -> 调用次数
+
+    def query(self, api_name, fields='', **kwargs):
+        """兼容 pro.query('daily', ...) 的调用方式"""
+        if fields:
+            kwargs['fields'] = fields
+        return getattr(self, api_name)(**kwargs)
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name not in self._funcs:
+            raise AttributeError(name)
+
+        def call(*args, **kwargs):
+            self.calls[name] = self.calls.get(name, 0) + 1
+            if self._record:
+                result = getattr(self._real, name)(*args, **kwargs)
+                self._store.save(self._source, name, args, kwargs, result)
+                return result
+            result = self._store.load(self._source, name, args, kwargs)
+            if result is None:
+                result = getattr(self._market, self._funcs[name])(*args, **kwargs)
+            return result
+
+        return call
+
+
+@contextmanager
+def offline_apis(mode='replay', fixture_dir='benchmarks/fixtures', seed=42):
+    """在上下文中把tushare/akshare替换为录制或回放的替身
+
+    Args:
+        mode: 'replay' 离线回放（默认），'record' 调用真实接口并录制
+        fixture_dir: 录制数据目录
+        seed: 合成数据的随机种子
+    Yields:
+        dict: {'tushare': ReplayApi, 'akshare': ReplayApi, 'store': FixtureStore}
+    """
+    import tushare as ts
+    import akshare as ak
+
+    record = mode == 'record'
+    store = FixtureStore(fixture_dir)
+    market = SyntheticMarket(seed=seed)
+
+    saved_ts = {'pro_api': ts.pro_api, 'set_token': ts.set_token}
+    saved_ak = {name: getattr(ak, name, None) for name in AKSHARE_FUNCS}
+
+    real_pro = ts.pro_api() if record else None
+    pro = ReplayApi('tushare', TUSHARE_FUNCS, store, market, real=real_pro, record=record)
+    akshare = ReplayApi('akshare', AKSHARE_FUNCS, store, market, real=SimpleNamespace(**saved_ak), record=record)
+    saved_token = os.environ.get('TUSHARE_TOKEN')
+
+    ts.pro_api = lambda *args, **kwargs: pro
+    if not record:
+        ts.set_token = lambda token: None
+        os.environ.setdefault('TUSHARE_TOKEN', 'offline')
+    for name in AKSHARE_FUNCS:
+        setattr(ak, name, getattr(akshare, name))
+    logger.info(f"已切换到{mode}模式的离线接口 - 录制目录: {fixture_dir}, 种子: {seed}")
+
+    try:
+        yield {'tushare': pro, 'akshare': akshare, 'store': store}
+    finally:
+        for name, func in saved_ts.items():
+            setattr(ts, name, func)
+        for name, func in saved_ak.items():
+            if func is not None:
+                setattr(ak, name, func)
+        if saved_token is None:
+            os.environ.pop('TUSHARE_TOKEN', None)
+        else:
+            os.environ['TUSHARE_TOKEN'] = saved_token
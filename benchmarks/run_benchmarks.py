@@ -0,0 +1,304 @@
+"""
+离线性能基准测试
+
+在录制/合成的行情数据上对各策略回测、市场情绪计算、ETFTradingEnv.step
+以及成分股批量回测筛选计时，结果以JSON输出，便于跟踪性能回归。
+
+用法（在仓库根目录执行）:
+    python -m benchmarks.run_benchmarks
+    python -m benchmarks.run_benchmarks --only strategy:双均线策略 env_step --repeat 5
+    python -m benchmarks.run_benchmarks --mode record   # 调用真实接口并录制fixture
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks.fixtures import offline_apis
+from benchmarks.synthetic import SyntheticMarket
+
+# 回测基准使用的ETF
+ETF_CODE = '510050.SH'
+HEDGE_ETF_CODE = '159985.SZ'
+ROTATION_ETFS = ['510050.SH', '510300.SH', '510500.SH', '159915.SZ', '512880.SH']
+
+
+def _timed(func, repeat):
+    """重复执行func，返回每次耗时(秒)列表和最后一次的返回值"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def _summary(timings, **extra):
+    summary = {
+        'repeat': len(timings),
+        'min_s': min(timings),
+        'median_s': float(np.median(timings)),
+        'max_s': max(timings),
+    }
+    summary.update(extra)
+    return summary
+
+
+def _download(code, start_date, end_date):
+    from src.data.data_loader import DataLoader
+    return DataLoader(tushare_token=os.environ['TUSHARE_TOKEN']).download_data(code, start_date, end_date)
+
+
+def _load_strategy_data(name, start_date, end_date):
+    """按策略加载回测数据源"""
+    if name == 'ETF轮动策略':
+        return _download(ROTATION_ETFS, start_date, end_date)
+    if name == '双均线对冲策略':
+        from src.data.future_data_loader import FutureDataLoader
+        etf_data = _download(HEDGE_ETF_CODE, start_date, end_date)
+        future_data = FutureDataLoader(start_date=start_date, end_date=end_date,
+                                       token=os.environ['TUSHARE_TOKEN']).load()
+        return [etf_data, future_data]
+    return _download(ETF_CODE, start_date, end_date)
+
+
+def bench_strategy(name, args, apis):
+    """单个策略：数据加载与BacktestEngine.run分别计时"""
+    from src.strategies.strategy_factory import StrategyFactory
+    from src.utils.backtest_engine import BacktestEngine
+
+    strategy_class = StrategyFactory.get_strategy(name)
+    load_timings, run_timings = [], []
+    bars = 0
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        data = _load_strategy_data(name, args.start_date, args.end_date)
+        load_timings.append(time.perf_counter() - start)
+
+        engine = BacktestEngine(strategy_class, data, cash=args.cash)
+        start = time.perf_counter()
+        engine.run()
+        run_timings.append(time.perf_counter() - start)
+        bars = len(engine.strategy.data)
+    return {
+        'load': _summary(load_timings),
+        'run': _summary(run_timings, bars=bars, bars_per_s=bars / min(run_timings)),
+    }
+
+
+def bench_sentiment(args, apis):
+    """市场情绪计算（冷缓存）"""
+    from src.strategies.market_sentiment.sentiment_data import get_sentiment_data
+
+    def run():
+        if os.path.exists('cache/sentiment_data.json'):
+            os.remove('cache/sentiment_data.json')
+        return get_sentiment_data(start_date=args.start_date, end_date=args.end_date)
+
+    timings, result = _timed(run, args.repeat)
+    days = len(result['sentiment']) if result else 0
+    return _summary(timings, days=days)
+
+
+def _env_frame(num_tickers, num_days, tech_indicators, seed):
+    """构造ETFTradingEnv需要的长表：索引为日期，包含tic、OHLC和技术指标列"""
+    market = SyntheticMarket(seed=seed)
+    days = market.trade_days[:num_days]
+    frames = []
+    rng = np.random.default_rng(seed)
+    for i in range(num_tickers):
+        df = market.ohlcv(f"ETF{i:03d}", days[0], days[-1])[['open', 'high', 'low', 'close']]
+        for tech in tech_indicators:
+            df[tech] = rng.normal(size=len(df))
+        df['tic'] = f"ETF{i:03d}"
+        frames.append(df)
+    return pd.concat(frames).sort_index(kind='stable')
+
+
+def _import_env():
+    """导入ETFTradingEnv
+
+    rl_model_finrl包内使用src.strategies.rl_model_finrl的导入路径，
+    当包位于仓库根目录时直接按文件路径加载etf_env模块。
+    """
+    import importlib
+    import importlib.util
+    try:
+        return importlib.import_module('src.strategies.rl_model_finrl.applications.stock_trading.etf_env').ETFTradingEnv
+    except ImportError:
+        path = os.path.join(ROOT, 'rl_model_finrl', 'applications', 'stock_trading', 'etf_env.py')
+        spec = importlib.util.spec_from_file_location('etf_env', path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module.ETFTradingEnv
+
+
+def bench_env_step(args, apis):
+    """ETFTradingEnv.step吞吐量"""
+    ETFTradingEnv = _import_env()
+    tech_indicators = ['macd', 'rsi_30', 'cci_30', 'close_30_sma']
+    df = _env_frame(args.env_tickers, args.env_days, tech_indicators, args.seed)
+    env = ETFTradingEnv(df=df, stock_dim=args.env_tickers, tech_indicator_list=tech_indicators,
+                        initial_amount=1e6, reward_type='daily_return')
+    rng = np.random.default_rng(args.seed)
+
+    def run():
+        env.reset()
+        steps = 0
+        done = False
+        while not done and steps < args.env_steps:
+            _, _, done, _ = env.step(rng.uniform(-1, 1, args.env_tickers))
+            steps += 1
+        return steps
+
+    timings, steps = _timed(run, args.repeat)
+    return _summary(timings, steps=steps, tickers=args.env_tickers, steps_per_s=steps / min(timings))
+
+
+def bench_screening(args, apis):
+    """成分股批量回测筛选吞吐量（与ui/pages/backtest.screen_index_stocks相同的逐只回测流程）"""
+    from src.strategies.strategy_factory import StrategyFactory
+    from src.utils.backtest_engine import BacktestEngine
+    from src.strategies.market_sentiment.dividend_store import DividendStore
+
+    pro = apis['tushare']
+    weights = pro.index_weight(index_code='000016.SH',
+                               start_date=(args.end_date - pd.Timedelta(days=40)).strftime('%Y%m%d'),
+                               end_date=args.end_date.strftime('%Y%m%d'))
+    latest = weights[weights['trade_date'] == weights['trade_date'].max()]
+    symbols = latest['con_code'].tolist()[:args.screen_size]
+    strategy_class = StrategyFactory.get_strategy('市场情绪策略')
+
+    def run():
+        DividendStore.shared().prefetch(symbols, args.start_date, args.end_date)
+        for symbol in symbols:
+            data = _download(symbol, args.start_date, args.end_date)
+            if data is None:
+                continue
+            BacktestEngine(strategy_class, data, cash=args.cash).run()
+        return len(symbols)
+
+    timings, count = _timed(run, args.repeat)
+    return _summary(timings, symbols=count, symbols_per_s=count / min(timings))
+
+
+def _benchmarks():
+    from src.strategies.strategy_factory import StrategyFactory
+    benches = {f"strategy:{name}": (lambda args, apis, name=name: bench_strategy(name, args, apis))
+               for name in StrategyFactory.get_strategy_names()}
+    benches.update({
+        'sentiment': bench_sentiment,
+        'env_step': bench_env_step,
+        'screening': bench_screening,
+    })
+    return benches
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="离线性能基准测试")
+    parser.add_argument('--mode', choices=['replay', 'record'], default='replay', help="回放录制数据或调用真实接口录制")
+    parser.add_argument('--fixture-dir', default=os.path.join(ROOT, 'benchmarks', 'fixtures'), help="录制数据目录")
+    parser.add_argument('--output', default=None, help="结果JSON路径，默认为benchmarks/results/bench_<时间>.json")
+    parser.add_argument('--workdir', default=None, help="运行目录（cache/logs写入此处），默认使用临时目录")
+    parser.add_argument('--only', nargs='*', default=None, help="只运行指定的基准，如 strategy:双均线策略 env_step")
+    parser.add_argument('--seed', type=int, default=42, help="合成数据随机种子")
+    parser.add_argument('--repeat', type=int, default=3, help="每项重复次数")
+    parser.add_argument('--start-date', default='2021-01-04', help="回测开始日期")
+    parser.add_argument('--end-date', default='2023-12-29', help="回测结束日期")
+    parser.add_argument('--cash', type=float, default=1000000.0, help="初始资金")
+    parser.add_argument('--env-tickers', type=int, default=8, help="ETFTradingEnv中的ETF数量")
+    parser.add_argument('--env-days', type=int, default=500, help="ETFTradingEnv中的交易日数")
+    parser.add_argument('--env-steps', type=int, default=500, help="每次计时的step次数")
+    parser.add_argument('--screen-size', type=int, default=10, help="批量筛选回测的成分股数量")
+    parser.add_argument('--log-level', default='WARNING', help="运行期间的日志级别")
+    args = parser.parse_args(argv)
+    args.start_date = datetime.strptime(args.start_date, '%Y-%m-%d')
+    args.end_date = datetime.strptime(args.end_date, '%Y-%m-%d')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fixture_dir = os.path.abspath(args.fixture_dir)
+    output = os.path.abspath(args.output or os.path.join(
+        ROOT, 'benchmarks', 'results', f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"))
+
+    logger.remove()
+    logger.add(sys.stderr, level=args.log_level)
+
+    benches = _benchmarks()
+    selected = args.only or list(benches)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='etf_bench_')
+    os.makedirs(workdir, exist_ok=True)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+
+    results = {}
+    try:
+        with offline_apis(mode=args.mode, fixture_dir=fixture_dir, seed=args.seed) as apis:
+            for name in selected:
+                if name not in benches:
+                    results[name] = {'error': f"未知的基准: {name}"}
+                    continue
+                calls_before = dict(apis['tushare'].calls, **apis['akshare'].calls)
+                print(f"运行基准: {name}", file=sys.stderr)
+                try:
+                    results[name] = benches[name](args, apis)
+                except Exception as e:
+                    logger.exception(f"基准{name}运行失败")
+                    results[name] = {'error': f"{type(e).__name__}: {e}"}
+                calls_after = dict(apis['tushare'].calls, **apis['akshare'].calls)
+                results[name]['api_calls'] = {k: v - calls_before.get(k, 0) for k, v in calls_after.items()
+                                              if v - calls_before.get(k, 0) > 0}
+            fixture_stats = {'hits': apis['store'].hits, 'misses': apis['store'].misses}
+    finally:
+        os.chdir(cwd)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_revision': _git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'mode': args.mode,
+            'seed': args.seed,
+            'repeat': args.repeat,
+            'start_date': args.start_date.strftime('%Y-%m-%d'),
+            'end_date': args.end_date.strftime('%Y-%m-%d'),
+            'workdir': workdir,
+            'fixtures': fixture_stats,
+        },
+        'results': results,
+    }
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"基准测试结果已保存: {output}", file=sys.stderr)
+    return report
+
+
+if __name__ == '__main__':
+    main()
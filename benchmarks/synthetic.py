@@ -0,0 +1,273 @@
+"""
+合成行情数据生成器
+
+按固定随机种子生成与Tushare/AKShare接口返回格式一致的行情数据，
+用于离线、可复现的性能基准测试。同一(种子, 代码)总是生成相同的数据。
+"""
+
+import zlib
+import numpy as np
+import pandas as pd
+
+# 期货合约月份（豆粕）
+FUTURE_MONTHS = (1, 3, 5, 7, 8, 9, 11, 12)
+
+# 各指数的成分股数量
+INDEX_SIZES = {
+    '000016.SH': 50,
+    '000300.SH': 300,
+    '000905.SH': 500,
+}
+
+# 雪球实时行情的字段顺序
+SPOT_ITEMS = ['现价', '涨跌', '涨幅', '今开', '最高', '最低', '昨收', '成交量', '成交额']
+
+# 东方财富实时行情列表中的ETF和指数代码
+SPOT_ETFS = [f"{510000 + i:06d}" for i in range(0, 1000, 10)] + [f"{159900 + i:06d}" for i in range(100)]
+SPOT_INDEXES = ['000001', '000016', '000300', '000905', '399001', '399006', '399240']
+
+
+class SyntheticMarket:
+    """按种子生成日线、指数、期货、分红、交易日历和指数成分等数据"""
+
+    def __init__(self, seed=42, start_date='2010-01-04', end_date='2026-12-31'):
+        self.seed = seed
+        self.start_date = pd.Timestamp(start_date)
+        self.end_date = pd.Timestamp(end_date)
+        # 简化的交易日历：所有工作日均为交易日
+        self.trade_days = pd.bdate_range(self.start_date, self.end_date)
+
+    def _rng(self, key):
+        """按代码派生稳定的随机数生成器"""
+        return np.random.default_rng([self.seed, zlib.crc32(str(key).encode())])
+
+    def _days(self, start_date=None, end_date=None):
+        start = pd.Timestamp(start_date) if start_date else self.start_date
+        end = pd.Timestamp(end_date) if end_date else self.end_date
+        return self.trade_days[(self.trade_days >= start) & (self.trade_days <= end)]
+
+    def ohlcv(self, code, start_date=None, end_date=None, start_price=None, volatility=0.015):
+        """生成日线OHLCV，索引为日期，列为open/high/low/close/pre_close/volume/amount"""
+        rng = self._rng(code)
+        n = len(self.trade_days)
+        price0 = start_price or float(rng.uniform(1.0, 50.0))
+        returns = rng.normal(0.0002, volatility, n)
+        close = price0 * np.exp(np.cumsum(returns))
+        pre_close = np.concatenate([[price0], close[:-1]])
+        open_ = pre_close * (1 + rng.normal(0, volatility / 3, n))
+        high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, volatility / 2, n)))
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, volatility / 2, n)))
+        volume = rng.lognormal(13, 0.4, n).round()
+        df = pd.DataFrame({
+            'open': open_.round(3),
+            'high': high.round(3),
+            'low': low.round(3),
+            'close': close.round(3),
+            'pre_close': pre_close.round(3),
+            'volume': volume,
+            'amount': (volume * close / 10).round(3),
+        }, index=self.trade_days)
+        df.index.name = 'date'
+        days = self._days(start_date, end_date)
+        return df.loc[days]
+
+    def tushare_daily(self, ts_code, start_date=None, end_date=None, **kwargs):
+        """daily/fund_daily/index_daily格式：trade_date为YYYYMMDD字符串，按日期降序"""
+        df = self.ohlcv(ts_code, start_date, end_date,
+                        start_price=3000.0 if ts_code[:3] in ('000', '399') else None)
+        out = pd.DataFrame({
+            'ts_code': ts_code,
+            'trade_date': df.index.strftime('%Y%m%d'),
+            'open': df['open'].values,
+            'high': df['high'].values,
+            'low': df['low'].values,
+            'close': df['close'].values,
+            'pre_close': df['pre_close'].values,
+            'change': (df['close'] - df['pre_close']).round(3).values,
+            'pct_chg': ((df['close'] / df['pre_close'] - 1) * 100).round(4).values,
+            'vol': df['volume'].values,
+            'amount': df['amount'].values,
+        })
+        return out.iloc[::-1].reset_index(drop=True)
+
+    def akshare_daily(self, symbol, start_date=None, end_date=None, **kwargs):
+        """fund_etf_hist_em/stock_hk_daily格式：中文列名，按日期升序"""
+        df = self.ohlcv(symbol, start_date, end_date)
+        return pd.DataFrame({
+            '日期': df.index.strftime('%Y-%m-%d'),
+            '开盘': df['open'].values,
+            '收盘': df['close'].values,
+            '最高': df['high'].values,
+            '最低': df['low'].values,
+            '成交量': df['volume'].values,
+            '成交额': df['amount'].values,
+        })
+
+    def spot_xq(self, symbol, **kwargs):
+        """stock_individual_spot_xq格式：item/value两列"""
+        bar = self.ohlcv(symbol).iloc[-1]
+        values = [bar['close'], bar['close'] - bar['pre_close'], (bar['close'] / bar['pre_close'] - 1) * 100,
+                  bar['open'], bar['high'], bar['low'], bar['pre_close'], bar['volume'], bar['amount']]
+        return pd.DataFrame({'item': SPOT_ITEMS, 'value': values})
+
+    def _spot_board(self, codes, ts_codes, open_col='今开', high_col='最高', low_col='最低', start_price=None):
+        bars = [self.ohlcv(ts_code, start_price=start_price).iloc[-1] for ts_code in ts_codes]
+        df = pd.DataFrame(bars).reset_index(drop=True)
+        return pd.DataFrame({
+            '序号': np.arange(1, len(codes) + 1),
+            '代码': codes,
+            '名称': [f"合成{code}" for code in codes],
+            '最新价': df['close'].values,
+            '涨跌幅': ((df['close'] / df['pre_close'] - 1) * 100).round(2).values,
+            '涨跌额': (df['close'] - df['pre_close']).round(3).values,
+            '成交量': df['volume'].values,
+            '成交额': df['amount'].values,
+            open_col: df['open'].values,
+            high_col: df['high'].values,
+            low_col: df['low'].values,
+            '昨收': df['pre_close'].values,
+        })
+
+    def spot_em_stock(self, **kwargs):
+        """stock_zh_a_spot_em格式：全部A股的实时行情，中文列名"""
+        ts_codes = self.universe()['ts_code'].tolist()
+        return self._spot_board([c[:6] for c in ts_codes], ts_codes)
+
+    def spot_em_etf(self, **kwargs):
+        """fund_etf_spot_em格式：全部ETF的实时行情，开高低列名为开盘价/最高价/最低价"""
+        ts_codes = [f"{c}.SH" if c.startswith('5') else f"{c}.SZ" for c in SPOT_ETFS]
+        return self._spot_board(SPOT_ETFS, ts_codes, open_col='开盘价', high_col='最高价', low_col='最低价')
+
+    def spot_em_index(self, **kwargs):
+        """stock_zh_index_spot_em格式：指数实时行情"""
+        ts_codes = [f"{c}.SZ" if c.startswith('399') else f"{c}.SH" for c in SPOT_INDEXES]
+        return self._spot_board(SPOT_INDEXES, ts_codes, start_price=3000.0)
+
+    def trade_cal(self, exchange='SSE', start_date=None, end_date=None, is_open=None, **kwargs):
+        """trade_cal格式：cal_date/is_open/pretrade_date，按日期降序"""
+        start = pd.Timestamp(start_date) if start_date else self.start_date
+        end = pd.Timestamp(end_date) if end_date else self.end_date
+        days = pd.date_range(start, end)
+        open_flags = days.isin(self.trade_days).astype(int)
+        df = pd.DataFrame({
+            'exchange': exchange or 'SSE',
+            'cal_date': days.strftime('%Y%m%d'),
+            'is_open': open_flags,
+        })
+        opened = pd.Series(np.where(open_flags == 1, df['cal_date'], None))
+        df['pretrade_date'] = opened.shift(1).ffill().values
+        if is_open is not None and str(is_open) != '':
+            df = df[df['is_open'] == int(is_open)]
+        return df.iloc[::-1].reset_index(drop=True)
+
+    def universe(self, size=800):
+        """合成A股股票池"""
+        codes = [f"{600000 + i:06d}.SH" if i % 2 == 0 else f"{i:06d}.SZ" for i in range(size)]
+        return pd.DataFrame({
+            'ts_code': codes,
+            'symbol': [c[:6] for c in codes],
+            'name': [f"合成股票{i}" for i in range(size)],
+            'area': '上海',
+            'industry': '综合',
+            'list_date': '20000101',
+        })
+
+    def stock_basic(self, exchange='', list_status='L', **kwargs):
+        return self.universe()
+
+    def index_weight(self, index_code, trade_date=None, start_date=None, end_date=None, **kwargs):
+        """index_weight格式：仅每月首个交易日有成分权重数据"""
+        size = INDEX_SIZES.get(index_code, 50)
+        rebalance_days = pd.Series(self.trade_days).groupby(self.trade_days.to_period('M')).first()
+        if trade_date:
+            start = end = pd.Timestamp(trade_date)
+        else:
+            start = pd.Timestamp(start_date) if start_date else self.start_date
+            end = pd.Timestamp(end_date) if end_date else self.end_date
+        days = rebalance_days[(rebalance_days >= start) & (rebalance_days <= end)]
+        codes = self.universe()['ts_code']
+        frames = []
+        for day in days:
+            rng = self._rng(f"{index_code}{day:%Y%m}")
+            members = rng.choice(len(codes), size=size, replace=False)
+            weight = rng.dirichlet(np.ones(size)) * 100
+            frames.append(pd.DataFrame({
+                'index_code': index_code,
+                'con_code': codes.values[members],
+                'trade_date': day.strftime('%Y%m%d'),
+                'weight': weight.round(4),
+            }))
+        if not frames:
+            return pd.DataFrame(columns=['index_code', 'con_code', 'trade_date', 'weight'])
+        return pd.concat(frames, ignore_index=True)
+
+    def fund_div(self, ts_code, start_date=None, end_date=None, **kwargs):
+        """fund_div格式：每年1月派发一次现金分红，部分ETF不分红"""
+        rng = self._rng(f"div{ts_code}")
+        if rng.random() < 0.3:
+            return pd.DataFrame(columns=['ts_code', 'ann_date', 'ex_date', 'pay_date', 'div_cash'])
+        start = pd.Timestamp(start_date) if start_date else self.start_date
+        end = pd.Timestamp(end_date) if end_date else self.end_date
+        rows = []
+        for year in range(self.start_date.year, self.end_date.year + 1):
+            ann = self.trade_days[self.trade_days >= pd.Timestamp(year=year, month=1, day=10)]
+            if len(ann) == 0 or not (start <= ann[0] <= end):
+                continue
+            rows.append({
+                'ts_code': ts_code,
+                'ann_date': ann[0].strftime('%Y%m%d'),
+                'ex_date': ann[min(5, len(ann) - 1)].strftime('%Y%m%d'),
+                'pay_date': ann[min(8, len(ann) - 1)].strftime('%Y%m%d'),
+                'div_cash': round(float(rng.uniform(0.01, 0.1)), 3),
+            })
+        return pd.DataFrame(rows, columns=['ts_code', 'ann_date', 'ex_date', 'pay_date', 'div_cash'])
+
+    def fut_basic(self, fut_code='M', exchange='DCE', **kwargs):
+        """fut_basic格式：每年按FUTURE_MONTHS上市合约，最后交割日为合约月15日"""
+        rows = []
+        for year in range(self.start_date.year, self.end_date.year + 2):
+            for month in FUTURE_MONTHS:
+                last_ddate = pd.Timestamp(year=year, month=month, day=15)
+                rows.append({
+                    'ts_code': f"{fut_code}{year % 100:02d}{month:02d}.{exchange}",
+                    'symbol': f"{fut_code}{year % 100:02d}{month:02d}",
+                    'exchange': exchange,
+                    'name': f"豆粕{year % 100:02d}{month:02d}",
+                    'fut_code': fut_code,
+                    'multiplier': 10,
+                    'list_date': (last_ddate - pd.DateOffset(years=1)).strftime('%Y%m%d'),
+                    'delist_date': last_ddate.strftime('%Y%m%d'),
+                    'last_ddate': last_ddate.strftime('%Y%m%d'),
+                })
+        return pd.DataFrame(rows)
+
+    def fut_daily(self, ts_code, start_date=None, end_date=None, fields=None, **kwargs):
+        """fut_daily格式：价格=品种基准价+合约升贴水，成交量/持仓量在交割前2~4个月达到峰值"""
+        symbol = ts_code.split('.')[0]
+        product = symbol.rstrip('0123456789')
+        base = self.ohlcv(f"FUT_{product}", start_price=3000.0, volatility=0.012)
+        yy, mm = int(symbol[-4:-2]), int(symbol[-2:])
+        last_ddate = pd.Timestamp(year=2000 + yy, month=mm, day=15)
+        list_date = last_ddate - pd.DateOffset(years=1)
+        start = max(pd.Timestamp(start_date), list_date) if start_date else list_date
+        end = min(pd.Timestamp(end_date), last_ddate) if end_date else last_ddate
+        base = base[(base.index >= start) & (base.index <= end)]
+        rng = self._rng(ts_code)
+        basis = 1 + rng.normal(0, 0.01)
+        days_left = (last_ddate - base.index).days.values
+        activity = np.exp(-((days_left - 90) / 45.0) ** 2) + 0.02
+        vol = (activity * rng.lognormal(12, 0.2, len(base))).round()
+        df = pd.DataFrame({
+            'ts_code': ts_code,
+            'trade_date': base.index.strftime('%Y%m%d'),
+            'open': (base['open'] * basis).round().values,
+            'high': (base['high'] * basis).round().values,
+            'low': (base['low'] * basis).round().values,
+            'close': (base['close'] * basis).round().values,
+            'vol': vol,
+            'amount': (vol * base['close'].values * 10 / 1e4).round(2),
+            'oi': (activity * 1e6).round(),
+        }).iloc[::-1].reset_index(drop=True)
+        if fields:
+            df = df[[f for f in fields.split(',') if f in df.columns]]
+        return df
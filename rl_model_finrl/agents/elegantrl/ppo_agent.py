@@ -8,7 +8,7 @@ from typing import Dict, List, Tuple, Any, Optional
 import time
 import logging
 import matplotlib.pyplot as plt
-from stable_baselines3.common.vec_env import DummyVecEnv
+from stable_baselines3.common.vec_env import DummyVecEnv, VecEnv
 
 from src.strategies.rl_model_finrl.config import (
     GAMMA,
@@ -160,74 +160,233 @@ class CriticNetwork(nn.Module):
 
 
 class PPOMemory:
-    """PPO算法的经验回放缓冲区"""
+    """
+    PPO算法的rollout缓冲区
     
-    def __init__(self, batch_size: int = 64):
+    按(时间步, 环境)预分配float32数组，存储时直接写入对应位置，不再逐条追加到列表；
+    GAE优势和回报对全部时间步和环境一次向量化计算，
+    更新时整个缓冲区只向计算设备复制一次，再按打乱的索引抽取小批量。
+    """
+    
+    def __init__(self, buffer_size: int, state_dim: int, num_envs: int = 1, batch_size: int = 64):
         """
         初始化回放缓冲区
         
         参数:
-            batch_size: 批处理大小
+            buffer_size: 每个环境存储的时间步数
+            state_dim: 状态空间维度
+            num_envs: 并行环境数量
+            batch_size: 小批量大小
         """
-        self.states = []
-        self.actions = []
-        self.probs = []
-        self.vals = []
-        self.rewards = []
-        self.dones = []
-        
+        self.buffer_size = buffer_size
+        self.num_envs = num_envs
         self.batch_size = batch_size
+        
+        self.states = np.zeros((buffer_size, num_envs, state_dim), dtype=np.float32)
+        self.actions = np.zeros((buffer_size, num_envs), dtype=np.int64)
+        self.probs = np.zeros((buffer_size, num_envs), dtype=np.float32)
+        self.vals = np.zeros((buffer_size, num_envs), dtype=np.float32)
+        self.rewards = np.zeros((buffer_size, num_envs), dtype=np.float32)
+        self.dones = np.zeros((buffer_size, num_envs), dtype=np.float32)
+        self.advantages = np.zeros((buffer_size, num_envs), dtype=np.float32)
+        self.returns = np.zeros((buffer_size, num_envs), dtype=np.float32)
+        self.ptr = 0
+    
+    @property
+    def full(self) -> bool:
+        """缓冲区是否已满"""
+        return self.ptr >= self.buffer_size
     
     def store(self, state, action, probs, vals, reward, done):
         """
-        存储经验元组
+        存储所有环境在一个时间步的经验
         
         参数:
-            state: 状态
-            action: 动作
+            state: 状态，形状为(num_envs, state_dim)
+            action: 动作，形状为(num_envs,)
             probs: 动作的对数概率
             vals: 状态价值
             reward: 奖励
             done: 是否结束
         """
-        self.states.append(state)
-        self.actions.append(action)
-        self.probs.append(probs)
-        self.vals.append(vals)
-        self.rewards.append(reward)
-        self.dones.append(done)
+        t = self.ptr
+        self.states[t] = state
+        self.actions[t] = np.reshape(action, self.num_envs)
+        self.probs[t] = np.reshape(probs, self.num_envs)
+        self.vals[t] = np.reshape(vals, self.num_envs)
+        self.rewards[t] = np.reshape(reward, self.num_envs)
+        self.dones[t] = np.reshape(done, self.num_envs)
+        self.ptr += 1
     
     def clear(self):
-        """清空缓冲区"""
-        self.states = []
-        self.actions = []
-        self.probs = []
-        self.vals = []
-        self.rewards = []
-        self.dones = []
+        """清空缓冲区（只重置写入位置，数组复用）"""
+        self.ptr = 0
     
-    def generate_batches(self):
+    def compute_advantages(self, last_values, gamma: float, gae_lambda: float):
         """
-        生成批次数据
+        计算GAE优势和回报
         
-        返回:
-            包含索引和相应数据的字典
+        递推式 A_t = delta_t + gamma * lambda * (1 - done_t) * A_{t+1} 用并行前缀扫描求解：
+        第k轮把每个时间步与其后2^k步的结果合并，log2(T)次数组运算即得到全部优势，
+        结果在数值上与逐步递推一致（浮点误差范围内）。
+        
+        参数:
+            last_values: 缓冲区最后一步之后的状态价值，形状为(num_envs,)，用于自举
+            gamma: 折扣因子
+            gae_lambda: GAE lambda参数
+        """
+        n = self.ptr
+        values = self.vals[:n].astype(np.float64)
+        rewards = self.rewards[:n].astype(np.float64)
+        not_done = 1.0 - self.dones[:n].astype(np.float64)
+        
+        next_values = np.empty_like(values)
+        next_values[:-1] = values[1:]
+        next_values[-1] = np.reshape(last_values, self.num_envs)
+        
+        advantages = rewards + gamma * next_values * not_done - values
+        discounts = gamma * gae_lambda * not_done
+        offset = 1
+        while offset < n:
+            advantages[:-offset] = advantages[:-offset] + discounts[:-offset] * advantages[offset:]
+            discounts[:-offset] = discounts[:-offset] * discounts[offset:]
+            discounts[-offset:] = 0.0
+            offset *= 2
+        
+        self.advantages[:n] = advantages
+        self.returns[:n] = advantages + values
+    
+    def to_tensors(self, device) -> Dict[str, torch.Tensor]:
         """
-        n_states = len(self.states)
-        batch_start = np.arange(0, n_states, self.batch_size)
-        indices = np.arange(n_states, dtype=np.int64)
-        np.random.shuffle(indices)
-        batches = [indices[i:i+self.batch_size] for i in batch_start]
+        将缓冲区中的数据展平为(时间步*环境)并一次性复制到计算设备
         
+        参数:
+            device: 计算设备
+            
+        返回:
+            包含states/actions/probs/returns/advantages张量的字典
+        """
+        n = self.ptr
+        data = {
+            'states': self.states[:n],
+            'actions': self.actions[:n],
+            'probs': self.probs[:n],
+            'returns': self.returns[:n],
+            'advantages': self.advantages[:n],
+        }
         return {
-            'states': np.array(self.states),
-            'actions': np.array(self.actions),
-            'probs': np.array(self.probs),
-            'vals': np.array(self.vals),
-            'rewards': np.array(self.rewards),
-            'dones': np.array(self.dones),
-            'batches': batches
+            key: torch.from_numpy(value.reshape((n * self.num_envs,) + value.shape[2:])).to(device)
+            for key, value in data.items()
         }
+    
+    def generate_batches(self, n_samples: int, device=None) -> List[torch.Tensor]:
+        """
+        生成打乱的小批量索引
+        
+        参数:
+            n_samples: 样本总数
+            device: 索引张量所在的设备
+            
+        返回:
+            索引张量列表
+        """
+        indices = torch.randperm(n_samples, device=device)
+        return list(torch.split(indices, self.batch_size))
+
+
+class RolloutCollector:
+    """
+    批量rollout采集器
+    
+    每步对向量化环境（DummyVecEnv、BatchedETFTradingEnv、SubprocVecEnv等）中的全部环境
+    只做一次推理：actor和critic在同一个推理上下文中前向计算，动作、对数概率和状态价值
+    拼成一个张量一次性复制回CPU。观察和输出使用预分配（CUDA上为锁页内存）并复用的张量，
+    每步不再新建张量。
+    
+    离散策略每个环境输出一个动作，以(num_envs,)的数组传给env.step；ETFTradingEnv和
+    BatchedETFTradingEnv都将单个动作值广播到所有ETF，因此stock_dim大于1的环境同样适用。
+    """
+    
+    def __init__(self, env, actor: nn.Module, critic: nn.Module, memory: "PPOMemory", device):
+        """
+        初始化采集器
+        
+        参数:
+            env: 向量化环境
+            actor: Actor网络
+            critic: Critic网络
+            memory: rollout缓冲区
+            device: 计算设备
+        """
+        self.env = env
+        self.actor = actor
+        self.critic = critic
+        self.memory = memory
+        self.device = device
+        self.num_envs = env.num_envs
+        
+        pin_memory = device.type == 'cuda'
+        state_dim = memory.states.shape[-1]
+        self._obs_host = torch.empty((self.num_envs, state_dim), dtype=torch.float32, pin_memory=pin_memory)
+        self._obs_device = torch.empty((self.num_envs, state_dim), dtype=torch.float32, device=device)
+        self._out_host = torch.empty((3, self.num_envs), dtype=torch.float32, pin_memory=pin_memory)
+        
+        self.obs = None  # 当前观察，为None时在下次采集前重置环境
+        self.episode_scores = np.zeros(self.num_envs)
+    
+    def reset(self):
+        """重置环境和各环境的回合得分"""
+        self.obs = self.env.reset()
+        self.episode_scores[:] = 0
+    
+    def policy_step(self, obs: np.ndarray) -> np.ndarray:
+        """
+        对所有环境的观察做一次前向推理
+        
+        参数:
+            obs: 观察，形状为(num_envs, state_dim)
+            
+        返回:
+            形状为(3, num_envs)的数组，依次为动作、对数概率和状态价值
+        """
+        self._obs_host.copy_(torch.from_numpy(np.asarray(obs, dtype=np.float32)))
+        self._obs_device.copy_(self._obs_host, non_blocking=True)
+        with torch.inference_mode():
+            action_probs = self.actor(self._obs_device)
+            values = self.critic(self._obs_device).view(-1)
+            actions = torch.multinomial(action_probs, 1)
+            log_probs = torch.log(action_probs.gather(1, actions) + 1e-10).view(-1)
+            out = torch.stack([actions.view(-1).to(torch.float32), log_probs, values])
+        self._out_host.copy_(out)
+        return self._out_host.numpy()
+    
+    def collect(self, n_steps: int) -> List[float]:
+        """
+        在所有环境中采集n_steps步经验并写入缓冲区
+        
+        参数:
+            n_steps: 每个环境采集的步数
+            
+        返回:
+            本次采集中完成的回合得分列表
+        """
+        if self.obs is None:
+            self.reset()
+        
+        finished = []
+        for _ in range(n_steps):
+            out = self.policy_step(self.obs)
+            actions = out[0].astype(np.int64)
+            next_obs, rewards, dones, _ = self.env.step(actions)
+            self.memory.store(self.obs, actions, out[1], out[2], rewards, dones)
+            
+            self.episode_scores += rewards
+            if dones.any():
+                finished.extend(self.episode_scores[dones].tolist())
+                self.episode_scores[dones] = 0
+            self.obs = next_obs
+        
+        return finished
 
 
 class PPOAgent:
@@ -247,6 +406,7 @@ class PPOAgent:
         entropy_coef: float = 0.01,
         batch_size: int = BATCH_SIZE,
         n_epochs: int = 10,
+        n_steps: int = None,
         hidden_dim: int = 128,
         device: str = "auto",
         tensorboard_log: str = TENSORBOARD_PATH
@@ -267,6 +427,7 @@ class PPOAgent:
             entropy_coef: 熵正则化系数
             batch_size: 批处理大小
             n_epochs: 每次更新的训练轮数
+            n_steps: 每次更新前每个环境采集的步数，默认与batch_size相同
             hidden_dim: 网络隐藏层维度
             device: 计算设备
             tensorboard_log: TensorBoard日志目录
@@ -285,9 +446,10 @@ class PPOAgent:
         self.entropy_coef = entropy_coef
         self.batch_size = batch_size
         self.n_epochs = n_epochs
+        self.n_steps = n_steps or batch_size
         
-        # 确保环境被包装
-        if not isinstance(env, DummyVecEnv):
+        # 确保环境被包装（批量环境等VecEnv直接使用）
+        if not isinstance(env, VecEnv):
             self.env = DummyVecEnv([lambda: env])
         else:
             self.env = env
@@ -307,7 +469,7 @@ class PPOAgent:
             self.state_dim = state_dim
             
         if action_dim is None:
-            if isinstance(env.action_space.n, int):
+            if isinstance(getattr(env.action_space, 'n', None), (int, np.integer)):
                 self.action_dim = env.action_space.n
             else:
                 self.action_dim = env.action_space.shape[0]
@@ -323,7 +485,10 @@ class PPOAgent:
         self.critic_optimizer = optim.Adam(self.critic.parameters(), lr=learning_rate)
         
         # 创建经验回放缓冲区
-        self.memory = PPOMemory(batch_size)
+        self.memory = PPOMemory(self.n_steps, self.state_dim, self.env.num_envs, batch_size)
+        
+        # 创建rollout采集器
+        self.collector = RolloutCollector(self.env, self.actor, self.critic, self.memory, self.device)
         
         # 创建TensorBoard日志目录
         if not os.path.exists(tensorboard_log):
@@ -358,70 +523,38 @@ class PPOAgent:
         """
         self.logger.info(f"开始训练PPO模型，总步数: {total_timesteps}")
         
-        # 当前时间步
+        # 当前时间步（所有环境的步数之和）
         time_step = 0
+        steps_per_rollout = self.n_steps * self.env.num_envs
         
-        # 训练循环
+        # 训练循环：每轮在所有环境中各采集n_steps步，然后更新一次策略
         while time_step < total_timesteps:
-            # 重置环境
-            state = self.env.reset()
-            done = False
-            score = 0
+            prev_step = time_step
+            scores = self.collector.collect(self.n_steps)
+            time_step += steps_per_rollout
             
-            # 每个回合的循环
-            while not done and time_step < total_timesteps:
-                # 将状态转换为张量
-                state_tensor = torch.FloatTensor(state).to(self.device)
-                
-                # 获取动作、动作概率和状态价值
-                with torch.no_grad():
-                    action, prob = self.actor.get_action(state_tensor)
-                    value = self.critic(state_tensor)
-                
-                # 执行动作
-                action_cpu = action.cpu().numpy()[0]
-                next_state, reward, done_array, info = self.env.step([action_cpu])
-                done = done_array[0]
-                reward = reward[0]
-                
-                # 将数据存入缓冲区
-                self.memory.store(
-                    state[0], 
-                    action_cpu, 
-                    prob.cpu().numpy()[0], 
-                    value.cpu().numpy()[0], 
-                    reward, 
-                    done
-                )
-                
-                # 记录得分
-                score += reward
-                
-                # 更新状态
-                state = next_state
-                time_step += 1
-                
-                # 判断是否需要更新策略
-                if time_step % self.batch_size == 0:
-                    self._update_policy()
-                
-                # 日志输出
-                if time_step % log_interval == 0:
-                    self.logger.info(f"Timestep: {time_step}/{total_timesteps}, Score: {score:.2f}")
-                
-                # 评估模型
-                if time_step % eval_freq == 0:
-                    mean_reward = self._evaluate(n_eval_episodes)
-                    self.logger.info(f"Evaluation at timestep {time_step}: Mean Reward: {mean_reward:.2f}")
-                    
-                    # 如果性能更好，保存模型
-                    if mean_reward > self.best_reward:
-                        self.best_reward = mean_reward
-                        self.save(os.path.join("models", f"{self.model_name}_best.pt"))
-                        self.logger.info(f"保存最佳模型，平均奖励: {mean_reward:.2f}")
+            # 缓冲区满时更新策略
+            self._update_policy(self.collector.obs)
             
             # 回合结束，记录得分
-            self.logger.info(f"Episode completed, Score: {score:.2f}")
+            for score in scores:
+                self.logger.info(f"Episode completed, Score: {score:.2f}")
+            
+            # 日志输出
+            if time_step // log_interval > prev_step // log_interval:
+                score = float(np.mean(self.collector.episode_scores))
+                self.logger.info(f"Timestep: {time_step}/{total_timesteps}, Score: {score:.2f}")
+            
+            # 评估模型
+            if time_step // eval_freq > prev_step // eval_freq:
+                mean_reward = self._evaluate(n_eval_episodes)
+                self.logger.info(f"Evaluation at timestep {time_step}: Mean Reward: {mean_reward:.2f}")
+                
+                # 如果性能更好，保存模型
+                if mean_reward > self.best_reward:
+                    self.best_reward = mean_reward
+                    self.save(os.path.join("models", f"{self.model_name}_best.pt"))
+                    self.logger.info(f"保存最佳模型，平均奖励: {mean_reward:.2f}")
         
         # 训练完成，保存最终模型
         self.save(os.path.join("models", f"{self.model_name}.pt"))
@@ -429,48 +562,36 @@ class PPOAgent:
         
         return self
     
-    def _update_policy(self):
-        """更新策略网络和价值网络"""
-        # 计算状态价值估计
-        values = np.array(self.memory.vals)
-        rewards = np.array(self.memory.rewards)
-        dones = np.array(self.memory.dones)
-        states = np.array(self.memory.states)
-        actions = np.array(self.memory.actions)
-        old_probs = np.array(self.memory.probs)
-        
-        # 计算优势估计（使用GAE）
-        advantages = np.zeros(len(rewards), dtype=np.float32)
-        gae = 0
-        
-        # 从后向前计算GAE
-        for t in reversed(range(len(rewards) - 1)):
-            delta = rewards[t] + self.gamma * values[t + 1] * (1 - dones[t]) - values[t]
-            gae = delta + self.gamma * self.gae_lambda * (1 - dones[t]) * gae
-            advantages[t] = gae
-        
-        # 计算回报
-        returns = advantages + values
+    def _update_policy(self, last_state):
+        """
+        更新策略网络和价值网络
         
-        # 转换为张量
-        states = torch.FloatTensor(states).to(self.device)
-        actions = torch.LongTensor(actions).to(self.device)
-        old_probs = torch.FloatTensor(old_probs).to(self.device)
-        returns = torch.FloatTensor(returns).to(self.device)
-        advantages = torch.FloatTensor(advantages).to(self.device)
+        参数:
+            last_state: 缓冲区最后一步之后的状态，用于自举估计优势
+        """
+        # 计算优势估计（使用GAE）和回报
+        with torch.no_grad():
+            last_values = self.critic(torch.as_tensor(last_state, dtype=torch.float32, device=self.device))
+        self.memory.compute_advantages(last_values.cpu().numpy().reshape(-1), self.gamma, self.gae_lambda)
+        
+        # 整个缓冲区一次性复制到计算设备
+        data = self.memory.to_tensors(self.device)
+        states = data['states']
+        actions = data['actions']
+        old_probs = data['probs']
+        returns = data['returns']
+        advantages = data['advantages']
         
         # 进行多个epoch的训练
         for _ in range(self.n_epochs):
-            # 每个batch的训练
-            for batch in range(0, len(states), self.batch_size):
-                end = min(batch + self.batch_size, len(states))
-                
+            # 每个epoch重新打乱样本，按小批量训练
+            for batch in self.memory.generate_batches(len(states), self.device):
                 # 获取当前batch
-                batch_states = states[batch:end]
-                batch_actions = actions[batch:end]
-                batch_old_probs = old_probs[batch:end]
-                batch_returns = returns[batch:end]
-                batch_advantages = advantages[batch:end]
+                batch_states = states[batch]
+                batch_actions = actions[batch]
+                batch_old_probs = old_probs[batch]
+                batch_returns = returns[batch]
+                batch_advantages = advantages[batch]
                 
                 # 获取新的动作概率和熵
                 action_probs = self.actor(batch_states)
@@ -489,7 +610,7 @@ class PPOAgent:
                 actor_loss = -torch.min(weighted_advantages, clipped_advantages).mean()
                 
                 # 计算价值损失
-                critic_value = self.critic(batch_states).squeeze()
+                critic_value = self.critic(batch_states).view(-1)
                 critic_loss = F.mse_loss(critic_value, batch_returns)
                 
                 # 总损失
@@ -517,26 +638,26 @@ class PPOAgent:
         """
         rewards = []
         
-        for _ in range(n_episodes):
-            state = self.env.reset()
-            episode_reward = 0
-            done = False
+        # 所有环境同时评估，直到完成n_episodes个回合
+        state = self.env.reset()
+        episode_rewards = np.zeros(self.env.num_envs)
+        while len(rewards) < n_episodes:
+            # 确定性选择动作
+            with torch.no_grad():
+                action, _ = self.actor.get_action(torch.as_tensor(state, dtype=torch.float32, device=self.device),
+                                                  deterministic=True)
             
-            while not done:
-                # 确定性选择动作
-                action = self.predict(state, deterministic=True)
-                
-                # 执行动作
-                next_state, reward, done_array, _ = self.env.step([action])
-                done = done_array[0]
-                
-                # 累积奖励
-                episode_reward += reward[0]
-                
-                # 更新状态
-                state = next_state
+            # 执行动作
+            state, reward, done_array, _ = self.env.step(action.cpu().numpy())
             
-            rewards.append(episode_reward)
+            # 累积奖励
+            episode_rewards += reward
+            rewards.extend(episode_rewards[done_array].tolist())
+            episode_rewards[done_array] = 0
+        
+        # 评估时重置了训练环境，下次采集前重新开始
+        self.collector.obs = None
+        rewards = rewards[:n_episodes]
         
         # 计算平均奖励
         mean_reward = np.mean(rewards)
@@ -626,6 +747,8 @@ class PPOAgent:
             self.critic = CriticNetwork(self.state_dim).to(self.device)
             self.actor_optimizer = optim.Adam(self.actor.parameters(), lr=self.learning_rate)
             self.critic_optimizer = optim.Adam(self.critic.parameters(), lr=self.learning_rate)
+            self.memory = PPOMemory(self.n_steps, self.state_dim, self.env.num_envs, self.batch_size)
+            self.collector = RolloutCollector(self.env, self.actor, self.critic, self.memory, self.device)
         
         # 加载网络权重
         self.actor.load_state_dict(checkpoint['actor_state_dict'])
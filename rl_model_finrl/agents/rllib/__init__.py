@@ -15,8 +15,8 @@ from src.strategies.rl_model_finrl.meta.env_stock_trading.etf_trading_env import
 # 创建环境
 env = ETFTradingEnv(...)
 
-# 初始化PPO智能体
-agent = RLlibPPOAgent(env=env)
+# 初始化PPO智能体（每个采样worker从共享内存中的市场数据创建自己的环境）
+agent = RLlibPPOAgent(env=env, num_rollout_workers=4, num_envs_per_worker=2)
 
 # 训练模型
 agent.learn(total_timesteps=100000)
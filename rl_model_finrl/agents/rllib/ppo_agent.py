@@ -9,8 +9,39 @@ from ray.rllib.algorithms.ppo import PPO
 from ray.rllib.utils.framework import try_import_tf, try_import_torch
 from ray.tune.registry import register_env
 
+from src.strategies.rl_model_finrl.applications.stock_trading.shared_env import (
+    ENV_PARAMS,
+    SharedEnvFactory,
+    SharedMarketData,
+)
+
 logger = logging.getLogger(__name__)
 
+
+def create_worker_env(env_config):
+    """
+    RLlib的环境创建函数：在每个rollout worker中创建新的环境实例
+
+    环境的市场数据从共享内存挂载，不随配置序列化；rollout worker不是驱动进程的multiprocessing子进程，
+    挂载时不登记到worker的resource_tracker，worker退出或重启时不会删除驱动进程的共享内存。
+    设置了seed时按worker和子环境下标派生不同的随机数种子。
+
+    参数:
+        env_config: RLlib的EnvContext，包含env_class、spec、env_kwargs、seed、num_envs_per_worker
+
+    返回:
+        新的环境实例
+    """
+    seed = env_config.get("seed")
+    if seed is not None:
+        worker_index = getattr(env_config, "worker_index", 0)
+        vector_index = getattr(env_config, "vector_index", 0)
+        seed = seed + worker_index * env_config.get("num_envs_per_worker", 1) + vector_index
+    factory = SharedEnvFactory(env_config["env_class"], env_config["spec"], env_config["env_kwargs"], seed,
+                               track=False)
+    return factory()
+
+
 class RLlibPPOAgent:
     """
     RLlib PPO 智能体实现
@@ -26,6 +57,9 @@ class RLlibPPOAgent:
         seed: Optional[int] = None,
         verbose: int = 1,
         device: str = "auto",
+        env_config: Optional[Dict[str, Any]] = None,
+        num_rollout_workers: Optional[int] = None,
+        num_envs_per_worker: int = 1,
         **kwargs
     ):
         """
@@ -38,6 +72,9 @@ class RLlibPPOAgent:
             seed: 随机种子
             verbose: 详细程度
             device: 设备选择 ('cpu', 'cuda', 'auto')
+            env_config: 覆盖环境构造参数的字典（如reward_type），各worker按此创建新的环境
+            num_rollout_workers: 采样worker数量，默认为CPU核数减1（保留一个核给训练进程）
+            num_envs_per_worker: 每个worker中的环境数量
             **kwargs: 传递给PPO构造函数的其他参数
         """
         self.env = env
@@ -46,6 +83,16 @@ class RLlibPPOAgent:
         self.seed = seed
         self.verbose = verbose
         self.device = device
+        if num_rollout_workers is None:
+            num_rollout_workers = max((os.cpu_count() or 1) - 1, 0)
+        self.num_rollout_workers = num_rollout_workers
+        self.num_envs_per_worker = num_envs_per_worker
+        
+        # 市场数据只放入共享内存一次，各worker据此创建自己的环境
+        self.shared_data = SharedMarketData(env.get_market_data())
+        env_kwargs = {name: getattr(env, name) for name in ENV_PARAMS}
+        env_kwargs.update(env_config or {})
+        
         self.ppo_config = {
             "framework": "torch",
             "num_gpus": 0 if device == "cpu" else 1,
@@ -63,6 +110,17 @@ class RLlibPPOAgent:
             "gamma": 0.99,
             "lr": 3e-4,
             "log_level": "WARN",
+            # 并行采样
+            "num_rollout_workers": num_rollout_workers,
+            "num_envs_per_worker": num_envs_per_worker,
+            "num_cpus_per_worker": 1,
+            "env_config": {
+                "env_class": type(env),
+                "spec": self.shared_data.spec,
+                "env_kwargs": env_kwargs,
+                "seed": seed,
+                "num_envs_per_worker": num_envs_per_worker,
+            },
         }
         
         # 更新配置
@@ -77,25 +135,26 @@ class RLlibPPOAgent:
                 logger.info("初始化Ray...")
             ray.init(ignore_reinit_error=True, logging_level=logging.ERROR)
         
-        # 创建PPO算法实例
-        self.model = PPO(
-            config=self.ppo_config,
-            env=self.env.__class__.__name__,
-        )
+        # 创建PPO算法实例；创建失败时释放共享内存
+        try:
+            self.model = PPO(
+                config=self.ppo_config,
+                env=self.env.__class__.__name__,
+            )
+        except Exception:
+            self.shared_data.close()
+            raise
         
         if self.verbose > 0:
-            logger.info(f"RLlib PPO智能体初始化完成: {model_name}")
+            logger.info(f"RLlib PPO智能体初始化完成: {model_name}, "
+                        f"采样worker数: {num_rollout_workers}, 每个worker环境数: {num_envs_per_worker}")
     
     def _register_env(self):
         """注册环境到Ray"""
         env_name = self.env.__class__.__name__
         
-        # 注册环境创建函数
-        def env_creator(env_config):
-            return self.env
-        
-        # 注册环境
-        register_env(env_name, env_creator)
+        # 注册环境创建函数：每个worker创建新的环境实例，而不是共用self.env
+        register_env(env_name, create_worker_env)
     
     def learn(
         self,
@@ -294,4 +353,9 @@ class RLlibPPOAgent:
         asset_memory = test_env.save_asset_memory()
         action_memory = test_env.save_action_memory()
         
-        return asset_memory, action_memory 
\ No newline at end of file
+        return asset_memory, action_memory 
+    
+    def close(self) -> None:
+        """停止RLlib算法并释放共享内存中的市场数据"""
+        self.model.stop()
+        self.shared_data.close()
@@ -6,7 +6,7 @@ import torch
 import torch.nn as nn
 from stable_baselines3 import DQN
 from stable_baselines3.common.callbacks import BaseCallback
-from stable_baselines3.common.vec_env import DummyVecEnv
+from stable_baselines3.common.vec_env import DummyVecEnv, VecEnv
 from stable_baselines3.common.logger import configure
 import logging
 import matplotlib.pyplot as plt
@@ -90,8 +90,8 @@ class DQNAgent:
         logging.basicConfig(level=logging.INFO)
         self.logger = logging.getLogger(__name__)
         
-        # 检查环境是否被向量化
-        if not isinstance(env, DummyVecEnv):
+        # 检查环境是否被向量化（SubprocVecEnv等VecEnv直接使用）
+        if not isinstance(env, VecEnv):
             self.env = DummyVecEnv([lambda: env])
         
         # 创建日志目录
@@ -36,12 +36,14 @@ performance = backtest_etf_strategy(
 """
 
 from src.strategies.rl_model_finrl.applications.stock_trading.etf_env import ETFTradingEnv
+from src.strategies.rl_model_finrl.applications.stock_trading.batched_env import BatchedETFTradingEnv
 from src.strategies.rl_model_finrl.applications.stock_trading.run_strategy import run_etf_strategy
 from src.strategies.rl_model_finrl.applications.stock_trading.backtest import backtest_etf_strategy
 from src.strategies.rl_model_finrl.applications.stock_trading.analysis import ETFStrategyAnalyzer
 
 __all__ = [
     'ETFTradingEnv',
+    'BatchedETFTradingEnv',
     'run_etf_strategy',
     'backtest_etf_strategy',
     'ETFStrategyAnalyzer'
@@ -11,7 +11,7 @@ import datetime
 
 from src.strategies.rl_model_finrl.meta.data_processors import DataProcessor
 from src.strategies.rl_model_finrl.applications.stock_trading.etf_env import ETFTradingEnv
-from src.strategies.rl_model_finrl.applications.stock_trading.run_strategy import prepare_etf_data
+from src.strategies.rl_model_finrl.applications.stock_trading.run_strategy import prepare_etf_market_data
 
 from src.strategies.rl_model_finrl.config import (
     TEST_START_DATE,
@@ -39,7 +39,8 @@ def backtest_etf_strategy(
     market_benchmark: str = 'CSI300',
     render: bool = True,
     save_result: bool = True,
-    result_filename: str = None
+    result_filename: str = None,
+    use_feature_cache: bool = True
 ) -> Dict[str, Any]:
     """
     使用训练好的RL模型回测ETF交易策略
@@ -59,6 +60,7 @@ def backtest_etf_strategy(
         render: 是否渲染结果图表
         save_result: 是否保存结果
         result_filename: 结果文件名
+        use_feature_cache: 是否使用特征缓存（相同参数的回测直接读取缓存的市场数据）
         
     返回:
         回测结果统计字典
@@ -81,12 +83,14 @@ def backtest_etf_strategy(
     processor = DataProcessor(data_source=data_source, time_interval=time_interval)
     
     # 准备回测数据
-    df = prepare_etf_data(
+    market_data = prepare_etf_market_data(
         processor=processor,
         ticker_list=ticker_list,
         start_date=test_start,
         end_date=test_end,
-        data_source=data_source
+        data_source=data_source,
+        technical_indicator_list=technical_indicator_list,
+        use_cache=use_feature_cache
     )
     
     # 获取基准数据
@@ -105,9 +109,10 @@ def backtest_etf_strategy(
             market_benchmark = None
     
     # 创建回测环境
-    stock_dimension = len(df['tic'].unique())
+    stock_dimension = len(market_data['tickers'])
     env_test = ETFTradingEnv(
-        df=df,
+        df=None,
+        market_data=market_data,
         stock_dim=stock_dimension,
         hmax=100,
         initial_amount=initial_amount,
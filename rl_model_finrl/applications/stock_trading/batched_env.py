@@ -0,0 +1,250 @@
+import numpy as np
+from gymnasium import spaces
+from stable_baselines3.common.vec_env import VecEnv
+from typing import List, Optional
+
+
+class BatchedETFTradingEnv(VecEnv):
+    """
+    批量ETF交易环境
+
+    在同一份市场数据张量上同时模拟num_envs个相互独立的投资组合，每个组合有自己的
+    起始交易日和随机数种子。所有组合的调仓、资产估值、奖励和观察都以数组运算一次完成，
+    每步只有一次NumPy计算，而不是逐个环境调用Python的step。
+
+    交易规则、奖励函数与ETFTradingEnv一致（sharpe/sortino奖励的均值和标准差用累计和计算），
+    对外提供Stable-Baselines3的VecEnv接口：reset()返回(num_envs, state_space)的观察，
+    step(actions)接受(num_envs, stock_dim)的动作（每个环境一个动作值时广播到所有ETF），回合结束的环境自动重置，
+    结束前的观察放在info['terminal_observation']中。
+    """
+
+    render_mode = None
+
+    def __init__(
+        self,
+        env,
+        num_envs: int = 8,
+        episode_length: Optional[int] = None,
+        random_start: bool = True,
+        seed: Optional[int] = None
+    ):
+        """
+        初始化批量环境
+
+        参数:
+            env: ETFTradingEnv实例，提供市场数据张量和交易参数
+            num_envs: 同时模拟的投资组合数量
+            episode_length: 每个回合的交易天数，为None时从起始日一直交易到数据结束
+            random_start: 是否为每个回合随机选择起始交易日
+            seed: 随机数种子，第k个环境使用(seed, k)派生的随机数生成器
+        """
+        self.market_tensor = env.market_tensor
+        self.close_matrix = env.close_matrix
+        self.turbulence_series = env.turbulence_series
+        self.tickers = env.tickers
+        self.dates = env.dates
+        self.stock_dim = env.stock_dim
+        self.hmax = env.hmax
+        self.initial_amount = env.initial_amount
+        self.transaction_cost_pct = env.transaction_cost_pct
+        self.reward_scaling = env.reward_scaling
+        self.turbulence_threshold = env.turbulence_threshold
+        self.risk_free_rate = env.risk_free_rate
+        self.reward_type = env.reward_type
+        self.cash_penalty_proportion = env.cash_penalty_proportion
+        self.state_space = env.state_space
+
+        self.num_days = len(self.dates)
+        self.episode_length = min(episode_length or self.num_days, self.num_days)
+        self.random_start = random_start
+
+        observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(self.state_space,), dtype=np.float32)
+        action_space = spaces.Box(low=-1, high=1, shape=(self.stock_dim,), dtype=np.float32)
+        super().__init__(num_envs, observation_space, action_space)
+
+        self.seed(seed)
+
+        # 各投资组合的状态
+        self.start = np.zeros(num_envs, dtype=np.int64)
+        self.day = np.zeros(num_envs, dtype=np.int64)
+        self.holdings = np.zeros((num_envs, self.stock_dim))
+        self.cash_balance = np.zeros(num_envs)
+        self.total_asset = np.zeros(num_envs)
+        self.cost = np.zeros(num_envs)
+        self.turbulence = np.zeros(num_envs)
+        self.episode_return = np.zeros(num_envs)
+        # 计算sharpe/sortino奖励所需的收益率累计量（收益率相对于回合初始资产）
+        self.n_returns = np.zeros(num_envs)
+        self.sum_returns = np.zeros(num_envs)
+        self.sumsq_returns = np.zeros(num_envs)
+        self.n_negative = np.zeros(num_envs)
+        self.sum_negative = np.zeros(num_envs)
+        self.sumsq_negative = np.zeros(num_envs)
+
+        self._actions = None
+
+    def seed(self, seed: Optional[int] = None) -> List[Optional[int]]:
+        """为每个环境派生独立的随机数生成器"""
+        self._seed = seed
+        self.rngs = [np.random.default_rng(None if seed is None else [seed, k]) for k in range(self.num_envs)]
+        return [None if seed is None else seed + k for k in range(self.num_envs)]
+
+    def _reset_envs(self, index):
+        """重置指定下标的投资组合"""
+        if len(index) == 0:
+            return
+        max_start = self.num_days - self.episode_length
+        if self.random_start and max_start > 0:
+            self.start[index] = [self.rngs[k].integers(0, max_start + 1) for k in index]
+        else:
+            self.start[index] = 0
+        self.day[index] = self.start[index]
+        self.holdings[index] = 0
+        self.cash_balance[index] = self.initial_amount
+        self.total_asset[index] = self.initial_amount
+        self.cost[index] = 0
+        self.turbulence[index] = 0
+        self.episode_return[index] = 0
+        # 回合初始资产对应的收益率为0
+        self.n_returns[index] = 1
+        self.sum_returns[index] = 0
+        self.sumsq_returns[index] = 0
+        self.n_negative[index] = 0
+        self.sum_negative[index] = 0
+        self.sumsq_negative[index] = 0
+
+    def _get_observation(self, index=None):
+        """构建观察，与ETFTradingEnv的状态向量布局一致"""
+        index = slice(None) if index is None else index
+        day = np.minimum(self.day[index], self.num_days - 1)
+        market = self.market_tensor[day].reshape(len(day), -1)
+        obs = np.empty((len(day), self.state_space), dtype=np.float32)
+        width = market.shape[1]
+        obs[:, :width] = market
+        obs[:, width:width + self.stock_dim] = self.holdings[index]
+        obs[:, width + self.stock_dim] = self.cash_balance[index]
+        obs[:, width + self.stock_dim + 1] = self.total_asset[index]
+        obs[:, width + self.stock_dim + 2] = self.turbulence[index]
+        return obs
+
+    def reset(self):
+        """重置全部投资组合，返回(num_envs, state_space)的观察"""
+        self._reset_envs(np.arange(self.num_envs))
+        return self._get_observation()
+
+    def step_async(self, actions):
+        """
+        接受(num_envs, stock_dim)的动作；与ETFTradingEnv对单个动作值的处理一致，
+        (num_envs,)或(num_envs, 1)的动作（如离散策略每个环境一个动作）广播到该环境的所有ETF
+        """
+        actions = np.asarray(actions, dtype=np.float64)
+        if actions.shape in ((self.num_envs,), (self.num_envs, 1)):
+            actions = np.repeat(actions.reshape(self.num_envs, 1), self.stock_dim, axis=1)
+        elif actions.shape != (self.num_envs, self.stock_dim):
+            raise ValueError(
+                f"动作形状应为({self.num_envs}, {self.stock_dim})、({self.num_envs},)或({self.num_envs}, 1)，"
+                f"实际为{actions.shape}"
+            )
+        self._actions = actions
+
+    def _calculate_reward(self, prev_total_asset):
+        """按ETFTradingEnv._calculate_reward的规则批量计算奖励"""
+        daily_return = (self.total_asset - prev_total_asset) / prev_total_asset
+        # ETFTradingEnv在第3步起才计算sharpe/sortino，此时已有初始资产和至少2个交易日的资产
+        enough = self.n_returns > 2
+        mean = self.sum_returns / self.n_returns
+
+        if self.reward_type == 'sharpe':
+            std = np.sqrt(np.maximum(self.sumsq_returns / self.n_returns - mean ** 2, 0))
+            reward = np.where(enough, (mean - self.risk_free_rate) / (std + 1e-9), 0.0)
+        elif self.reward_type == 'sortino':
+            n_negative = np.maximum(self.n_negative, 1)
+            negative_mean = self.sum_negative / n_negative
+            downside_std = np.sqrt(np.maximum(self.sumsq_negative / n_negative - negative_mean ** 2, 0))
+            sortino = np.where(self.n_negative > 0, (mean - self.risk_free_rate) / (downside_std + 1e-9),
+                               mean - self.risk_free_rate)
+            reward = np.where(enough, sortino, 0.0)
+        else:
+            reward = daily_return
+
+        # 持有现金惩罚
+        cash_ratio = self.cash_balance / self.total_asset
+        reward = np.where(cash_ratio > 0.7, reward - cash_ratio * self.cash_penalty_proportion, reward)
+        return reward * self.reward_scaling
+
+    def step_wait(self):
+        """所有投资组合同时执行一步交易"""
+        day = self.day
+        close_prices = self.close_matrix[day]
+        if self.turbulence_series is not None:
+            self.turbulence = self.turbulence_series[day]
+
+        actions = np.clip(self._actions, -1, 1)
+        if self.turbulence_threshold is not None:
+            actions[self.turbulence > self.turbulence_threshold] = -1
+        target_weights = (actions + 1) / 2
+
+        # 调仓：与ETFTradingEnv.step相同的逐只计算，在(环境, ETF)二维数组上一次完成
+        valid = close_prices > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            trade_value = self.total_asset[:, None] * target_weights - self.holdings * close_prices
+            trade_shares = np.where(valid, np.trunc(trade_value / np.where(valid, close_prices, 1.0)), 0.0)
+        trade_shares = np.clip(trade_shares, -self.hmax, self.hmax)
+        traded = trade_shares != 0
+        trade_amount = np.where(traded, trade_shares * close_prices, 0.0)
+        transaction_cost = np.abs(trade_amount * self.transaction_cost_pct)
+
+        self.holdings += np.where(traded, trade_shares, 0.0)
+        self.cash_balance = np.subtract.accumulate(
+            np.concatenate([self.cash_balance[:, None], trade_amount + transaction_cost], axis=1), axis=1)[:, -1]
+        self.cost = np.add.accumulate(
+            np.concatenate([self.cost[:, None], transaction_cost], axis=1), axis=1)[:, -1]
+
+        prev_total_asset = self.total_asset
+        self.total_asset = self.cash_balance + np.sum(self.holdings * np.where(valid, close_prices, 0.0), axis=1)
+        rewards = self._calculate_reward(prev_total_asset)
+
+        # 当前资产计入收益率累计量，供之后的奖励计算使用
+        returns = self.total_asset / self.initial_amount - 1
+        negative = returns < 0
+        self.n_returns += 1
+        self.sum_returns += returns
+        self.sumsq_returns += returns ** 2
+        self.n_negative += negative
+        self.sum_negative += np.where(negative, returns, 0.0)
+        self.sumsq_negative += np.where(negative, returns ** 2, 0.0)
+        self.episode_return += rewards
+
+        self.day = day + 1
+        dones = (self.day >= self.start + self.episode_length) | (self.day >= self.num_days)
+        obs = self._get_observation()
+
+        infos = [{} for _ in range(self.num_envs)]
+        done_index = np.flatnonzero(dones)
+        for k in done_index:
+            infos[k] = {
+                'terminal_observation': obs[k].copy(),
+                'portfolio_value': float(self.total_asset[k]),
+                'cost': float(self.cost[k]),
+                'episode': {'r': float(self.episode_return[k]), 'l': int(self.day[k] - self.start[k])},
+            }
+        if len(done_index):
+            self._reset_envs(done_index)
+            obs[done_index] = self._get_observation(done_index)
+
+        return obs, rewards.astype(np.float32), dones, infos
+
+    def close(self):
+        pass
+
+    def get_attr(self, attr_name, indices=None):
+        return [getattr(self, attr_name) for _ in self._get_indices(indices)]
+
+    def set_attr(self, attr_name, value, indices=None):
+        setattr(self, attr_name, value)
+
+    def env_method(self, method_name, *method_args, indices=None, **method_kwargs):
+        return [getattr(self, method_name)(*method_args, **method_kwargs) for _ in self._get_indices(indices)]
+
+    def env_is_wrapped(self, wrapper_class, indices=None):
+        return [False for _ in self._get_indices(indices)]
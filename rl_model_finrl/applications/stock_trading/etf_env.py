@@ -25,6 +25,10 @@ class ETFTradingEnv(gym.Env):
     
     metadata = {'render.modes': ['human']}
     
+    # 交易日志数组的字段：交易日下标、ETF下标、交易股数（买入为正）、成交价、交易成本
+    TRADE_LOG_DTYPE = [('day', np.int32), ('tic', np.int32), ('shares', np.int64),
+                       ('price', np.float64), ('cost', np.float64)]
+    
     def __init__(
         self,
         df: pd.DataFrame,
@@ -41,7 +45,9 @@ class ETFTradingEnv(gym.Env):
         risk_free_rate: float = 0.0,
         lookback: int = 1,
         reward_type: str = 'sharpe',
-        cash_penalty_proportion: float = 0.1
+        cash_penalty_proportion: float = 0.1,
+        log_trades: bool = True,
+        market_data: Optional[Dict[str, Any]] = None
     ):
         """
         初始化ETF交易环境
@@ -62,6 +68,9 @@ class ETFTradingEnv(gym.Env):
             lookback: 回溯天数，即状态包含多少天的历史信息
             reward_type: 奖励函数类型，可选'daily_return', 'sharpe', 'sortino'等
             cash_penalty_proportion: 持有现金惩罚比例
+            log_trades: 是否记录每笔交易（训练时可关闭以减少开销）
+            market_data: 预处理好的市场数据（get_market_data()的返回值，如共享内存中的数据），
+                提供时不再从df构建张量，df可为None
         """
         # 保存参数
         self.df = df
@@ -76,10 +85,21 @@ class ETFTradingEnv(gym.Env):
         self.lookback = lookback
         self.reward_type = reward_type
         self.cash_penalty_proportion = cash_penalty_proportion
-        
-        # 获取交易日期
-        self.dates = self.df.index.unique().tolist()
-        self.data = self.df.reset_index()
+        self.log_trades = log_trades
+        
+        if market_data is not None:
+            # 直接使用已构建好的张量
+            self.data = None
+            for key in ('dates', 'tickers', 'feature_columns', 'market_tensor', 'close_matrix', 'turbulence_series'):
+                setattr(self, key, market_data[key])
+            self.dates = list(self.dates)
+        else:
+            # 获取交易日期
+            self.dates = self.df.index.unique().tolist()
+            self.data = self.df.reset_index()
+            
+            # 将长表一次性转换为按(交易日, ETF, 特征)索引的张量，每步只需按天切片
+            self._build_market_tensor()
         
         # 初始化状态
         self.terminal = False  
@@ -102,17 +122,72 @@ class ETFTradingEnv(gym.Env):
         # 设置观察空间
         self.observation_space = spaces.Box(low=-np.inf, high=np.inf, shape=(self.state_space,))
         
+        # 交易日志：每个交易日每只ETF最多一笔交易，按最大笔数预分配
+        self.trade_log = np.zeros(len(self.dates) * self.stock_dim if log_trades else 0, dtype=self.TRADE_LOG_DTYPE)
+        self.trade_count = 0
+        
         # 初始化交易相关变量
         self.asset_memory = [self.initial_amount]
-        self.actions_memory = []
         self.date_memory = [self._get_date()]
-        self.trades = []
         self.rewards_memory = []
         self.total_dividend = 0  # 添加分红总额跟踪
         
         # 随机数生成器
         self.seed()
         
+    def _build_market_tensor(self):
+        """
+        构建市场数据张量
+        
+        生成以下属性：
+            tickers: ETF代码数组，顺序即持仓、动作和观察中ETF的顺序（按在数据中首次出现的顺序）
+            feature_columns: 观察中每只ETF的特征列（存在的OHLC列及技术指标列）
+            market_tensor: float32张量，形状为(交易日数, stock_dim, 特征数)，缺失的数据为0
+            close_matrix: float64收盘价矩阵，形状为(交易日数, stock_dim)，用于交易计算
+            turbulence_series: 每个交易日的市场波动指标（当天第一行的turbulence），无该列时为None
+        """
+        data = self.data
+        self.tickers = np.asarray(pd.unique(data['tic']))[:self.stock_dim]
+        self.feature_columns = [col for col in ['open', 'high', 'low', 'close'] if col in data.columns]
+        self.feature_columns += [tech for tech in self.tech_indicator_list if tech in data.columns]
+        
+        # 同一交易日同一ETF有多行时取第一行
+        rows = data.drop_duplicates(['date', 'tic'])
+        day_index = pd.Index(self.dates).get_indexer(rows['date'])
+        tic_index = pd.Index(self.tickers).get_indexer(rows['tic'])
+        valid = tic_index >= 0
+        day_index, tic_index = day_index[valid], tic_index[valid]
+        
+        num_days = len(self.dates)
+        self.market_tensor = np.zeros((num_days, self.stock_dim, len(self.feature_columns)), dtype=np.float32)
+        self.market_tensor[day_index, tic_index] = rows.loc[valid, self.feature_columns].to_numpy(dtype=np.float32)
+        
+        self.close_matrix = np.zeros((num_days, self.stock_dim))
+        if 'close' in data.columns:
+            self.close_matrix[day_index, tic_index] = rows.loc[valid, 'close'].to_numpy(dtype=float)
+        
+        if 'turbulence' in data.columns:
+            first_rows = data.drop_duplicates('date').set_index('date')['turbulence']
+            self.turbulence_series = first_rows.reindex(self.dates).to_numpy(dtype=float)
+        else:
+            self.turbulence_series = None
+    
+    def get_market_data(self) -> Dict[str, Any]:
+        """
+        获取预处理好的市场数据，可用于构造共享同一份数据的环境
+        
+        返回:
+            包含dates、tickers、feature_columns、market_tensor、close_matrix、turbulence_series的字典
+        """
+        return {
+            'dates': self.dates,
+            'tickers': self.tickers,
+            'feature_columns': self.feature_columns,
+            'market_tensor': self.market_tensor,
+            'close_matrix': self.close_matrix,
+            'turbulence_series': self.turbulence_series,
+        }
+    
     def seed(self, seed=None):
         """初始化随机数生成器"""
         self.np_random, seed = seeding.np_random(seed)
@@ -120,10 +195,11 @@ class ETFTradingEnv(gym.Env):
     
     def _get_date(self):
         """获取当前日期"""
-        if self.day < len(self.dates):
-            return self.dates[self.day]
-        else:
-            return self.dates[-1]  # 防止索引越界
+        return self.dates[self._day_index()]
+    
+    def _day_index(self):
+        """当前交易日在dates中的下标（防止索引越界）"""
+        return self.day if self.day < len(self.dates) else len(self.dates) - 1
     
     def reset(self):
         """
@@ -138,9 +214,8 @@ class ETFTradingEnv(gym.Env):
         
         # 初始化账户状态
         self.asset_memory = [self.initial_amount]
-        self.actions_memory = []
         self.date_memory = [self._get_date()]
-        self.trades = []
+        self.trade_count = 0
         self.rewards_memory = []
         self.total_dividend = 0  # 重置分红总额
         
@@ -163,67 +238,16 @@ class ETFTradingEnv(gym.Env):
         返回:
             当前状态向量
         """
-        # 获取当前价格数据
-        current_date = self._get_date()
-        current_data = self.data[self.data['date'] == current_date]
-        
-        # 构建状态向量
-        state = []
-        
-        # 添加价格和技术指标特征
-        for i in range(self.stock_dim):
-            # 获取该ETF当天的数据
-            stock_data = current_data[current_data['tic'] == current_data['tic'].unique()[i]]
-            
-            if not stock_data.empty:
-                # 添加基本价格特征 (OHLC)
-                if 'open' in stock_data.columns:
-                    state.append(stock_data['open'].values[0])
-                if 'high' in stock_data.columns:
-                    state.append(stock_data['high'].values[0])
-                if 'low' in stock_data.columns:
-                    state.append(stock_data['low'].values[0])
-                if 'close' in stock_data.columns:
-                    state.append(stock_data['close'].values[0])
-                
-                # 添加技术指标
-                for tech in self.tech_indicator_list:
-                    if tech in stock_data.columns:
-                        state.append(stock_data[tech].values[0])
-            else:
-                # 如果没有该日期的数据，用0填充
-                # 4个基本特征 + 技术指标数量
-                state.extend([0] * (4 + len(self.tech_indicator_list)))
-        
-        # 添加当前持仓量
-        state.extend(self.holdings)
-        
-        # 添加现金余额
-        state.append(self.cash_balance)
-        
-        # 添加净值
-        state.append(self.total_asset)
-        
-        # 添加市场波动指标
-        state.append(self.turbulence)
-        
-        return np.array(state)
+        # 价格和技术指标特征直接取当天的张量切片，之后依次为持仓量、现金余额、净值和市场波动指标
+        return np.concatenate([
+            self.market_tensor[self._day_index()].ravel(),
+            self.holdings,
+            [self.cash_balance, self.total_asset, self.turbulence]
+        ])
     
     def _get_close_prices(self):
-        """获取当天所有ETF的收盘价"""
-        current_date = self._get_date()
-        df_today = self.data[self.data['date'] == current_date]
-        
-        # 创建一个与持仓顺序一致的收盘价向量
-        close_prices = []
-        for i in range(self.stock_dim):
-            stock_data = df_today[df_today['tic'] == df_today['tic'].unique()[i]]
-            if not stock_data.empty and 'close' in stock_data.columns:
-                close_prices.append(stock_data['close'].values[0])
-            else:
-                close_prices.append(0)
-        
-        return np.array(close_prices)
+        """获取当天所有ETF的收盘价（顺序与tickers一致）"""
+        return self.close_matrix[self._day_index()].copy()
     
     def step(self, actions):
         """
@@ -244,17 +268,10 @@ class ETFTradingEnv(gym.Env):
         
         # 获取当天日期
         current_date = self._get_date()
-        df_today = self.data[self.data['date'] == current_date]
-        
-        # 检查是否有当天的数据
-        if df_today.empty:
-            print(f"当前日期 {current_date} 没有交易数据")
-            self.day += 1
-            return self._get_observation(), 0, self.terminal, {}
         
         # 检查市场波动情况
-        if 'turbulence' in df_today.columns:
-            self.turbulence = df_today['turbulence'].values[0]
+        if self.turbulence_series is not None:
+            self.turbulence = self.turbulence_series[self._day_index()]
         
         # 获取当天的收盘价
         close_prices = self._get_close_prices()
@@ -266,48 +283,34 @@ class ETFTradingEnv(gym.Env):
         if self.turbulence_threshold is not None and self.turbulence > self.turbulence_threshold:
             actions = -np.ones(self.stock_dim)
         
-        # 记录交易活动
-        trade_actions = []
-        trades_list = []
-        
         # 计算目标权重
         target_weights = (actions + 1) / 2  # 将动作从[-1,1]映射到[0,1]
         
-        # 对每个ETF执行交易
-        for i in range(self.stock_dim):
-            if close_prices[i] > 0:  # 确保有效价格
-                # 计算目标持仓
-                current_value = self.holdings[i] * close_prices[i]
-                target_value = self.total_asset * target_weights[i]
-                trade_value = target_value - current_value
-                
-                # 计算交易量
-                trade_shares = int(trade_value / close_prices[i])
-                
-                # 限制单次交易量
-                trade_shares = np.clip(trade_shares, -self.hmax, self.hmax)
-                
-                # 执行交易
-                if trade_shares != 0:
-                    # 计算交易成本
-                    transaction_cost = abs(trade_shares * close_prices[i] * self.transaction_cost_pct)
-                    
-                    # 更新持仓和现金
-                    self.holdings[i] += trade_shares
-                    self.cash_balance -= (trade_shares * close_prices[i] + transaction_cost)
-                    self.cost += transaction_cost
-                    
-                    # 记录交易
-                    trade_actions.append({
-                        'date': current_date,
-                        'tic': df_today['tic'].unique()[i],
-                        'action': 'buy' if trade_shares > 0 else 'sell',
-                        'shares': abs(trade_shares),
-                        'price': close_prices[i],
-                        'cost': transaction_cost
-                    })
-                    
-                    trades_list.append(trade_actions[-1])
+        # 对所有ETF同时计算目标持仓和交易量，只对价格有效的ETF交易
+        valid = close_prices > 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            current_value = self.holdings * close_prices
+            target_value = self.total_asset * target_weights
+            trade_value = target_value - current_value
+            trade_shares = np.where(valid, np.trunc(trade_value / np.where(valid, close_prices, 1.0)), 0.0)
+        
+        # 限制单次交易量
+        trade_shares = np.clip(trade_shares, -self.hmax, self.hmax)
+        traded = trade_shares != 0
+        
+        # 计算交易成本
+        trade_amount = trade_shares[traded] * close_prices[traded]
+        transaction_cost = np.abs(trade_amount * self.transaction_cost_pct)
+        
+        # 更新持仓和现金；现金和成本按ETF顺序逐笔累计，与逐只交易的浮点结果完全一致
+        self.holdings[traded] += trade_shares[traded]
+        self.cash_balance = np.subtract.accumulate(
+            np.concatenate(([self.cash_balance], trade_amount + transaction_cost)))[-1]
+        self.cost = np.add.accumulate(np.concatenate(([self.cost], transaction_cost)))[-1]
+        
+        # 记录交易
+        trades_list = self._log_trades(np.flatnonzero(traded), trade_shares[traded], close_prices[traded],
+                                       transaction_cost)
         
         # 更新总资产价值
         self.total_asset = self.cash_balance + np.sum(self.holdings * close_prices)
@@ -318,9 +321,7 @@ class ETFTradingEnv(gym.Env):
         # 记录到内存
         self.asset_memory.append(self.total_asset)
         self.date_memory.append(current_date)
-        self.actions_memory.extend(trade_actions)
         self.rewards_memory.append(reward)
-        self.trades.extend(trades_list)
         
         # 前进到下一天
         self.day += 1
@@ -339,6 +340,49 @@ class ETFTradingEnv(gym.Env):
             'cost': self.cost
         }
     
+    def _log_trades(self, tic_index, shares, prices, costs):
+        """
+        将本步的交易写入预分配的交易日志数组
+        
+        返回:
+            本步交易记录的字典列表（未开启log_trades时为空列表）
+        """
+        count = len(tic_index)
+        start = self.trade_count
+        self.trade_count += count
+        if not self.log_trades or count == 0:
+            return []
+        
+        log = self.trade_log[start:start + count]
+        log['day'] = self._day_index()
+        log['tic'] = tic_index
+        log['shares'] = shares
+        log['price'] = prices
+        log['cost'] = costs
+        return self._trade_records(start, start + count)
+    
+    def _trade_records(self, start, end):
+        """将交易日志数组中[start, end)的交易转换为字典列表"""
+        log = self.trade_log[start:end]
+        return [{
+            'date': self.dates[day],
+            'tic': self.tickers[tic],
+            'action': 'buy' if shares > 0 else 'sell',
+            'shares': abs(int(shares)),
+            'price': price,
+            'cost': cost
+        } for day, tic, shares, price, cost in zip(log['day'], log['tic'], log['shares'], log['price'], log['cost'])]
+    
+    @property
+    def actions_memory(self):
+        """全部交易记录的字典列表（需开启log_trades）"""
+        return self._trade_records(0, self.trade_count) if self.log_trades else []
+    
+    @property
+    def trades(self):
+        """全部交易记录的字典列表（需开启log_trades）"""
+        return self.actions_memory
+    
     def _calculate_reward(self):
         """
         计算奖励
@@ -437,7 +481,39 @@ class ETFTradingEnv(gym.Env):
         """
         e = DummyVecEnv([lambda: self])
         return e
-    
+
+    def get_batched_env(self, num_envs=8, episode_length=None, random_start=True, seed=None):
+        """
+        获取在同一份市场数据上同时模拟多个投资组合的批量环境
+
+        参数:
+            num_envs: 同时模拟的投资组合数量
+            episode_length: 每个回合的交易天数，为None时交易到数据结束
+            random_start: 是否为每个回合随机选择起始交易日
+            seed: 随机数种子
+
+        返回:
+            BatchedETFTradingEnv实例（Stable-Baselines的VecEnv）
+        """
+        from src.strategies.rl_model_finrl.applications.stock_trading.batched_env import BatchedETFTradingEnv
+        return BatchedETFTradingEnv(self, num_envs=num_envs, episode_length=episode_length,
+                                    random_start=random_start, seed=seed)
+
+    def get_subproc_env(self, num_envs=None, start_method=None, seed=None):
+        """
+        获取多进程向量化环境，市场数据张量放在共享内存中，各子进程零拷贝挂载
+
+        参数:
+            num_envs: 子进程数量，默认为CPU核数
+            start_method: 多进程启动方式
+            seed: 随机数种子
+
+        返回:
+            SharedSubprocVecEnv实例，close()时释放共享内存
+        """
+        from src.strategies.rl_model_finrl.applications.stock_trading.shared_env import make_subproc_env
+        return make_subproc_env(self, num_envs=num_envs, start_method=start_method, seed=seed)
+
     def save_asset_memory(self):
         """
         将资产记忆保存为DataFrame
@@ -464,11 +540,19 @@ class ETFTradingEnv(gym.Env):
         返回:
             包含交易记录的DataFrame
         """
-        if not self.actions_memory:
+        if not self.log_trades or self.trade_count == 0:
             return pd.DataFrame()
         
         # 创建DataFrame
-        df_actions = pd.DataFrame(self.actions_memory)
+        log = self.trade_log[:self.trade_count]
+        df_actions = pd.DataFrame({
+            'date': [self.dates[day] for day in log['day']],
+            'tic': self.tickers[log['tic']],
+            'action': np.where(log['shares'] > 0, 'buy', 'sell'),
+            'shares': np.abs(log['shares']),
+            'price': log['price'],
+            'cost': log['cost']
+        })
         
         return df_actions
     
@@ -524,6 +608,6 @@ class ETFTradingEnv(gym.Env):
             'num_trading_days': len(df_asset),
             'final_value': df_asset['portfolio_value'].iloc[-1],
             'initial_value': df_asset['portfolio_value'].iloc[0],
-            'total_trades': len(self.trades),
+            'total_trades': self.trade_count,
             'total_dividend': self.total_dividend  # 更新为分红总额
         }
\ No newline at end of file
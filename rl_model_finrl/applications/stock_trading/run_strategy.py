@@ -10,6 +10,7 @@ from stable_baselines3 import PPO, A2C, DDPG, TD3, SAC, DQN
 from stable_baselines3.common.callbacks import BaseCallback, EvalCallback
 
 from src.strategies.rl_model_finrl.meta.data_processors import DataProcessor
+from src.strategies.rl_model_finrl.meta.preprocessor import PanelFeatureEngineer, FeatureStore
 from src.strategies.rl_model_finrl.applications.stock_trading.etf_env import ETFTradingEnv
 from src.strategies.rl_model_finrl.agents.stablebaseline3 import DQNAgent
 from src.strategies.rl_model_finrl.agents.elegantrl import PPOAgent
@@ -25,6 +26,7 @@ from src.strategies.rl_model_finrl.config import (
     TECHNICAL_INDICATORS_LIST,
     TICKER_LIST,
     MODEL_SAVE_PATH,
+    DATA_SAVE_PATH,
     NUM_EPISODES,
     TENSORBOARD_LOG_PATH
 )
@@ -39,13 +41,14 @@ class TensorboardCallback(BaseCallback):
         self.rewards = []
         
     def _on_step(self) -> bool:
-        # 获取最近的奖励
-        if len(self.model.env.envs[0].rewards_memory) > 0:
-            latest_reward = self.model.env.envs[0].rewards_memory[-1]
+        # 获取第一个环境最近的奖励；用get_attr读取，DummyVecEnv和多进程的SubprocVecEnv都适用
+        rewards_memory = self.model.env.get_attr('rewards_memory', [0])[0]
+        if len(rewards_memory) > 0:
+            latest_reward = rewards_memory[-1]
             self.rewards.append(latest_reward)
             # 记录到tensorboard
             self.logger.record('train/reward', latest_reward)
-            self.logger.record('train/portfolio_value', self.model.env.envs[0].total_asset)
+            self.logger.record('train/portfolio_value', self.model.env.get_attr('total_asset', [0])[0])
             
         return True
 
@@ -100,6 +103,95 @@ def prepare_etf_data(
     return df
 
 
+def prepare_etf_market_data(
+    processor: DataProcessor, 
+    ticker_list: List[str], 
+    start_date: str, 
+    end_date: str,
+    data_source: str = "tushare",
+    technical_indicator_list: List[str] = TECHNICAL_INDICATORS_LIST,
+    use_cache: bool = True,
+    adjust: str = "qfq",
+    clean_kwargs: Optional[Dict[str, Any]] = None,
+    use_turbulence: bool = True,
+    turbulence_window: int = 252
+) -> Dict[str, Any]:
+    """
+    准备ETF交易环境的市场数据
+    
+    按ETF分组计算技术指标和市场波动指标，直接生成ETFTradingEnv的market_data。
+    结果按(ETF列表、日期区间、指标列表、数据源、处理器版本、数据频率、复权类型、
+    清洗参数、波动指标设置、指标定义)缓存在FeatureStore中，
+    之后相同参数的训练、回测和评估直接以内存映射读取，不再下载和计算特征。
+    结束日期不早于今天时数据可能还不完整，不读取也不写入缓存。
+    
+    参数:
+        processor: 数据处理器
+        ticker_list: ETF代码列表
+        start_date: 开始日期
+        end_date: 结束日期
+        data_source: 数据源
+        technical_indicator_list: 技术指标列表
+        use_cache: 是否使用特征缓存
+        adjust: 复权类型，传给processor.download_data
+        clean_kwargs: 传给processor.clean_data的清洗参数（如是否删除缺失值），需可JSON序列化
+        use_turbulence: 是否计算多资产波动指标
+        turbulence_window: 波动指标的历史窗口长度
+        
+    返回:
+        ETFTradingEnv.get_market_data()格式的市场数据字典
+    """
+    logger = logging.getLogger(__name__)
+    if not ticker_list:
+        ticker_list = TICKER_LIST
+    clean_kwargs = clean_kwargs or {}
+    engineer = PanelFeatureEngineer(
+        technical_indicator_list,
+        use_turbulence=use_turbulence,
+        turbulence_window=turbulence_window
+    )
+    
+    def build():
+        df = processor.download_data(
+            ticker_list=ticker_list,
+            start_date=start_date,
+            end_date=end_date,
+            data_source=data_source,
+            adjust=adjust
+        )
+        df = processor.clean_data(df, **clean_kwargs)
+        return engineer.build_market_data(df)
+    
+    if not use_cache:
+        return build()
+    if pd.Timestamp(end_date).normalize() >= pd.Timestamp.today().normalize():
+        logger.info(f"结束日期{end_date}不早于今天，当天数据可能不完整，不使用特征缓存")
+        return build()
+    
+    version = [type(processor).__name__, PanelFeatureEngineer.VERSION]
+    options = {
+        'time_interval': getattr(processor, 'time_interval', None),
+        'adjust': adjust,
+        'clean': clean_kwargs,
+        'use_turbulence': engineer.use_turbulence,
+        'turbulence_window': engineer.turbulence_window,
+        'definitions': engineer.definitions,
+    }
+    key = FeatureStore.make_key(ticker_list, start_date, end_date, technical_indicator_list, version,
+                                data_source, options)
+    store = FeatureStore(os.path.join(DATA_SAVE_PATH, "feature_store"))
+    info = {
+        'tickers': list(ticker_list),
+        'start_date': start_date,
+        'end_date': end_date,
+        'indicators': list(technical_indicator_list),
+        'data_source': data_source,
+        'version': version,
+        'options': options,
+    }
+    return store.get_or_build(key, build, info=info)
+
+
 def run_etf_strategy(
     start_date: str = TRAIN_START_DATE,
     end_date: str = TRAIN_END_DATE,
@@ -133,10 +225,11 @@ def run_etf_strategy(
         turbulence_threshold: 市场波动阈值
         if_store_model: 是否存储模型
         num_episodes: 训练回合数
-        **kwargs: 传递给agent的其他参数
+        **kwargs: 传递给agent的其他参数（n_envs: 并行采样的环境数，ppo_elegant使用批量环境，
+            Stable-Baselines3智能体使用多进程；use_feature_cache: 是否使用特征缓存，默认True）
         
     返回:
-        训练好的模型
+        训练好的模型（训练用的向量化环境在返回前已关闭，继续训练需先用set_env设置新环境）
     """
     # 设置日志
     logging.basicConfig(level=logging.INFO)
@@ -153,18 +246,21 @@ def run_etf_strategy(
     
     # 准备数据
     logger.info(f"准备ETF数据: {start_date} 到 {end_date}")
-    df = prepare_etf_data(
+    market_data = prepare_etf_market_data(
         processor=processor,
         ticker_list=ticker_list or TICKER_LIST,
         start_date=start_date,
         end_date=end_date,
-        data_source=data_source
+        data_source=data_source,
+        technical_indicator_list=technical_indicator_list,
+        use_cache=kwargs.get('use_feature_cache', True)
     )
     
     # 创建ETF交易环境
-    stock_dimension = len(df['tic'].unique())
+    stock_dimension = len(market_data['tickers'])
     env = ETFTradingEnv(
-        df=df,
+        df=None,
+        market_data=market_data,
         stock_dim=stock_dimension,
         hmax=100,
         initial_amount=initial_amount,
@@ -175,112 +271,124 @@ def run_etf_strategy(
         day_trade=True,
         reward_type='sharpe',
         cash_penalty_proportion=0.1,
+        log_trades=False,  # 训练时不记录逐笔交易
     )
     
-    # 创建向量化环境
-    env_vec = env.get_sb_env()
-    
-    # 创建智能体
-    if agent.lower() == "ppo_elegant":
-        # ElegantRL PPO实现
-        model = PPOAgent(
-            env=env_vec,
-            model_name=model_name,
-            learning_rate=kwargs.get('learning_rate', 0.0003),
-            gamma=kwargs.get('gamma', 0.99),
-            tensorboard_log=TENSORBOARD_LOG_PATH
-        )
-    elif agent.lower() == "dqn":
-        # Stable-Baselines3 DQN实现
-        model = DQNAgent(
-            env=env_vec,
-            model_name=model_name,
-            learning_rate=kwargs.get('learning_rate', 0.0001),
-            gamma=kwargs.get('gamma', 0.99),
-            tensorboard_log=TENSORBOARD_LOG_PATH
-        )
-    elif agent.lower() == "ppo":
-        # Stable-Baselines3 PPO实现
-        model = PPO(
-            "MlpPolicy",
-            env_vec,
-            verbose=1,
-            learning_rate=kwargs.get('learning_rate', 0.0003),
-            gamma=kwargs.get('gamma', 0.99),
-            tensorboard_log=TENSORBOARD_LOG_PATH
-        )
-    elif agent.lower() == "a2c":
-        # Stable-Baselines3 A2C实现
-        model = A2C(
-            "MlpPolicy",
-            env_vec,
-            verbose=1,
-            learning_rate=kwargs.get('learning_rate', 0.0007),
-            gamma=kwargs.get('gamma', 0.99),
-            tensorboard_log=TENSORBOARD_LOG_PATH
-        )
-    elif agent.lower() == "ddpg":
-        # Stable-Baselines3 DDPG实现
-        model = DDPG(
-            "MlpPolicy",
-            env_vec,
-            verbose=1,
-            learning_rate=kwargs.get('learning_rate', 0.0001),
-            gamma=kwargs.get('gamma', 0.99),
-            tensorboard_log=TENSORBOARD_LOG_PATH
-        )
-    elif agent.lower() == "sac":
-        # Stable-Baselines3 SAC实现
-        model = SAC(
-            "MlpPolicy",
-            env_vec,
-            verbose=1,
-            learning_rate=kwargs.get('learning_rate', 0.0003),
-            gamma=kwargs.get('gamma', 0.99),
-            tensorboard_log=TENSORBOARD_LOG_PATH
-        )
+    # 创建向量化环境；n_envs大于1时，ElegantRL PPO在同一份市场数据上批量模拟多个投资组合，
+    # 其他智能体用多进程采样，各进程共享同一份放在共享内存中的市场数据
+    n_envs = kwargs.get('n_envs', 1)
+    if n_envs > 1 and agent.lower() == "ppo_elegant":
+        env_vec = env.get_batched_env(num_envs=n_envs)
+    elif n_envs > 1:
+        env_vec = env.get_subproc_env(num_envs=n_envs)
     else:
-        raise ValueError(f"不支持的智能体类型: {agent}")
+        env_vec = env.get_sb_env()
     
-    # 创建回调
-    callback = TensorboardCallback()
+    try:
+        # 创建智能体
+        if agent.lower() == "ppo_elegant":
+            # ElegantRL PPO实现
+            model = PPOAgent(
+                env=env_vec,
+                model_name=model_name,
+                learning_rate=kwargs.get('learning_rate', 0.0003),
+                gamma=kwargs.get('gamma', 0.99),
+                tensorboard_log=TENSORBOARD_LOG_PATH
+            )
+        elif agent.lower() == "dqn":
+            # Stable-Baselines3 DQN实现
+            model = DQNAgent(
+                env=env_vec,
+                model_name=model_name,
+                learning_rate=kwargs.get('learning_rate', 0.0001),
+                gamma=kwargs.get('gamma', 0.99),
+                tensorboard_log=TENSORBOARD_LOG_PATH
+            )
+        elif agent.lower() == "ppo":
+            # Stable-Baselines3 PPO实现
+            model = PPO(
+                "MlpPolicy",
+                env_vec,
+                verbose=1,
+                learning_rate=kwargs.get('learning_rate', 0.0003),
+                gamma=kwargs.get('gamma', 0.99),
+                tensorboard_log=TENSORBOARD_LOG_PATH
+            )
+        elif agent.lower() == "a2c":
+            # Stable-Baselines3 A2C实现
+            model = A2C(
+                "MlpPolicy",
+                env_vec,
+                verbose=1,
+                learning_rate=kwargs.get('learning_rate', 0.0007),
+                gamma=kwargs.get('gamma', 0.99),
+                tensorboard_log=TENSORBOARD_LOG_PATH
+            )
+        elif agent.lower() == "ddpg":
+            # Stable-Baselines3 DDPG实现
+            model = DDPG(
+                "MlpPolicy",
+                env_vec,
+                verbose=1,
+                learning_rate=kwargs.get('learning_rate', 0.0001),
+                gamma=kwargs.get('gamma', 0.99),
+                tensorboard_log=TENSORBOARD_LOG_PATH
+            )
+        elif agent.lower() == "sac":
+            # Stable-Baselines3 SAC实现
+            model = SAC(
+                "MlpPolicy",
+                env_vec,
+                verbose=1,
+                learning_rate=kwargs.get('learning_rate', 0.0003),
+                gamma=kwargs.get('gamma', 0.99),
+                tensorboard_log=TENSORBOARD_LOG_PATH
+            )
+        else:
+            raise ValueError(f"不支持的智能体类型: {agent}")
     
-    # 创建模型保存路径
-    if not os.path.exists(MODEL_SAVE_PATH):
-        os.makedirs(MODEL_SAVE_PATH)
+        # 创建回调
+        callback = TensorboardCallback()
     
-    # 训练模型
-    logger.info(f"开始训练模型: {model_name}")
+        # 创建模型保存路径
+        if not os.path.exists(MODEL_SAVE_PATH):
+            os.makedirs(MODEL_SAVE_PATH)
     
-    # 根据不同模型类型采用不同的训练方法
-    if agent.lower() in ["ppo_elegant"]:
-        # ElegantRL训练方法
-        model.train(
-            total_timesteps=num_episodes * 100,
-            eval_freq=1000,
-            n_eval_episodes=5,
-            log_interval=100
-        )
-    else:
-        # Stable-Baselines3训练方法
-        model.learn(
-            total_timesteps=num_episodes * 100,
-            callback=callback,
-            tb_log_name=model_name
-        )
+        # 训练模型
+        logger.info(f"开始训练模型: {model_name}")
     
-    # 保存模型
-    if if_store_model:
+        # 根据不同模型类型采用不同的训练方法
         if agent.lower() in ["ppo_elegant"]:
-            # ElegantRL模型保存
-            model_path = os.path.join(MODEL_SAVE_PATH, f"{model_name}.pt")
-            model.save(model_path)
+            # ElegantRL训练方法
+            model.train(
+                total_timesteps=num_episodes * 100,
+                eval_freq=1000,
+                n_eval_episodes=5,
+                log_interval=100
+            )
         else:
-            # Stable-Baselines3模型保存
-            model_path = os.path.join(MODEL_SAVE_PATH, f"{model_name}.zip")
-            model.save(model_path)
+            # Stable-Baselines3训练方法
+            model.learn(
+                total_timesteps=num_episodes * 100,
+                callback=callback,
+                tb_log_name=model_name
+            )
+    
+        # 保存模型
+        if if_store_model:
+            if agent.lower() in ["ppo_elegant"]:
+                # ElegantRL模型保存
+                model_path = os.path.join(MODEL_SAVE_PATH, f"{model_name}.pt")
+                model.save(model_path)
+            else:
+                # Stable-Baselines3模型保存
+                model_path = os.path.join(MODEL_SAVE_PATH, f"{model_name}.zip")
+                model.save(model_path)
         
-        logger.info(f"模型已保存至: {model_path}")
+            logger.info(f"模型已保存至: {model_path}")
+    finally:
+        # 释放训练环境：多进程环境的子进程和共享内存需显式关闭
+        env_vec.close()
     
     # 绘制训练曲线
     if len(callback.rewards) > 0:
@@ -0,0 +1,184 @@
+import os
+import numpy as np
+from multiprocessing import resource_tracker, shared_memory
+from stable_baselines3.common.vec_env import SubprocVecEnv
+from typing import Any, Dict, List, Optional
+
+
+# 重建ETFTradingEnv所需的构造参数（与环境的同名属性对应）
+ENV_PARAMS = (
+    'stock_dim', 'hmax', 'initial_amount', 'transaction_cost_pct', 'reward_scaling', 'state_space',
+    'action_space', 'tech_indicator_list', 'turbulence_threshold', 'day_trade', 'risk_free_rate',
+    'lookback', 'reward_type', 'cash_penalty_proportion', 'log_trades'
+)
+
+
+class SharedMarketData:
+    """
+    放在POSIX共享内存中的市场数据
+
+    将ETFTradingEnv预处理好的market_tensor、close_matrix和turbulence_series各复制一次到共享内存，
+    子进程通过spec（共享内存名称、形状和数据类型）以只读视图零拷贝地挂载，
+    无需序列化整个DataFrame，内存占用也不随子进程数量增加。
+    创建者负责在不再使用时调用close()释放共享内存。
+    """
+
+    ARRAYS = ('market_tensor', 'close_matrix', 'turbulence_series')
+
+    def __init__(self, market_data: Dict[str, Any]):
+        """
+        参数:
+            market_data: ETFTradingEnv.get_market_data()的返回值
+        """
+        self._blocks = []
+        arrays = {}
+        try:
+            for name in self.ARRAYS:
+                array = market_data.get(name)
+                if array is None:
+                    arrays[name] = None
+                    continue
+                array = np.ascontiguousarray(array)
+                block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                self._blocks.append(block)
+                np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+                arrays[name] = (block.name, array.shape, array.dtype.str)
+        except Exception:
+            self.close()
+            raise
+
+        # spec只包含少量元数据，可以廉价地传给子进程
+        self.spec = {
+            'pid': os.getpid(),
+            'dates': list(market_data['dates']),
+            'tickers': np.asarray(market_data['tickers']),
+            'feature_columns': list(market_data['feature_columns']),
+            'arrays': arrays,
+        }
+
+    @property
+    def nbytes(self) -> int:
+        """共享内存总字节数"""
+        return sum(block.size for block in self._blocks)
+
+    @staticmethod
+    def attach(spec: Dict[str, Any], track: bool = True):
+        """
+        按spec挂载共享内存中的市场数据
+
+        Python 3.13之前挂载共享内存也会在当前进程的resource_tracker中登记，
+        当前进程退出时其resource_tracker会删除共享内存。multiprocessing子进程与创建者共用
+        同一个resource_tracker，不受影响；Ray worker等独立进程挂载时应传track=False，
+        否则worker退出后创建者的共享内存即被删除。
+
+        参数:
+            spec: SharedMarketData.spec
+            track: 是否由当前进程的resource_tracker管理挂载的共享内存
+
+        返回:
+            (market_data, blocks) 元组，market_data中的数组是共享内存的只读视图，
+            blocks为共享内存句柄，需在数组使用期间保持引用
+        """
+        market_data = {key: spec[key] for key in ('dates', 'tickers', 'feature_columns')}
+        blocks = []
+        for name, meta in spec['arrays'].items():
+            if meta is None:
+                market_data[name] = None
+                continue
+            block_name, shape, dtype = meta
+            block = shared_memory.SharedMemory(name=block_name)
+            if not track and os.getpid() != spec.get('pid'):
+                resource_tracker.unregister(block._name, 'shared_memory')
+            blocks.append(block)
+            array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            array.flags.writeable = False
+            market_data[name] = array
+        return market_data, blocks
+
+    def close(self):
+        """释放共享内存"""
+        for block in self._blocks:
+            try:
+                block.close()
+                block.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class SharedEnvFactory:
+    """
+    在子进程中创建挂载共享市场数据的环境
+
+    可序列化的环境构造函数，只携带环境类、构造参数和共享内存spec。
+    track与SharedMarketData.attach的同名参数相同，在非multiprocessing子进程中创建环境时设为False。
+    """
+
+    def __init__(self, env_class, spec: Dict[str, Any], env_kwargs: Dict[str, Any], seed: Optional[int] = None,
+                 track: bool = True):
+        self.env_class = env_class
+        self.spec = spec
+        self.env_kwargs = env_kwargs
+        self.seed = seed
+        self.track = track
+
+    def __call__(self):
+        market_data, blocks = SharedMarketData.attach(self.spec, track=self.track)
+        env = self.env_class(df=None, market_data=market_data, **self.env_kwargs)
+        # 环境存在期间保持共享内存的映射
+        env.shared_blocks = blocks
+        if self.seed is not None:
+            env.seed(self.seed)
+        return env
+
+
+class SharedSubprocVecEnv(SubprocVecEnv):
+    """关闭时同时释放共享市场数据的SubprocVecEnv"""
+
+    def __init__(self, env_fns, shared_data: SharedMarketData, start_method: Optional[str] = None):
+        self.shared_data = shared_data
+        try:
+            super().__init__(env_fns, start_method=start_method)
+        except Exception:
+            shared_data.close()
+            raise
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self.shared_data.close()
+
+
+def make_subproc_env(
+    env,
+    num_envs: Optional[int] = None,
+    start_method: Optional[str] = None,
+    seed: Optional[int] = None
+) -> SharedSubprocVecEnv:
+    """
+    以共享内存中的市场数据创建多进程向量化环境
+
+    参数:
+        env: 作为模板的ETFTradingEnv，子进程中的环境使用相同的构造参数
+        num_envs: 子进程数量，默认为CPU核数
+        start_method: 多进程启动方式，默认与SubprocVecEnv一致（forkserver或spawn）
+        seed: 随机数种子，第i个子进程的环境使用seed + i
+
+    返回:
+        SharedSubprocVecEnv实例
+    """
+    num_envs = num_envs or os.cpu_count() or 1
+    env_kwargs = {name: getattr(env, name) for name in ENV_PARAMS}
+    shared_data = SharedMarketData(env.get_market_data())
+    env_fns: List[SharedEnvFactory] = [
+        SharedEnvFactory(type(env), shared_data.spec, env_kwargs, None if seed is None else seed + i)
+        for i in range(num_envs)
+    ]
+    return SharedSubprocVecEnv(env_fns, shared_data, start_method=start_method)
@@ -36,6 +36,12 @@ import numpy as np
 from abc import ABC, abstractmethod
 from typing import Dict, List, Tuple, Union, Optional
 
+from src.strategies.rl_model_finrl.meta.preprocessor.rolling_kernels import (
+    rolling_mean_deviation,
+    add_turbulence_column,
+)
+from src.strategies.rl_model_finrl.meta.preprocessor.panel_features import PanelFeatureEngineer
+
 class DataProcessor(ABC):
     """
     数据处理器基类
@@ -43,6 +49,12 @@ class DataProcessor(ABC):
     定义了数据处理的通用接口，所有特定数据源的处理器都应该继承这个类
     """
     
+    # 包含多只ETF的长表默认计算的技术指标（与单只ETF时添加的列相同）
+    DEFAULT_INDICATORS = [
+        'macd', 'macd_signal', 'macd_hist', 'rsi', 'cci', 'sma20',
+        'bollinger_upper', 'bollinger_lower', 'atr', 'daily_return'
+    ]
+    
     @abstractmethod
     def download_data(self, **kwargs) -> pd.DataFrame:
         """
@@ -69,16 +81,28 @@ class DataProcessor(ABC):
         """
         pass
     
-    def add_technical_indicators(self, data: pd.DataFrame) -> pd.DataFrame:
+    def add_technical_indicators(
+        self, 
+        data: pd.DataFrame, 
+        tech_indicator_list: Optional[List[str]] = None
+    ) -> pd.DataFrame:
         """
         添加技术指标
         
+        指定了指标列表或数据包含多只ETF（有tic列）时，由PanelFeatureEngineer按ETF分组计算，
+        滚动窗口不会跨越不同ETF，指标定义与下面单只ETF的计算相同。
+        
         参数:
             data: 原始价格数据DataFrame
+            tech_indicator_list: 技术指标列表，为None时添加默认指标
             
         返回:
             添加技术指标后的数据DataFrame
         """
+        if tech_indicator_list is not None or ('tic' in data.columns and data['tic'].nunique() > 1):
+            indicators = self.DEFAULT_INDICATORS if tech_indicator_list is None else tech_indicator_list
+            return PanelFeatureEngineer(indicators, use_turbulence=False, definitions='pandas').compute(data)
+        
         df = data.copy()
         
         # 确保列名标准化
@@ -111,7 +135,7 @@ class DataProcessor(ABC):
         # 计算CCI (商品通道指标)
         df['tp'] = (df[high_col] + df[low_col] + df[price_col]) / 3
         df['tp_ma'] = df['tp'].rolling(window=20).mean()
-        mean_dev = df['tp'].rolling(window=20).apply(lambda x: abs(x - x.mean()).mean())
+        mean_dev = rolling_mean_deviation(df['tp'], 20)
         df['cci'] = (df['tp'] - df['tp_ma']) / (0.015 * mean_dev)
         
         # 计算布林带
@@ -134,6 +158,20 @@ class DataProcessor(ABC):
         
         return df
     
+    def add_turbulence(self, data: pd.DataFrame, window: int = 252) -> pd.DataFrame:
+        """
+        添加多资产市场波动指标
+        
+        参数:
+            data: 包含tic列、以日期为索引的长表
+            window: 估计收益率均值和协方差的历史窗口长度
+            
+        返回:
+            添加turbulence列后的数据DataFrame
+        """
+        price_col = 'close' if 'close' in data.columns else 'Close'
+        return add_turbulence_column(data, window=window, price_col=price_col)
+    
     def data_split(
         self, 
         df: pd.DataFrame, 
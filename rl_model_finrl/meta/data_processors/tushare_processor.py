@@ -6,6 +6,7 @@ import os
 from typing import List, Tuple, Dict, Optional
 import logging
 
+from src.data.trade_calendar import TradeCalendar
 from src.strategies.rl_model_finrl.config import (
     TUSHARE_TOKEN,
     DATA_SAVE_PATH,
@@ -50,16 +51,21 @@ class TushareProcessor:
         ticker_list: List[str], 
         start_date: str, 
         end_date: str,
-        adjust: str = "qfq"  # 前复权
+        adjust: str = "qfq",  # 前复权
+        use_cache: bool = True
     ) -> Dict[str, pd.DataFrame]:
         """
         下载ETF日线数据
         
+        下载的数据按(代码, 复权类型, 日期区间)保存为CSV，use_cache为True时优先读取已保存的文件。
+        结束日期不早于今天时当天数据可能还未发布，不读取也不保存CSV。
+        
         参数:
             ticker_list: ETF代码列表
             start_date: 开始日期，格式'YYYY-MM-DD'
             end_date: 结束日期，格式'YYYY-MM-DD'
             adjust: 复权类型，默认前复权'qfq'
+            use_cache: 是否读取已保存的数据
             
         返回:
             字典，包含每个ETF代码及其对应的数据框
@@ -70,8 +76,19 @@ class TushareProcessor:
         # 转换日期格式，将横线替换为空
         start_date_ts = start_date.replace("-", "")
         end_date_ts = end_date.replace("-", "")
+        cacheable = pd.Timestamp(end_date).normalize() < pd.Timestamp.today().normalize()
         
         for ticker in ticker_list:
+            file_name = f"{ticker}_{adjust}_daily_{start_date_ts}_{end_date_ts}.csv"
+            file_path = os.path.join(self.data_path, file_name)
+            if use_cache and cacheable and os.path.exists(file_path):
+                try:
+                    etf_data_dict[ticker] = pd.read_csv(file_path, index_col='date', parse_dates=['date'])
+                    self.logger.info(f"读取已保存的 {ticker} 数据: {file_path}")
+                    continue
+                except Exception as e:
+                    self.logger.warning(f"读取 {file_path} 失败，重新下载: {str(e)}")
+            
             try:
                 # 使用Tushare获取ETF日线数据
                 self.logger.info(f"下载 {ticker} 的数据...")
@@ -124,11 +141,10 @@ class TushareProcessor:
                 etf_data_dict[ticker] = df
                 self.logger.info(f"成功下载 {ticker} 的数据，共 {len(df)} 行")
                 
-                # 保存到CSV
-                file_name = f"{ticker}_daily_{start_date_ts}_{end_date_ts}.csv"
-                file_path = os.path.join(self.data_path, file_name)
-                df.to_csv(file_path)
-                self.logger.info(f"数据已保存到 {file_path}")
+                # 保存到CSV，之后相同参数的下载直接读取
+                if cacheable:
+                    df.to_csv(file_path)
+                    self.logger.info(f"数据已保存到 {file_path}")
                 
             except Exception as e:
                 self.logger.error(f"下载 {ticker} 时出错: {str(e)}")
@@ -307,17 +323,9 @@ class TushareProcessor:
         返回:
             交易日历DataFrame
         """
-        start_date_ts = start_date.replace("-", "")
-        end_date_ts = end_date.replace("-", "")
-        
         try:
-            trading_cal = self.pro.trade_cal(
-                exchange='SSE',
-                start_date=start_date_ts,
-                end_date=end_date_ts,
-                is_open=1  # 只获取交易日
-            )
-            return trading_cal
+            # 使用本地交易日历，只返回交易日
+            return TradeCalendar.shared('SSE', pro=self.pro).trade_cal(start_date, end_date)
         except Exception as e:
             self.logger.error(f"获取交易日历时出错: {str(e)}")
             return pd.DataFrame()
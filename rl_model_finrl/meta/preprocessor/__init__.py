@@ -6,6 +6,8 @@
 主要组件:
 - FeatureEngineer: 金融特征工程工具
 - DataNormalizer: 数据归一化处理器
+- PanelFeatureEngineer: 多ETF面板特征工程，一次计算所有ETF的指标并构建环境所需的市场数据张量
+- FeatureStore: 按内容哈希寻址、可内存映射读取的市场数据缓存
 
 主要功能:
 - 技术指标计算与特征工程
@@ -16,8 +18,12 @@
 
 from src.strategies.rl_model_finrl.meta.preprocessor.feature_engineer import FeatureEngineer
 from src.strategies.rl_model_finrl.meta.preprocessor.data_normalizer import DataNormalizer
+from src.strategies.rl_model_finrl.meta.preprocessor.panel_features import PanelFeatureEngineer
+from src.strategies.rl_model_finrl.meta.preprocessor.feature_store import FeatureStore
 
 __all__ = [
     'FeatureEngineer',
-    'DataNormalizer'
+    'DataNormalizer',
+    'PanelFeatureEngineer',
+    'FeatureStore'
 ] 
\ No newline at end of file
@@ -3,6 +3,12 @@ import numpy as np
 import talib
 from typing import Dict, List, Tuple, Union, Optional
 
+from src.strategies.rl_model_finrl.meta.preprocessor.rolling_kernels import (
+    rolling_mean_deviation,
+    add_turbulence_column,
+)
+from src.strategies.rl_model_finrl.meta.preprocessor.panel_features import PanelFeatureEngineer
+
 class FeatureEngineer:
     """
     金融特征工程类
@@ -10,6 +16,13 @@ class FeatureEngineer:
     用于计算和添加金融技术指标和特征
     """
     
+    # 包含多只ETF的长表计算的技术指标（列名、参数和计算方式与TA-Lib分支相同）
+    PANEL_INDICATORS = [
+        'macd', 'macd_signal', 'macd_hist', 'rsi_6', 'rsi_14', 'rsi_30', 'cci', 'adx',
+        'boll_upper', 'boll_middle', 'boll_lower', 'atr', 'sma_5', 'sma_10', 'sma_20', 'sma_60',
+        'willr', 'roc', 'obv', 'daily_return', 'volatility'
+    ]
+    
     def __init__(self, 
                  use_technical_indicators: bool = True,
                  use_vix: bool = False,
@@ -66,12 +79,19 @@ class FeatureEngineer:
         """
         添加技术指标
         
+        包含多只ETF的长表（有tic列）由PanelFeatureEngineer按ETF分组计算，
+        滚动窗口不会跨越不同ETF，结果与对每只ETF单独调用本方法一致。
+        
         参数:
             data: 价格数据DataFrame
             
         返回:
             添加技术指标后的DataFrame
         """
+        if 'tic' in data.columns and data['tic'].nunique() > 1:
+            indicators = [name for name in self.PANEL_INDICATORS if name != 'obv' or 'volume' in data.columns]
+            return PanelFeatureEngineer(indicators, use_turbulence=False, definitions='talib').compute(data)
+        
         df = data.copy()
         
         # 确保列名标准化
@@ -147,7 +167,7 @@ class FeatureEngineer:
             # CCI
             df['tp'] = (df[high_col] + df[low_col] + df[price_col]) / 3
             df['tp_ma'] = df['tp'].rolling(window=20).mean()
-            mean_dev = df['tp'].rolling(window=20).apply(lambda x: abs(x - x.mean()).mean())
+            mean_dev = rolling_mean_deviation(df['tp'], 20)
             df['cci'] = (df['tp'] - df['tp_ma']) / (0.015 * mean_dev)
             
             # 布林带
@@ -210,6 +230,9 @@ class FeatureEngineer:
         """
         添加市场波动指标
         
+        包含多个ETF的长表（有tic列）计算多资产马氏距离波动指标；
+        单个资产的数据计算收益率的滚动方差。
+        
         参数:
             data: 原始数据DataFrame
             window: 计算窗口
@@ -217,16 +240,17 @@ class FeatureEngineer:
         返回:
             添加波动指标后的DataFrame
         """
+        price_col = 'close' if 'close' in data.columns else 'Close'
+        if 'tic' in data.columns and data['tic'].nunique() > 1:
+            return add_turbulence_column(data, window=window, price_col=price_col)
+        
         df = data.copy()
         
         # 计算收益率
-        price_col = 'close' if 'close' in df.columns else 'Close'
         df['return'] = df[price_col].pct_change()
         
-        # 计算波动指标
-        df['turbulence'] = df['return'].rolling(window=window).apply(
-            lambda x: np.sum(np.square(x - x.mean())) / len(x)
-        )
+        # 计算波动指标（窗口内收益率的总体方差）
+        df['turbulence'] = df['return'].rolling(window=window).var(ddof=0)
         
         return df
     
@@ -0,0 +1,174 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FeatureStore:
+    """
+    按内容哈希寻址的特征缓存
+
+    以(ETF列表、日期区间、技术指标列表、数据源、处理器版本及其他影响特征的参数)的哈希作为键，
+    每个键对应一个目录，保存PanelFeatureEngineer.build_market_data()生成的市场数据：
+    数组各存为一个.npy文件，读取时以内存映射方式打开，无需反序列化即可直接交给ETFTradingEnv；
+    日期、ETF代码、特征列等元数据存为meta.json。
+    写入先在临时目录完成再整体重命名，读取时只会看到完整的缓存。
+    """
+
+    ARRAYS = ('market_tensor', 'close_matrix', 'turbulence_series')
+    META_FILE = 'meta.json'
+
+    def __init__(self, root: str):
+        """
+        参数:
+            root: 缓存根目录
+        """
+        self.root = root
+
+    @staticmethod
+    def make_key(
+        ticker_list: List[str],
+        start_date: str,
+        end_date: str,
+        tech_indicator_list: List[str],
+        version: Any,
+        data_source: str = '',
+        options: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        计算缓存键
+
+        参数:
+            ticker_list: ETF代码列表（顺序即张量中ETF的顺序，因此参与哈希）
+            start_date: 开始日期
+            end_date: 结束日期
+            tech_indicator_list: 技术指标列表
+            version: 处理器版本，指标计算方式变化时应改变
+            data_source: 数据源
+            options: 其他影响特征内容的参数（数据频率、复权类型、清洗方式、波动指标设置等），需可JSON序列化
+
+        返回:
+            十六进制哈希字符串
+        """
+        content = {
+            'tickers': list(ticker_list),
+            'start_date': pd.Timestamp(start_date).strftime('%Y-%m-%d'),
+            'end_date': pd.Timestamp(end_date).strftime('%Y-%m-%d'),
+            'indicators': list(tech_indicator_list),
+            'version': version,
+            'data_source': data_source,
+            'options': options or {},
+        }
+        payload = json.dumps(content, sort_keys=True, ensure_ascii=False).encode('utf-8')
+        return hashlib.sha256(payload).hexdigest()[:32]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(os.path.join(self._path(key), self.META_FILE))
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存的市场数据
+
+        参数:
+            key: 缓存键
+
+        返回:
+            与ETFTradingEnv.get_market_data()格式相同的字典，数组为只读内存映射；缓存不存在或损坏时返回None
+        """
+        path = self._path(key)
+        if not self.exists(key):
+            return None
+        try:
+            with open(os.path.join(path, self.META_FILE), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            market_data = {
+                'dates': list(pd.to_datetime(meta['dates'])),
+                'tickers': np.asarray(meta['tickers']),
+                'feature_columns': meta['feature_columns'],
+            }
+            for name in self.ARRAYS:
+                file_path = os.path.join(path, f'{name}.npy')
+                market_data[name] = np.load(file_path, mmap_mode='r') if os.path.exists(file_path) else None
+            return market_data
+        except Exception as e:
+            logger.warning(f"读取特征缓存{path}失败: {str(e)}")
+            return None
+
+    def save(self, key: str, market_data: Dict[str, Any], info: Optional[Dict[str, Any]] = None) -> str:
+        """
+        保存市场数据
+
+        参数:
+            key: 缓存键
+            market_data: PanelFeatureEngineer.build_market_data()的返回值
+            info: 额外记录在meta.json中的说明信息（如生成缓存的参数）
+
+        返回:
+            缓存目录
+        """
+        path = self._path(key)
+        tmp_path = f'{path}.tmp-{os.getpid()}'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        try:
+            for name in self.ARRAYS:
+                array = market_data.get(name)
+                if array is not None:
+                    np.save(os.path.join(tmp_path, f'{name}.npy'), np.ascontiguousarray(array))
+            meta = {
+                'dates': [pd.Timestamp(date).strftime('%Y-%m-%d') for date in market_data['dates']],
+                'tickers': [str(tic) for tic in market_data['tickers']],
+                'feature_columns': list(market_data['feature_columns']),
+                'info': info or {},
+            }
+            with open(os.path.join(tmp_path, self.META_FILE), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False)
+
+            # 其他进程可能已写入同一个键，内容相同，保留已有的缓存
+            if self.exists(key):
+                shutil.rmtree(tmp_path, ignore_errors=True)
+            else:
+                shutil.rmtree(path, ignore_errors=True)
+                try:
+                    os.replace(tmp_path, path)
+                except OSError:
+                    # 检查之后其他进程抢先写入了同一个键，目标目录非空时重命名失败
+                    if not self.exists(key):
+                        raise
+                    shutil.rmtree(tmp_path, ignore_errors=True)
+                    logger.info(f"特征缓存已由其他进程写入: {path}")
+                    return path
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        logger.info(f"特征缓存已保存: {path}")
+        return path
+
+    def get_or_build(self, key: str, build_fn: Callable[[], Dict[str, Any]],
+                     info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        读取缓存，不存在时调用build_fn生成并保存
+
+        参数:
+            key: 缓存键
+            build_fn: 生成市场数据的函数
+            info: 额外记录在meta.json中的说明信息
+
+        返回:
+            内存映射的市场数据字典
+        """
+        market_data = self.load(key)
+        if market_data is not None:
+            logger.info(f"使用特征缓存: {self._path(key)}")
+            return market_data
+        self.save(key, build_fn(), info)
+        return self.load(key)
@@ -0,0 +1,357 @@
+import re
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional
+
+from src.strategies.rl_model_finrl.meta.preprocessor.rolling_kernels import (
+    rolling_mean_deviation,
+    turbulence_index,
+)
+
+
+class _Panel:
+    """
+    按(tic, date)排序一次后的长表
+
+    每只ETF的行在排序后连续，第i只ETF的第j个交易日放在二维矩阵的(j, i)位置，
+    较短的ETF在末尾补NaN。对该矩阵按列做滚动、平移和指数平均，窗口不会跨越ETF边界。
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        dates = data['date'] if 'date' in data.columns else data.index
+        dates = pd.to_datetime(np.asarray(dates)).to_numpy()
+        tic_codes, self.tickers = pd.factorize(data['tic'])
+        self.tickers = np.asarray(self.tickers)
+
+        # lexsort是稳定排序，同一(tic, date)的多行保留第一行
+        order = np.lexsort((dates, tic_codes))
+        tic_sorted, date_sorted = tic_codes[order], dates[order]
+        duplicated = np.zeros(len(order), dtype=bool)
+        duplicated[1:] = (tic_sorted[1:] == tic_sorted[:-1]) & (date_sorted[1:] == date_sorted[:-1])
+
+        self.data = data
+        self.rows = order[~duplicated]
+        self.tic = tic_sorted[~duplicated]
+        self.date = date_sorted[~duplicated]
+
+        counts = np.bincount(self.tic, minlength=len(self.tickers))
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        self.pos = np.arange(len(self.rows)) - starts[self.tic]
+        self.length = int(counts.max()) if len(counts) else 0
+        self._fields = {}
+
+    def to_wide(self, values: np.ndarray) -> pd.DataFrame:
+        """排序后的一维数据转为(ETF内交易日序号, ETF)矩阵"""
+        matrix = np.full((self.length, len(self.tickers)), np.nan)
+        matrix[self.pos, self.tic] = values
+        return pd.DataFrame(matrix)
+
+    def to_long(self, wide: pd.DataFrame) -> np.ndarray:
+        """矩阵转回排序后的一维数据"""
+        return wide.to_numpy(dtype=float)[self.pos, self.tic]
+
+    def field(self, name: str) -> pd.DataFrame:
+        """原始列的矩阵（缓存）"""
+        if name not in self._fields:
+            if name not in self.data.columns:
+                raise ValueError(f"数据缺少计算技术指标所需的列: {name}")
+            self._fields[name] = self.to_wide(self.data[name].to_numpy(dtype=float)[self.rows])
+        return self._fields[name]
+
+
+class PanelFeatureEngineer:
+    """
+    多ETF面板特征工程
+
+    FeatureEngineer和DataProcessor的指标按单个序列计算，直接用于包含多只ETF的长表时
+    滚动窗口会跨越不同ETF。本类将长表按(tic, date)只排序一次，每个指标对所有ETF
+    一次向量化计算且不跨越ETF边界，结果与逐只ETF分别计算一致。
+
+    指标有两套定义（definitions参数）:
+        talib: 与TA-Lib一致（FeatureEngineer的TA-Lib分支）。RSI、ATR、ADX用Wilder平滑，
+            EMA以前N期的简单平均为初值，布林带用总体标准差，CCI默认14日
+        pandas: 与DataProcessor及FeatureEngineer的pandas实现一致。RSI、ATR、ADX用简单移动平均，
+            EMA以首日为初值，布林带用样本标准差，CCI默认20日
+
+    支持的指标名称（N为窗口长度，省略时使用默认值）:
+        macd, macd_signal, macd_hist, boll_ub/boll_upper/bollinger_upper, boll_lb/boll_lower/bollinger_lower,
+        boll_middle, close_N_sma, sma_N/smaN, rsi_N, cci_N, dx_N, adx_N, atr_N, willr_N, roc_N,
+        momentum_N, volatility_N, volatility（年化20日波动率）, daily_return, obv
+    """
+
+    PRICE_FIELDS = ['open', 'high', 'low', 'close']
+
+    # 指标计算方式或市场数据格式变化时递增，使FeatureStore中的旧缓存失效
+    VERSION = 2
+
+    DEFINITIONS = ('talib', 'pandas')
+
+    # 带窗口参数的指标及其默认窗口
+    DEFAULT_WINDOWS = {
+        'sma': 20, 'rsi': 14, 'cci': 14, 'dx': 14, 'adx': 14, 'atr': 14,
+        'willr': 14, 'roc': 10, 'momentum': 10, 'volatility': 20,
+    }
+    # pandas定义下与TA-Lib不同的默认窗口
+    PANDAS_WINDOWS = {'cci': 20}
+
+    ALIASES = {
+        'boll_upper': 'boll_ub', 'bollinger_upper': 'boll_ub',
+        'boll_lower': 'boll_lb', 'bollinger_lower': 'boll_lb',
+        'boll_middle': 'sma_20',
+    }
+
+    def __init__(
+        self,
+        tech_indicator_list: List[str],
+        use_turbulence: bool = True,
+        turbulence_window: int = 252,
+        definitions: str = 'talib'
+    ):
+        """
+        初始化面板特征工程器
+
+        参数:
+            tech_indicator_list: 技术指标列表
+            use_turbulence: 构建市场数据时是否计算多资产波动指标
+            turbulence_window: 波动指标的历史窗口长度
+            definitions: 指标定义，'talib'或'pandas'
+        """
+        if definitions not in self.DEFINITIONS:
+            raise ValueError(f"不支持的指标定义: {definitions}，可选: {self.DEFINITIONS}")
+        self.tech_indicator_list = list(tech_indicator_list)
+        self.use_turbulence = use_turbulence
+        self.turbulence_window = turbulence_window
+        self.definitions = definitions
+        # 提前解析指标名称，不支持的指标在构造时报错
+        self._specs = {name: self._parse(name) for name in self.tech_indicator_list}
+
+    def _parse(self, name: str):
+        """将指标名称解析为(指标类型, 窗口)"""
+        key = self.ALIASES.get(name, name)
+        if key in ('macd', 'macd_signal', 'macd_hist', 'boll_ub', 'boll_lb', 'daily_return', 'obv'):
+            return key, None
+        if key == 'volatility':
+            return 'annual_volatility', 20
+        match = re.fullmatch(r'close_(\d+)_sma', key) or re.fullmatch(r'sma_?(\d+)', key)
+        if match:
+            return 'sma', int(match.group(1))
+        match = re.fullmatch(r'([a-z]+)(?:_(\d+))?', key)
+        if match and match.group(1) in self.DEFAULT_WINDOWS:
+            kind = match.group(1)
+            if match.group(2):
+                return kind, int(match.group(2))
+            if self.definitions == 'pandas':
+                return kind, self.PANDAS_WINDOWS.get(kind, self.DEFAULT_WINDOWS[kind])
+            return kind, self.DEFAULT_WINDOWS[kind]
+        raise ValueError(f"不支持的技术指标: {name}")
+
+    @staticmethod
+    def _seeded_ewm(values: pd.DataFrame, alpha: float, seed_row: int, seed: pd.DataFrame) -> pd.DataFrame:
+        """
+        以第seed_row行的seed为初值做指数平均，之前的行为NaN
+
+        TA-Lib的EMA和Wilder平滑都以前若干期的简单平均作为初值，之后按alpha递推。
+        每只ETF的数据都从矩阵第0行开始，因此所有ETF的初值在同一行。
+        """
+        result = pd.DataFrame(np.nan, index=values.index, columns=values.columns)
+        if len(values) <= seed_row:
+            return result
+        start = values.iloc[seed_row:].copy()
+        start.iloc[0] = seed.iloc[seed_row]
+        result.iloc[seed_row:] = start.ewm(alpha=alpha, adjust=False).mean().to_numpy()
+        return result
+
+    def _wilder(self, values: pd.DataFrame, window: int, first_row: int = 1) -> pd.DataFrame:
+        """Wilder平滑（alpha=1/window），初值为从first_row起window期的简单平均"""
+        seed_row = first_row + window - 1
+        return self._seeded_ewm(values, 1 / window, seed_row, values.rolling(window).mean())
+
+    def _ema(self, values: pd.DataFrame, span: int, seed_row: Optional[int] = None) -> pd.DataFrame:
+        """EMA；talib定义以seed_row（默认span-1）行之前span期的简单平均为初值"""
+        if self.definitions == 'pandas':
+            return values.ewm(span=span, adjust=False).mean()
+        seed_row = span - 1 if seed_row is None else seed_row
+        return self._seeded_ewm(values, 2 / (span + 1), seed_row, values.rolling(span).mean())
+
+    @staticmethod
+    def _true_range(panel: _Panel) -> pd.DataFrame:
+        high, low, prev_close = panel.field('high'), panel.field('low'), panel.field('close').shift()
+        return pd.DataFrame(np.fmax(np.fmax(high - low, (high - prev_close).abs()), (low - prev_close).abs()))
+
+    def _directional_movement(self, panel: _Panel):
+        high, low = panel.field('high'), panel.field('low')
+        up_move = high.diff()
+        down_move = -low.diff()
+        pos_dm = up_move.where((up_move > down_move) & (up_move > 0), 0.0)
+        neg_dm = down_move.where((down_move > up_move) & (down_move > 0), 0.0)
+        return pos_dm, neg_dm, self._true_range(panel)
+
+    def _directional_index(self, panel: _Panel, window: int) -> pd.DataFrame:
+        pos_dm, neg_dm, tr = self._directional_movement(panel)
+        if self.definitions == 'pandas':
+            atr = tr.rolling(window).mean()
+            pos_di = 100 * pos_dm.rolling(window).mean() / atr
+            neg_di = 100 * neg_dm.rolling(window).mean() / atr
+        else:
+            # TA-Lib以第1到window-1期的和为初值，之后每期按Wilder方式平滑；DI为两个平滑和之比，
+            # 初值的缩放相互抵消，这里统一除以window以便用指数平均递推
+            seed_row = window - 1
+            smooth = [
+                self._seeded_ewm(x, 1 / window, seed_row, x.rolling(window - 1).sum() / window)
+                for x in (pos_dm, neg_dm, tr)
+            ]
+            pos_di = 100 * smooth[0] / smooth[2]
+            neg_di = 100 * smooth[1] / smooth[2]
+            # TA-Lib的DX从第window行开始
+            pos_di.iloc[:window] = np.nan
+        return 100 * (pos_di - neg_di).abs() / (pos_di + neg_di)
+
+    def _indicator(self, panel: _Panel, kind: str, window: Optional[int]) -> pd.DataFrame:
+        """计算一个指标的(ETF内交易日序号, ETF)矩阵"""
+        close = panel.field('close')
+        talib = self.definitions == 'talib'
+
+        if kind in ('macd', 'macd_signal', 'macd_hist'):
+            if talib:
+                # 与TA-Lib的MACD(12, 26, 9)一致：快慢线都在第25行以之前各自周期的简单平均为初值，
+                # 信号线在第33行以MACD前9期的简单平均为初值，三者都从第33行开始输出
+                macd = self._ema(close, 12, seed_row=25) - self._ema(close, 26)
+                signal = self._ema(macd, 9, seed_row=33)
+                macd = macd.where(signal.notna())
+            else:
+                macd = self._ema(close, 12) - self._ema(close, 26)
+                signal = self._ema(macd, 9)
+            if kind == 'macd':
+                return macd
+            return signal if kind == 'macd_signal' else macd - signal
+        if kind in ('boll_ub', 'boll_lb'):
+            sign = 1 if kind == 'boll_ub' else -1
+            return close.rolling(20).mean() + sign * 2 * close.rolling(20).std(ddof=0 if talib else 1)
+        if kind == 'sma':
+            return close.rolling(window).mean()
+        if kind == 'rsi':
+            delta = close.diff()
+            gain, loss = delta.clip(lower=0), (-delta).clip(lower=0)
+            if talib:
+                avg_gain, avg_loss = self._wilder(gain, window), self._wilder(loss, window)
+                return 100 * avg_gain / (avg_gain + avg_loss)
+            avg_gain, avg_loss = gain.rolling(window).mean(), loss.rolling(window).mean()
+            return 100 - 100 / (1 + avg_gain / avg_loss)
+        if kind == 'cci':
+            tp = (panel.field('high') + panel.field('low') + close) / 3
+            return (tp - tp.rolling(window).mean()) / (0.015 * rolling_mean_deviation(tp, window))
+        if kind == 'dx':
+            return self._directional_index(panel, window)
+        if kind == 'adx':
+            dx = self._directional_index(panel, window)
+            if talib:
+                # TA-Lib的ADX以第window到2*window-1行DX的简单平均为初值
+                return self._wilder(dx, window, first_row=window)
+            return dx.rolling(window).mean()
+        if kind == 'atr':
+            tr = self._true_range(panel)
+            return self._wilder(tr, window) if talib else tr.rolling(window).mean()
+        if kind == 'willr':
+            highest = panel.field('high').rolling(window).max()
+            lowest = panel.field('low').rolling(window).min()
+            return -100 * (highest - close) / (highest - lowest)
+        if kind == 'roc':
+            return (close / close.shift(window) - 1) * 100
+        if kind == 'momentum':
+            return close - close.shift(window)
+        if kind == 'volatility':
+            return close.pct_change(fill_method=None).rolling(window).std()
+        if kind == 'annual_volatility':
+            return close.pct_change(fill_method=None).rolling(window).std() * np.sqrt(252)
+        if kind == 'daily_return':
+            return close.pct_change(fill_method=None)
+        if kind == 'obv':
+            # 与TA-Lib一致：首日为当日成交量，之后按涨跌累加或减去成交量
+            direction = np.sign(close.diff())
+            direction.iloc[0] = 1
+            return (direction * panel.field('volume')).cumsum()
+        raise ValueError(f"不支持的技术指标: {kind}")
+
+    def _compute_wide(self, panel: _Panel) -> Dict[str, pd.DataFrame]:
+        """计算全部指标，相同的指标只计算一次"""
+        cache = {}
+        results = {}
+        for name, spec in self._specs.items():
+            if spec not in cache:
+                cache[spec] = self._indicator(panel, *spec)
+            results[name] = cache[spec]
+        return results
+
+    def compute(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        为长表添加技术指标列
+
+        参数:
+            data: 包含tic列的长表，日期为索引或date列
+
+        返回:
+            添加技术指标列后的DataFrame，行顺序与输入一致（重复的(tic, date)行指标为NaN）
+        """
+        df = data.copy()
+        panel = _Panel(df)
+        for name, wide in self._compute_wide(panel).items():
+            values = np.full(len(df), np.nan)
+            values[panel.rows] = panel.to_long(wide)
+            df[name] = values
+        return df
+
+    def build_market_data(self, data: pd.DataFrame, stock_dim: Optional[int] = None) -> Dict[str, Any]:
+        """
+        计算技术指标并构建ETFTradingEnv可直接使用的市场数据
+
+        价格和指标在每只ETF内先向前、再向后填充，仍缺失（如该日无数据）的位置为0。
+
+        参数:
+            data: 包含tic列和OHLC列的长表，日期为索引或date列
+            stock_dim: 使用的ETF数量（按在数据中首次出现的顺序取前stock_dim只），默认全部
+
+        返回:
+            与ETFTradingEnv.get_market_data()格式相同的字典，可作为其market_data参数：
+            dates、tickers、feature_columns、market_tensor（float32，形状为(交易日数, ETF数, 特征数)）、
+            close_matrix（float64收盘价，缺失为0）、turbulence_series
+        """
+        panel = _Panel(data)
+        stock_dim = len(panel.tickers) if stock_dim is None else stock_dim
+        dates = np.unique(panel.date)
+        day_index = np.searchsorted(dates, panel.date)
+        keep = panel.tic < stock_dim
+        day_index, tic_index = day_index[keep], panel.tic[keep]
+
+        price_fields = [field for field in self.PRICE_FIELDS if field in data.columns]
+        features = {field: panel.field(field) for field in price_fields}
+        features.update(self._compute_wide(panel))
+
+        market_tensor = np.zeros((len(dates), stock_dim, len(features)), dtype=np.float32)
+        for k, wide in enumerate(features.values()):
+            market_tensor[day_index, tic_index, k] = panel.to_long(wide.ffill().bfill())[keep]
+        np.nan_to_num(market_tensor, copy=False)
+
+        close_matrix = np.zeros((len(dates), stock_dim))
+        close_matrix[day_index, tic_index] = panel.to_long(panel.field('close'))[keep]
+
+        if self.use_turbulence:
+            prices = np.full((len(dates), stock_dim), np.nan)
+            prices[day_index, tic_index] = close_matrix[day_index, tic_index]
+            returns = pd.DataFrame(prices).pct_change(fill_method=None).to_numpy()
+            turbulence_series = turbulence_index(returns, self.turbulence_window)
+        elif 'turbulence' in data.columns:
+            # 与ETFTradingEnv一致，取每个交易日第一行的turbulence
+            first = pd.Series(data['turbulence'].to_numpy(), index=pd.to_datetime(np.asarray(
+                data['date'] if 'date' in data.columns else data.index)))
+            turbulence_series = first[~first.index.duplicated()].reindex(dates).to_numpy(dtype=float)
+        else:
+            turbulence_series = None
+
+        return {
+            'dates': list(pd.DatetimeIndex(dates)),
+            'tickers': panel.tickers[:stock_dim],
+            'feature_columns': list(features),
+            'market_tensor': market_tensor,
+            'close_matrix': close_matrix,
+            'turbulence_series': turbulence_series,
+        }
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Union
+
+
+def rolling_mean_deviation(
+    values: Union[pd.Series, pd.DataFrame, np.ndarray], window: int
+) -> Union[pd.Series, pd.DataFrame, np.ndarray]:
+    """
+    滚动平均绝对偏差（CCI的分母）
+
+    结果与 rolling(window).apply(lambda x: abs(x - x.mean()).mean()) 一致，
+    但所有窗口在滑动窗口视图上一次向量化计算，不再逐行调用Python函数。
+    二维输入沿第0轴（时间）按列分别计算。
+
+    参数:
+        values: 输入序列，或每列一个序列的二维数据
+        window: 窗口长度
+
+    返回:
+        与输入形状相同的结果，前window-1个值及含NaN的窗口为NaN；输入为Series/DataFrame时返回同索引的同类型对象
+    """
+    x = np.asarray(values, dtype=float)
+    out = np.full(x.shape, np.nan)
+    if len(x) >= window:
+        windows = sliding_window_view(x, window, axis=0)
+        out[window - 1:] = np.abs(windows - windows.mean(axis=-1, keepdims=True)).mean(axis=-1)
+    if isinstance(values, pd.Series):
+        return pd.Series(out, index=values.index, name=values.name)
+    if isinstance(values, pd.DataFrame):
+        return pd.DataFrame(out, index=values.index, columns=values.columns)
+    return out
+
+
+def turbulence_index(returns: np.ndarray, window: int = 252, chunk: int = 256) -> np.ndarray:
+    """
+    多资产市场波动指标（马氏距离）
+
+    第t天的波动指标为 (r_t - mu)' pinv(Sigma) (r_t - mu)，mu和Sigma为之前window天各资产收益率的
+    均值和协方差矩阵（无偏估计）。窗口内的一阶和二阶和随窗口滑动增量更新（加入新的一天、移出最早的一天），
+    协方差矩阵的伪逆按chunk天一批批量计算。
+
+    参数:
+        returns: 收益率矩阵，形状为(交易日数, 资产数)，NaN（如上市前）按0处理
+        window: 估计均值和协方差的历史窗口长度
+        chunk: 每批求伪逆的天数，用于控制内存占用
+
+    返回:
+        每个交易日的波动指标，前window天为0
+    """
+    returns = np.nan_to_num(np.asarray(returns, dtype=float))
+    if returns.ndim == 1:
+        returns = returns[:, None]
+    num_days, num_assets = returns.shape
+    turbulence = np.zeros(num_days)
+    if num_days <= window or window < 2:
+        return turbulence
+
+    history = returns[:window]
+    sum_returns = history.sum(axis=0)
+    sum_products = history.T @ history
+
+    batch = min(chunk, num_days - window)
+    covs = np.empty((batch, num_assets, num_assets))
+    deviations = np.empty((batch, num_assets))
+    start = window
+    for t in range(window, num_days):
+        k = t - start
+        mean = sum_returns / window
+        covs[k] = (sum_products - window * np.outer(mean, mean)) / (window - 1)
+        deviations[k] = returns[t] - mean
+
+        if k == batch - 1 or t == num_days - 1:
+            n = k + 1
+            inverse = np.linalg.pinv(covs[:n], hermitian=True)
+            turbulence[start:start + n] = np.einsum('ti,tij,tj->t', deviations[:n], inverse, deviations[:n])
+            start += n
+
+        # 窗口向后滑动一天
+        new, old = returns[t], returns[t - window]
+        sum_returns += new - old
+        sum_products += np.outer(new, new) - np.outer(old, old)
+
+    return turbulence
+
+
+def add_turbulence_column(data: pd.DataFrame, window: int = 252, price_col: str = 'close') -> pd.DataFrame:
+    """
+    为长表（每行一个交易日的一个资产，包含tic列，索引为日期）添加多资产波动指标列turbulence
+
+    参数:
+        data: 长表数据
+        window: 历史窗口长度
+        price_col: 价格列名
+
+    返回:
+        添加turbulence列后的DataFrame，同一交易日的所有资产取值相同
+    """
+    df = data.copy()
+    dates = df.index if 'date' not in df.columns else pd.Index(df['date'])
+    prices = pd.DataFrame({'date': np.asarray(dates), 'tic': df['tic'].to_numpy(), 'price': df[price_col].to_numpy()})
+    prices = prices.pivot_table(index='date', columns='tic', values='price', aggfunc='first').sort_index()
+
+    returns = prices.pct_change(fill_method=None).to_numpy()
+    turbulence = pd.Series(turbulence_index(returns, window), index=prices.index)
+    df['turbulence'] = turbulence.reindex(np.asarray(dates)).to_numpy()
+    return df
@@ -0,0 +1,179 @@
+import os
+import numpy as np
+import pandas as pd
+import backtrader as bt
+from loguru import logger
+
+
+class ContinuousFutureSeries:
+    """期货主力连续合约序列
+
+    以数组保存每个交易日主力合约的行情、合约代码以及换月时新旧合约的价差，
+    可按比例或差值前复权（保持最新价格不变，调整换月之前的历史价格）。
+    整个序列存取为单个npz文件，回测时一次读取即可生成数据源，无需重新拼接各合约数据。
+    """
+
+    # 行情数组的列
+    FIELDS = ('open', 'high', 'low', 'close', 'vol', 'amount', 'oi')
+    # 复权时需要调整的价格列
+    PRICE_FIELDS = ('open', 'high', 'low', 'close')
+    # 复权方式：none 不复权，ratio 比例复权，difference 差值复权
+    ADJUST_METHODS = ('none', 'ratio', 'difference')
+
+    def __init__(self, dates, values, contract_codes, contract_index, roll_ratio, roll_diff):
+        """
+        Args:
+            dates: 交易日数组，datetime64[D]
+            values: 行情数组，形状为(交易日数, len(FIELDS))
+            contract_codes: 出现过的主力合约代码数组
+            contract_index: 每个交易日主力合约在contract_codes中的下标
+            roll_ratio: 换月日新合约与旧合约在换月前一交易日的收盘价之比，非换月日为1
+            roll_diff: 换月日新合约与旧合约在换月前一交易日的收盘价之差，非换月日为0
+        """
+        self.dates = np.asarray(dates, dtype='datetime64[D]')
+        self.values = np.asarray(values, dtype=float)
+        self.contract_codes = np.asarray(contract_codes, dtype=str)
+        self.contract_index = np.asarray(contract_index, dtype=np.int16)
+        self.roll_ratio = np.asarray(roll_ratio, dtype=float)
+        self.roll_diff = np.asarray(roll_diff, dtype=float)
+
+    def __len__(self):
+        return len(self.dates)
+
+    @classmethod
+    def build(cls, continuous, history):
+        """由主力连续行情和各合约日线构建序列，换月价差只在此计算一次
+
+        Args:
+            continuous: 每个交易日一行的主力行情，包含trade_date/contract/roll及FIELDS列
+            history: 各合约日线长表，包含ts_code/trade_date/close
+        Returns:
+            ContinuousFutureSeries
+        """
+        contract_codes, contract_index = np.unique(continuous['contract'].to_numpy(dtype=str), return_inverse=True)
+        values = continuous[list(cls.FIELDS)].to_numpy(dtype=float)
+        close_col = cls.FIELDS.index('close')
+
+        roll_ratio = np.ones(len(continuous))
+        roll_diff = np.zeros(len(continuous))
+        rolls = np.flatnonzero(continuous['roll'].to_numpy(dtype=bool))
+        rolls = rolls[rolls > 0]
+        if len(rolls):
+            # 新合约在换月前一交易日的收盘价
+            closes = history.drop_duplicates(['ts_code', 'trade_date']).set_index(['ts_code', 'trade_date'])['close']
+            keys = pd.MultiIndex.from_arrays([continuous['contract'].to_numpy()[rolls],
+                                              continuous['trade_date'].to_numpy()[rolls - 1]])
+            new_close = closes.reindex(keys).to_numpy(dtype=float)
+            old_close = values[rolls - 1, close_col]
+            missing = np.isnan(new_close) | (old_close == 0)
+            if missing.any():
+                logger.warning(f"{int(missing.sum())}次换月缺少新合约前一交易日的收盘价，该次换月不做复权调整")
+            roll_ratio[rolls] = np.where(missing, 1.0, new_close / np.where(old_close == 0, 1.0, old_close))
+            roll_diff[rolls] = np.where(missing, 0.0, new_close - old_close)
+
+        dates = pd.to_datetime(continuous['trade_date'], format='%Y%m%d').to_numpy(dtype='datetime64[D]')
+        return cls(dates, values, contract_codes, contract_index, roll_ratio, roll_diff)
+
+    def save(self, path):
+        """保存为npz文件"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'wb') as f:
+            np.savez(f, dates=self.dates, values=self.values, contract_codes=self.contract_codes,
+                     contract_index=self.contract_index, roll_ratio=self.roll_ratio, roll_diff=self.roll_diff)
+        logger.info(f"主力连续合约序列已保存: {path}")
+
+    @classmethod
+    def load(cls, path):
+        """从npz文件加载，文件不存在或损坏时返回None"""
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as f:
+                return cls(f['dates'], f['values'], f['contract_codes'], f['contract_index'],
+                           f['roll_ratio'], f['roll_diff'])
+        except Exception as e:
+            logger.warning(f"读取主力连续合约序列{path}失败: {str(e)}")
+            return None
+
+    def slice(self, start_date, end_date):
+        """截取[start_date, end_date]区间的序列"""
+        start = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start_date).date(), 'D'), side='left')
+        end = np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end_date).date(), 'D'), side='right')
+        return ContinuousFutureSeries(self.dates[start:end], self.values[start:end], self.contract_codes,
+                                      self.contract_index[start:end], self.roll_ratio[start:end],
+                                      self.roll_diff[start:end])
+
+    @property
+    def contracts(self):
+        """每个交易日的主力合约代码"""
+        return self.contract_codes[self.contract_index]
+
+    @property
+    def roll_dates(self):
+        """换月日（新合约成为主力的第一个交易日）"""
+        rolls = np.flatnonzero(np.diff(self.contract_index) != 0) + 1
+        return self.dates[rolls]
+
+    def adjusted_values(self, adjust='none'):
+        """返回复权后的行情数组
+
+        Args:
+            adjust: 复权方式，none/ratio/difference
+        Returns:
+            np.ndarray: 与values形状相同，成交量、成交额、持仓量不做调整
+        """
+        if adjust not in self.ADJUST_METHODS:
+            raise ValueError(f"不支持的复权方式: {adjust}，可选: {self.ADJUST_METHODS}")
+        values = self.values.copy()
+        if adjust == 'none' or len(values) == 0:
+            return values
+
+        cols = [self.FIELDS.index(f) for f in self.PRICE_FIELDS]
+        # 每一行需要累计其之后所有换月的调整量（不含本行）
+        if adjust == 'ratio':
+            later = np.cumprod(self.roll_ratio[::-1])[::-1]
+            factor = np.append(later[1:], 1.0)
+            values[:, cols] *= factor[:, None]
+        else:
+            later = np.cumsum(self.roll_diff[::-1])[::-1]
+            offset = np.append(later[1:], 0.0)
+            values[:, cols] += offset[:, None]
+        return values
+
+    def to_frame(self, adjust='none'):
+        """转为以datetime为索引的DataFrame，包含行情列、contract和roll列"""
+        df = pd.DataFrame(self.adjusted_values(adjust), columns=list(self.FIELDS),
+                          index=pd.DatetimeIndex(self.dates.astype('datetime64[ns]'), name='datetime'))
+        df['contract'] = self.contracts
+        df['roll'] = np.concatenate([[False], np.diff(self.contract_index) != 0]) if len(df) else []
+        return df
+
+    def contract_mapping(self):
+        """交易日 -> 主力合约代码的字典"""
+        index = pd.DatetimeIndex(self.dates.astype('datetime64[ns]'))
+        return dict(zip(index, self.contracts.tolist()))
+
+    def to_feed(self, name, adjust='none'):
+        """生成backtrader数据源
+
+        数据源上附带contract_mapping字典，以及contract_codes/contract_index数组，
+        策略可通过 data.contract_codes[data.contract_index[len(data) - 1]] 获取当前主力合约。
+        """
+        df = self.to_frame(adjust).rename(columns={'vol': 'volume', 'oi': 'openinterest'})
+        data = bt.feeds.PandasData(
+            dataname=df,
+            datetime=None,  # 使用索引作为日期
+            open='open',
+            high='high',
+            low='low',
+            close='close',
+            volume='volume',
+            openinterest='openinterest',
+            name=name
+        )
+        data._name = name
+        data.ts_code = name
+        data.contract_mapping = self.contract_mapping()
+        data.contract_codes = self.contract_codes
+        data.contract_index = self.contract_index
+        return data
@@ -5,11 +5,18 @@ from loguru import logger
 import talib
 import tushare as ts
 import os
+import json
 import backtrader as bt
 import time
+from src.data.continuous_future import ContinuousFutureSeries
 
 class FutureDataLoader:
-    def __init__(self, ts_code=None, start_date=None, end_date=None, token=None):
+    # get_contract_price返回的价格字段（raw_data中的列名）
+    PRICE_FIELDS = ('open', 'high', 'low', 'close', 'vol', 'oi')
+    # 合约日线缓存的字段
+    HISTORY_FIELDS = 'ts_code,trade_date,open,high,low,close,vol,amount,oi'
+    
+    def __init__(self, ts_code=None, start_date=None, end_date=None, token=None, adjust='none'):
         """初始化期货数据加载器
         Args:
             ts_code: 期货合约代码，如 'M2405.DCE' 表示大连商品交易所2405豆粕合约
@@ -17,12 +24,35 @@ class FutureDataLoader:
             start_date: 开始日期，datetime对象
             end_date: 结束日期，datetime对象
             token: Tushare API token，如果不提供则从环境变量获取
+            adjust: 主力连续合约的复权方式，none 不复权，ratio 比例复权，difference 差值复权
         """
         self.ts_code = ts_code
+        if adjust not in ContinuousFutureSeries.ADJUST_METHODS:
+            raise ValueError(f"不支持的复权方式: {adjust}，可选: {ContinuousFutureSeries.ADJUST_METHODS}")
+        self.adjust = adjust
         self.start_date = start_date
         self.end_date = end_date
         self.future_code = 'M'  # 期货代码，如'M'代表豆粕
         self.contract_multiplier = 10  # 合约乘数，豆粕为10吨/手
+        self.exchange = 'DCE'  # 交易所
+        
+        # 主力合约判定参数
+        self.dominance_field = 'vol'  # 判定字段：vol(成交量) 或 oi(持仓量)
+        self.dominance_window = 5  # 判定字段的平滑窗口（交易日）
+        self.roll_days = 30  # 交割日前多少天切换主力合约
+        
+        # 合约日线、合约列表和主力连续序列的本地缓存
+        self.cache_dir = os.path.join('cache', 'futures')
+        self._meta = None
+        self._histories = {}  # 合约代码 -> 合约日线
+        self._history_updated = False
+        self.series = None  # 回测区间内的主力连续合约序列
+        self.dominant_contracts = []
+        
+        # 原始合约数据及(合约代码, 交易日)价格索引，首次查询价格时构建
+        self.raw_data = None
+        self._price_index = {}
+        self._price_values = None
         
         # 限流相关参数
         self.rate_limit = 300  # 每分钟最大请求次数
@@ -74,142 +104,267 @@ class FutureDataLoader:
                 return self._make_api_request(func, *args, **kwargs)
             raise
             
+    def _cache_path(self, filename):
+        """期货本地缓存文件路径"""
+        return os.path.join(self.cache_dir, filename)
+
+    def _load_meta(self):
+        """读取品种缓存元数据：各合约已下载到的日期、连续合约序列覆盖的区间"""
+        if self._meta is None:
+            path = self._cache_path(f"{self.future_code}_meta.json")
+            self._meta = {'history': {}, 'continuous': None}
+            if os.path.exists(path):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        self._meta.update(json.load(f))
+                except Exception as e:
+                    logger.warning(f"读取期货缓存元数据失败，将重新下载: {str(e)}")
+        return self._meta
+
+    def _save_meta(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self._cache_path(f"{self.future_code}_meta.json"), 'w', encoding='utf-8') as f:
+            json.dump(self._meta, f, ensure_ascii=False, indent=2)
+
+    def _get_contracts(self, end_date):
+        """获取品种的合约列表（带本地缓存）
+
+        缓存中已有交割日晚于回测结束日期的合约，或缓存为当天更新时直接使用缓存，
+        否则重新调用fut_basic。
+        Args:
+            end_date: 回测结束日期
+        Returns:
+            pd.DataFrame: 列为ts_code/list_date/last_ddate，日期为datetime，按交割日排序
+        """
+        path = self._cache_path(f"{self.future_code}_contracts.csv")
+        if os.path.exists(path):
+            contracts = pd.read_csv(path, dtype=str)
+            contracts['list_date'] = pd.to_datetime(contracts['list_date'])
+            contracts['last_ddate'] = pd.to_datetime(contracts['last_ddate'])
+            updated_today = datetime.fromtimestamp(os.path.getmtime(path)).date() == datetime.now().date()
+            if updated_today or contracts['last_ddate'].max() > end_date + pd.Timedelta(days=self.roll_days):
+                logger.info(f"使用缓存的{self.future_code}期货合约列表，共{len(contracts)}个合约")
+                return contracts
+
+        logger.info(f"正在获取{self.future_code}期货合约列表...")
+        contracts = self._make_api_request(
+            self.pro.fut_basic,
+            fut_code=f"{self.future_code}",
+            exchange=self.exchange
+        )
+        if contracts is None or contracts.empty:
+            logger.error(f"未获取到{self.future_code}期货合约数据")
+            return pd.DataFrame(columns=['ts_code', 'list_date', 'last_ddate'])
+
+        # 只保留有交割日期的具体月份合约
+        contracts = contracts[['ts_code', 'list_date', 'last_ddate']].dropna()
+        contracts['list_date'] = pd.to_datetime(contracts['list_date'])
+        contracts['last_ddate'] = pd.to_datetime(contracts['last_ddate'])
+        contracts = contracts.sort_values('last_ddate').reset_index(drop=True)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        contracts.assign(
+            list_date=contracts['list_date'].dt.strftime('%Y%m%d'),
+            last_ddate=contracts['last_ddate'].dt.strftime('%Y%m%d'),
+        ).to_csv(path, index=False)
+        logger.info(f"获取到{len(contracts)}个合约，已缓存到{path}")
+        return contracts
+
+    def _get_contract_history(self, contract):
+        """获取单个合约上市以来的完整日线（带本地缓存）
+
+        已交割合约只下载一次；未交割合约在缓存之后的新交易日做增量下载。
+        Args:
+            contract: 合约信息，包含ts_code/list_date/last_ddate
+        Returns:
+            pd.DataFrame: 合约日线，trade_date为YYYYMMDD字符串，按日期升序
+        """
+        ts_code = contract['ts_code']
+        if ts_code in self._histories:
+            return self._histories[ts_code]
+
+        meta = self._load_meta()
+        path = self._cache_path(f"{ts_code}.csv")
+        target = min(contract['last_ddate'], pd.Timestamp(datetime.now().date())).strftime('%Y%m%d')
+        fetched_until = meta['history'].get(ts_code)
+
+        cached = None
+        if fetched_until and os.path.exists(path):
+            cached = pd.read_csv(path, dtype={'ts_code': str, 'trade_date': str})
+
+        if cached is None or fetched_until < target:
+            fetch_start = contract['list_date'].strftime('%Y%m%d')
+            if cached is not None:
+                fetch_start = (pd.to_datetime(fetched_until) + pd.Timedelta(days=1)).strftime('%Y%m%d')
+            try:
+                df = self._make_api_request(
+                    self.pro.fut_daily,
+                    ts_code=ts_code,
+                    start_date=fetch_start,
+                    end_date=target,
+                    fields=self.HISTORY_FIELDS
+                )
+            except Exception as e:
+                logger.warning(f"下载合约{ts_code}日线失败: {str(e)}")
+                df = None
+
+            if df is not None:
+                frames = [f for f in (cached, df) if f is not None and not f.empty]
+                history = pd.concat(frames, ignore_index=True) if frames else df
+                history = history.drop_duplicates('trade_date', keep='last').sort_values('trade_date')
+                os.makedirs(self.cache_dir, exist_ok=True)
+                history.to_csv(path, index=False)
+                # 空结果同样记录，避免对无数据的合约重复请求
+                meta['history'][ts_code] = target
+                self._history_updated = True
+                cached = history
+                logger.info(f"合约{ts_code}日线已更新至{target}，共{len(history)}行")
+
+        if cached is None:
+            cached = pd.DataFrame(columns=self.HISTORY_FIELDS.split(','))
+        cached = cached.reset_index(drop=True)
+        self._histories[ts_code] = cached
+        return cached
+
+    def _compute_dominance(self, contracts, history):
+        """按成交量/持仓量向量化计算每个交易日的主力合约
+
+        取判定字段的滚动均值，在交割日前roll_days天之前仍可交易的合约中选最大者；
+        主力只向交割日更晚的合约切换，不回切。
+        Args:
+            contracts: 合约列表
+            history: 所有合约日线的长表
+        Returns:
+            pd.Series: 索引为交易日，值为当日主力合约代码
+        """
+        scores = history.pivot_table(index='trade_date', columns='ts_code',
+                                     values=self.dominance_field, aggfunc='last')
+        scores.index = pd.to_datetime(scores.index, format='%Y%m%d')
+        scores = scores.sort_index().rolling(self.dominance_window, min_periods=1).mean()
+
+        last_ddate = contracts.set_index('ts_code')['last_ddate'].reindex(scores.columns)
+        roll_deadline = (last_ddate - pd.Timedelta(days=self.roll_days)).to_numpy()
+        eligible = scores.index.to_numpy()[:, None] <= roll_deadline[None, :]
+        values = np.where(eligible, scores.to_numpy(dtype=float), np.nan)
+        valid = ~np.isnan(values).all(axis=1)
+        if not valid.any():
+            return pd.Series(dtype=object)
+
+        best = np.nanargmax(values[valid], axis=1)
+        ddates = np.maximum.accumulate(last_ddate.to_numpy()[best])
+        code_by_ddate = pd.Series(last_ddate.index, index=last_ddate.to_numpy())
+        code_by_ddate = code_by_ddate[~code_by_ddate.index.duplicated()]
+        return pd.Series(code_by_ddate.loc[ddates].to_numpy(), index=scores.index[valid])
+
+    def _dominance_params(self):
+        """主力合约判定参数，随主力连续序列一起缓存，参数变化时重新生成序列"""
+        return {
+            'dominance_field': self.dominance_field,
+            'dominance_window': self.dominance_window,
+            'roll_days': self.roll_days,
+        }
+
+    def _get_series(self, start_date, end_date):
+        """获取主力连续合约序列（带本地缓存）
+
+        缓存的序列覆盖回测区间、主力判定参数相同，且区间在序列生成日期之前时（区间内行情已全部确定），
+        直接读取npz文件，不再访问合约列表和合约日线；否则按需更新合约日线后重新生成。
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期
+        Returns:
+            ContinuousFutureSeries: 覆盖缓存区间的完整序列，失败时返回None
+        """
+        meta = self._load_meta()
+        path = self._cache_path(f"{self.future_code}_continuous.npz")
+        coverage = meta.get('continuous')
+        start, end = start_date.strftime('%Y%m%d'), end_date.strftime('%Y%m%d')
+        params = self._dominance_params()
+        covered = bool(coverage) and coverage['start'] <= start and coverage['end'] >= end and \
+            all(coverage.get(name) == value for name, value in params.items())
+
+        if covered and end < coverage.get('built', ''):
+            series = ContinuousFutureSeries.load(path)
+            if series is not None:
+                logger.info(f"使用缓存的{self.future_code}主力连续合约序列")
+                return series
+
+        contracts = self._get_contracts(end_date)
+        if contracts.empty:
+            return None
+
+        # 回测区间内可能成为主力、或换月后仍需查询价格的合约
+        relevant = contracts[(contracts['last_ddate'] >= start_date) &
+                             (contracts['list_date'] <= end_date)]
+        histories = [self._get_contract_history(row) for _, row in relevant.iterrows()]
+        histories = [h for h in histories if not h.empty]
+        if self._history_updated:
+            self._save_meta()
+
+        if covered and not self._history_updated:
+            series = ContinuousFutureSeries.load(path)
+            if series is not None:
+                logger.info(f"使用缓存的{self.future_code}主力连续合约序列")
+                return series
+
+        if not histories:
+            logger.error(f"未获取到{self.future_code}期货的合约日线数据")
+            return None
+
+        history = pd.concat(histories, ignore_index=True)
+        dominant = self._compute_dominance(relevant, history)
+        if dominant.empty:
+            return None
+
+        # 从各合约日线中取出当日主力合约的行情
+        keys = pd.MultiIndex.from_arrays([dominant.to_numpy(), dominant.index.strftime('%Y%m%d')],
+                                         names=['ts_code', 'trade_date'])
+        prices = history.drop_duplicates(['ts_code', 'trade_date']).set_index(['ts_code', 'trade_date'])
+        continuous = prices.reindex(keys).reset_index().rename(columns={'ts_code': 'contract'})
+        continuous = continuous.dropna(subset=['close']).reset_index(drop=True)
+        continuous['roll'] = continuous['contract'].ne(continuous['contract'].shift())
+        continuous.loc[0, 'roll'] = False
+
+        # 换月价差在此一次算好，之后任意复权方式都只需读取数组
+        series = ContinuousFutureSeries.build(continuous, history)
+        series.save(path)
+        meta['continuous'] = {'start': start, 'end': end, 'built': datetime.now().strftime('%Y%m%d'), **params}
+        self._save_meta()
+        logger.info(f"{self.future_code}主力连续合约序列已缓存 - 交易日: {len(series)}, "
+                    f"换月次数: {len(series.roll_dates)}")
+        return series
+
     def get_dominant_contracts(self):
         """获取指定时间段内的主力合约列表
         Returns:
-            list: 主力合约列表，每个元素为(合约代码, 开始日期, 结束日期)的元组
+            list: 主力合约列表，每个元素为包含ts_code/start_date/end_date的字典
         """
         if not self.start_date or not self.end_date:
             logger.error("未提供开始日期或结束日期")
             return []
             
         try:
-            # 确保开始和结束日期是 datetime64[ns] 类型
             start_date = pd.to_datetime(self.start_date)
             end_date = pd.to_datetime(self.end_date)
-            
-            # 根据结束月份确定是否需要获取下一个主力合约
-            end_month = end_date.month
-            next_month_map = {
-                1: 3,   # 1月份需要获取3月合约
-                3: 5,   # 3月份需要获取5月合约
-                5: 7,   # 5月份需要获取7月合约
-                7: 9,   # 7月份需要获取9月合约
-                9: 11,  # 9月份需要获取11月合约
-                11: 1   # 11月份需要获取次年1月合约
-            }
-            
-            # 如果结束月份在映射中，延长结束日期到下个月中旬
-            if end_month in next_month_map:
-                next_month = next_month_map[end_month]
-                if next_month == 1:  # 如果是次年1月合约
-                    extended_end = pd.Timestamp(year=end_date.year + 1, month=1, day=15)
-                else:
-                    extended_end = pd.Timestamp(year=end_date.year, month=next_month, day=15)
-                logger.info(f"结束月份为{end_month}月，延长数据获取至{extended_end.strftime('%Y-%m-%d')}以获取下一个主力合约")
-            else:
-                extended_end = end_date
-            
-            logger.info(f"开始获取主力合约列表 - 时间段: {start_date.date()} 至 {extended_end.date()}")
-            
-            # 获取所有可交易的合约
-            logger.info(f"正在获取{self.future_code}期货合约列表...")
-            contracts = self._make_api_request(
-                self.pro.fut_basic,
-                fut_code=f"{self.future_code}",
-                exchange='DCE'
-            )
-            
-            if contracts is None or contracts.empty:
-                logger.error(f"未获取到{self.future_code}期货合约数据")
+            logger.info(f"开始获取主力合约列表 - 时间段: {start_date.date()} 至 {end_date.date()}")
+
+            series = self._get_series(start_date, end_date)
+            if series is None or len(series) == 0:
+                logger.error(f"未获取到{self.future_code}期货的主力连续合约序列")
                 return []
-                
-            logger.info(f"获取到{len(contracts)}个合约")
-            logger.debug(f"合约列表:\n{contracts}")
-            
-            # 将日期字符串转换为datetime对象
-            contracts['last_ddate'] = pd.to_datetime(contracts['last_ddate'])
-            
-            # 按交割日期排序
-            contracts = contracts.sort_values('last_ddate')
-            logger.info(f"按交割日期排序后的合约列表:\n{contracts[['ts_code', 'last_ddate']]}")
-            
-            # 获取主力合约列表
-            dominant_contracts = []
-            current_date = start_date
-            
-            while current_date <= extended_end:  # 使用延长后的结束日期
-                logger.debug(f"处理日期: {current_date.date()}")
-                
-                # 找到当前日期可用的合约
-                available_contracts = contracts[
-                    (contracts['last_ddate'] > current_date) & 
-                    (contracts['last_ddate'] <= extended_end + pd.Timedelta(days=15))  # 确保合约在回测期间内
-                ]
-                
-                if len(available_contracts) == 0:
-                    logger.warning(f"在{current_date.date()}之后没有可用的合约")
-                    break
-                
-                # 获取每个合约的成交量数据
-                contract_volumes = []
-                for _, contract in available_contracts.iterrows():
-                    try:
-                        # 获取合约的成交量数据
-                        df = self._make_api_request(
-                            self.pro.fut_daily,
-                            ts_code=contract['ts_code'],
-                            start_date=current_date.strftime('%Y%m%d'),
-                            end_date=(current_date + pd.Timedelta(days=5)).strftime('%Y%m%d'),
-                            fields='ts_code,trade_date,vol'
-                        )
-                        
-                        if df is not None and not df.empty:
-                            avg_volume = df['vol'].mean()
-                            contract_volumes.append({
-                                'ts_code': contract['ts_code'],
-                                'last_ddate': contract['last_ddate'],
-                                'avg_volume': avg_volume
-                            })
-                    except Exception as e:
-                        logger.warning(f"获取合约{contract['ts_code']}成交量数据失败: {str(e)}")
-                        continue
-                
-                if not contract_volumes:
-                    logger.warning(f"在{current_date.date()}没有可用的合约成交量数据")
-                    break
-                
-                # 按成交量排序，选择成交量最大的合约
-                contract_volumes.sort(key=lambda x: x['avg_volume'], reverse=True)
-                dominant_contract = contract_volumes[0]
-                
-                logger.debug(f"选择的主力合约: {dominant_contract['ts_code']}, 交割日期: {dominant_contract['last_ddate'].date()}, 平均成交量: {dominant_contract['avg_volume']:.0f}")
-                
-                # 确定该合约的主力时间段
-                contract_start = current_date
-                # 提前30天切换主力合约
-                contract_end = min(extended_end, dominant_contract['last_ddate'] - pd.Timedelta(days=30))
-                
-                # 确保结束日期大于开始日期
-                if contract_end <= contract_start:
-                    logger.warning(f"合约{dominant_contract['ts_code']}的结束日期{contract_end.date()}小于等于开始日期{contract_start.date()}，跳过")
-                    break
-                
-                dominant_contracts.append({
-                    'ts_code': dominant_contract['ts_code'],
-                    'start_date': contract_start,
-                    'end_date': contract_end
-                })
-                
-                logger.debug(f"添加主力合约: {dominant_contract['ts_code']}, 时间段: {contract_start.date()} - {contract_end.date()}")
-                
-                # 更新当前日期为下一个合约的开始日期
-                current_date = contract_end + pd.Timedelta(days=1)
-                
-                # 防止死循环
-                if current_date > extended_end:
-                    break
-            
+            self.series = series.slice(start_date, end_date)
+
+            # 按连续的同一主力合约划分时间段
+            dates = pd.DatetimeIndex(self.series.dates.astype('datetime64[ns]'))
+            starts = np.flatnonzero(np.diff(self.series.contract_index, prepend=-1) != 0)
+            ends = np.append(starts[1:], len(dates)) - 1
+            dominant_contracts = [{
+                'ts_code': str(self.series.contract_codes[self.series.contract_index[s]]),
+                'start_date': dates[s],
+                'end_date': dates[e],
+            } for s, e in zip(starts, ends)]
+            self.dominant_contracts = dominant_contracts
+
             logger.info(f"最终获取到{len(dominant_contracts)}个主力合约")
             for contract in dominant_contracts:
                 logger.info(f"主力合约: {contract['ts_code']}, 时间段: {contract['start_date'].date()} - {contract['end_date'].date()}")
@@ -234,91 +389,16 @@ class FutureDataLoader:
             if not dominant_contracts:
                 logger.error(f"未找到{self.future_code}期货的主力合约")
                 raise ValueError(f"未找到{self.future_code}期货的主力合约")
-                
-            logger.info(f"获取到{self.future_code}期货主力合约列表:")
-            for contract in dominant_contracts:
-                logger.info(f"合约: {contract['ts_code']}, 时间段: {contract['start_date'].date()} - {contract['end_date'].date()}")
-            
-            # 获取每个合约的数据并拼接
-            all_data = []
-            
-            for contract in dominant_contracts:
-                try:
-                    # 获取合约数据 - 扩大时间范围，获取从开始日期到结束日期+30天的数据
-                    df = self._make_api_request(
-                        self.pro.fut_daily,
-                        ts_code=contract['ts_code'],
-                        start_date=contract['start_date'].strftime('%Y%m%d'),
-                        end_date=(contract['end_date'] + pd.Timedelta(days=30)).strftime('%Y%m%d'),
-                        fields='ts_code,trade_date,open,high,low,close,vol,amount,oi'  # 添加oi字段
-                    )
-                    
-                    if df is not None and not df.empty:
-                        # 添加合约信息
-                        df['contract'] = contract['ts_code']
-                        all_data.append(df)
-                        logger.info(f"成功加载合约{contract['ts_code']}的数据，行数: {len(df)}")
-                    else:
-                        logger.warning(f"合约{contract['ts_code']}没有数据")
-                        
-                except Exception as e:
-                    logger.error(f"加载合约{contract['ts_code']}数据时出错: {str(e)}")
-                    continue
-            
-            if not all_data:
-                logger.error("没有成功加载任何合约数据")
-                raise ValueError("没有成功加载任何合约数据")
-                
-            # 合并所有合约数据
-            combined_data = pd.concat(all_data, ignore_index=True)
-            
-            # 按日期排序
-            combined_data = combined_data.sort_values('trade_date')
-            
-            # 创建合约代码映射
-            self.contract_mapping = pd.Series(combined_data['contract'].values, index=pd.to_datetime(combined_data['trade_date'])).to_dict()
-            
-            # 保存原始数据用于查询 - 使用all_data而不是combined_data
-            self.raw_data = pd.concat(all_data, ignore_index=True)
-            
-            # 调整数据格式以符合backtrader要求
-            combined_data['datetime'] = pd.to_datetime(combined_data['trade_date'])
-            
-            # 重命名列名以符合backtrader需求
-            combined_data = combined_data.rename(columns={
-                'open': 'open',
-                'high': 'high',
-                'low': 'low',
-                'close': 'close',
-                'vol': 'volume',
-                'oi': 'openinterest'  # 持仓量
-            })
             
-            # 设置索引
-            combined_data.set_index('datetime', inplace=True)
-            
-            # 创建数据源
-            data = bt.feeds.PandasData(
-                dataname=combined_data,
-                datetime=None,  # 使用索引作为日期
-                open='open',
-                high='high',
-                low='low',
-                close='close',
-                volume='volume',
-                openinterest='openinterest',
-                name=f"{self.future_code}_DOMINANT"
-            )
-            
-            # 添加期货代码属性和合约映射
-            data._name = f"{self.future_code}_DOMINANT"
-            data.ts_code = f"{self.future_code}_DOMINANT"
-            data.contract_mapping = self.contract_mapping  # 添加合约映射字典
+            # 由主力连续序列直接生成数据源，每个交易日一行
+            name = f"{self.future_code}_DOMINANT"
+            data = self.series.to_feed(name, adjust=self.adjust)
+            self.contract_mapping = data.contract_mapping
             
             # 将数据加载器实例传递给数据源
             data.params.loader = self
             
-            logger.info(f"成功合并{len(dominant_contracts)}个合约的数据，总行数: {len(combined_data)}")
+            logger.info(f"成功合并{len(dominant_contracts)}个合约的数据，总行数: {len(self.series)}，复权方式: {self.adjust}")
             return data
             
         except Exception as e:
@@ -327,6 +407,37 @@ class FutureDataLoader:
             traceback.print_exc()
             raise
             
+    def _build_price_index(self):
+        """按(合约代码, 交易日)建立价格索引，查询时无需扫描raw_data
+
+        raw_data为各主力合约从主力开始日到结束日+30天的日线，换月后仍可查询旧合约价格。
+        首次查询价格时才读取合约日线。
+        """
+        contracts = self._get_contracts(pd.to_datetime(self.end_date))
+        contracts = {row['ts_code']: row for _, row in contracts.iterrows()}
+        all_data = []
+        for contract in self.dominant_contracts:
+            if contract['ts_code'] not in contracts:
+                continue
+            history = self._get_contract_history(contracts[contract['ts_code']])
+            dates = pd.to_datetime(history['trade_date'], format='%Y%m%d')
+            df = history[(dates >= contract['start_date']) &
+                         (dates <= contract['end_date'] + pd.Timedelta(days=30))].copy()
+            df['contract'] = contract['ts_code']
+            all_data.append(df)
+        # 读取时可能补充下载了合约日线，记录到元数据中
+        if self._history_updated:
+            self._save_meta()
+        self.raw_data = pd.concat(all_data, ignore_index=True) if all_data else \
+            pd.DataFrame(columns=self.HISTORY_FIELDS.split(',') + ['contract'])
+        self._price_values = self.raw_data[list(self.PRICE_FIELDS)].to_numpy(dtype=float)
+        self._price_index = {}
+        keys = zip(self.raw_data['contract'].values, self.raw_data['trade_date'].astype(str).values)
+        for row, key in enumerate(keys):
+            # 与原先的筛选逻辑一致，同一合约同一日期取第一条数据
+            self._price_index.setdefault(key, row)
+        logger.info(f"期货价格索引构建完成 - 记录数: {len(self._price_index)}")
+            
     def get_contract_price(self, contract_code, target_date):
         """获取指定合约在特定日期的价格数据
         Args:
@@ -340,24 +451,25 @@ class FutureDataLoader:
             if isinstance(target_date, str):
                 target_date = pd.to_datetime(target_date)
                 
-            # 从原始数据中筛选指定合约和日期的数据
-            mask = (self.raw_data['contract'] == contract_code) & (self.raw_data['trade_date'] == target_date.strftime('%Y%m%d'))
-            data = self.raw_data[mask]
+            if self._price_values is None:
+                self._build_price_index()
+                
+            # 从价格索引中查找指定合约和日期的数据
+            row = self._price_index.get((contract_code, target_date.strftime('%Y%m%d')))
             
-            if data.empty:
+            if row is None:
                 logger.warning(f"未找到合约{contract_code}在{target_date}的价格数据")
                 return None
                 
-            # 获取第一条匹配的数据
-            price_data = data.iloc[0]
+            open_price, high, low, close, volume, openinterest = self._price_values[row]
             
             return {
-                'open': price_data['open'],
-                'high': price_data['high'],
-                'low': price_data['low'],
-                'close': price_data['close'],
-                'volume': price_data['vol'],
-                'openinterest': price_data['oi']
+                'open': open_price,
+                'high': high,
+                'low': low,
+                'close': close,
+                'volume': volume,
+                'openinterest': openinterest
             }
             
         except Exception as e:
@@ -0,0 +1,225 @@
+import os
+import json
+import time
+import threading
+from bisect import bisect_right
+from datetime import datetime, date
+import pandas as pd
+import tushare as ts
+from loguru import logger
+
+
+class IndexConstituentStore:
+    """指数成分股及权重的本地存储
+
+    按月保存指数的成分权重快照（index_weight每月调整一次），在内存中按快照日期排序，
+    "截至某日的最新成分权重"直接二分查找得到。当前月份的新快照尚未入库时先返回上月快照，
+    同时在后台线程中获取新月份的数据。全市场股票基本信息（stock_basic）同样缓存到本地。
+    """
+
+    # 当前月份快照未发布时，两次检查之间的最小间隔（秒）
+    RECHECK_INTERVAL = 3600
+    # stock_basic缓存的有效天数
+    STOCK_BASIC_TTL_DAYS = 7
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, pro=None, cache_dir='cache'):
+        """
+        Args:
+            pro: Tushare pro_api实例，不提供时使用TUSHARE_TOKEN环境变量创建
+            cache_dir: 缓存目录
+        """
+        self.pro = pro
+        self.cache_dir = cache_dir
+        self.meta_file = os.path.join(cache_dir, 'index_weight_meta.json')
+        self._lock = threading.RLock()
+        self._months = {}  # 指数代码 -> 已获取过的月份集合(YYYYMM)，包括无数据的月份
+        self._snapshots = {}  # 指数代码 -> {快照日期: DataFrame}
+        self._snapshot_dates = {}  # 指数代码 -> 有序的快照日期列表
+        self._last_check = {}  # 指数代码 -> 最近一次检查当前月份的时间
+        self._refreshing = set()  # 正在后台刷新的指数
+        self._stock_basic = None
+        self._load_meta()
+
+    @classmethod
+    def shared(cls, pro=None):
+        """返回进程内共享的实例"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(pro=pro)
+            elif cls._shared.pro is None and pro is not None:
+                cls._shared.pro = pro
+            return cls._shared
+
+    def _get_pro(self):
+        if self.pro is None:
+            tushare_token = os.getenv('TUSHARE_TOKEN')
+            if not tushare_token:
+                raise ValueError("未设置TUSHARE_TOKEN环境变量")
+            ts.set_token(tushare_token)
+            self.pro = ts.pro_api()
+        return self.pro
+
+    @staticmethod
+    def _to_str(value):
+        """将datetime/date/'YYYY-MM-DD'/'YYYYMMDD'统一转换为YYYYMMDD字符串"""
+        if isinstance(value, (datetime, date)):
+            return value.strftime('%Y%m%d')
+        value = str(value)
+        if len(value) == 8 and value.isdigit():
+            return value
+        return pd.to_datetime(value).strftime('%Y%m%d')
+
+    @staticmethod
+    def _prev_month(month):
+        year, mon = int(month[:4]), int(month[4:])
+        return f"{year - 1}12" if mon == 1 else f"{year}{mon - 1:02d}"
+
+    def _cache_file(self, index_code):
+        return os.path.join(self.cache_dir, f'index_weight_{index_code}.csv')
+
+    def _load_meta(self):
+        try:
+            if os.path.exists(self.meta_file):
+                with open(self.meta_file, 'r') as f:
+                    self._months = {code: set(months) for code, months in json.load(f).items()}
+        except Exception as e:
+            logger.warning(f"读取指数成分缓存元数据失败: {str(e)}")
+
+    def _save(self, index_code):
+        """保存指数的全部快照及已获取月份"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            frames = [self._snapshots[index_code][d] for d in self._snapshot_dates[index_code]]
+            if frames:
+                pd.concat(frames, ignore_index=True).to_csv(self._cache_file(index_code), index=False)
+            with open(self.meta_file, 'w') as f:
+                json.dump({code: sorted(months) for code, months in self._months.items()}, f)
+        except Exception as e:
+            logger.warning(f"保存指数成分缓存失败: {str(e)}")
+
+    def _load_index(self, index_code):
+        """首次使用某指数时从本地文件读取全部快照"""
+        if index_code in self._snapshot_dates:
+            return
+        snapshots = {}
+        path = self._cache_file(index_code)
+        if os.path.exists(path):
+            try:
+                df = pd.read_csv(path, dtype={'index_code': str, 'con_code': str, 'trade_date': str})
+                snapshots = {d: g.reset_index(drop=True) for d, g in df.groupby('trade_date')}
+            except Exception as e:
+                logger.warning(f"读取指数{index_code}成分缓存失败: {str(e)}")
+                self._months.pop(index_code, None)
+        self._snapshots[index_code] = snapshots
+        self._snapshot_dates[index_code] = sorted(snapshots)
+
+    def _fetch_months(self, index_code, months):
+        """获取若干月份的成分权重快照并入库"""
+        months = sorted(months)
+        today = datetime.now().strftime('%Y%m%d')
+        month_end = pd.Period(f"{months[-1][:4]}-{months[-1][4:]}", freq='M').end_time.strftime('%Y%m%d')
+        end = min(month_end, today)
+        df = self._get_pro().index_weight(index_code=index_code, start_date=f"{months[0]}01", end_date=end)
+
+        with self._lock:
+            if df is not None and not df.empty:
+                df = df.astype({'trade_date': str, 'con_code': str})
+                for trade_date, group in df.groupby('trade_date'):
+                    self._snapshots[index_code][trade_date] = group.reset_index(drop=True)
+                self._snapshot_dates[index_code] = sorted(self._snapshots[index_code])
+            fetched = self._months.setdefault(index_code, set())
+            have = {d[:6] for d in self._snapshot_dates[index_code]}
+            current_month = today[:6]
+            for month in months:
+                # 当前月份的快照可能尚未发布，只有取到数据后才记为已获取
+                if month != current_month or month in have:
+                    fetched.add(month)
+            self._save(index_code)
+        logger.info(f"指数{index_code}成分权重已更新 - 月份: {months[0]} 至 {months[-1]}, "
+                    f"快照数: {len(self._snapshot_dates[index_code])}")
+
+    def _refresh_in_background(self, index_code, months):
+        if index_code in self._refreshing:
+            return
+        self._refreshing.add(index_code)
+        self._last_check[index_code] = time.time()
+
+        def run():
+            try:
+                self._fetch_months(index_code, months)
+            except Exception as e:
+                logger.warning(f"后台更新指数{index_code}成分权重失败: {str(e)}")
+            finally:
+                self._refreshing.discard(index_code)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _latest_snapshot(self, index_code, day):
+        dates = self._snapshot_dates[index_code]
+        i = bisect_right(dates, day)
+        return dates[i - 1] if i > 0 else None
+
+    def get_weights(self, index_code, as_of=None):
+        """获取截至as_of（默认今天）最新的指数成分权重
+
+        Args:
+            index_code: 指数代码，如 '000016.SH'
+            as_of: 日期，datetime/date或字符串
+        Returns:
+            pd.DataFrame: 与pro.index_weight格式一致，列为index_code/con_code/trade_date/weight，
+                          未获取到数据时为空DataFrame
+        """
+        day = self._to_str(as_of or datetime.now())
+        month = day[:6]
+        current_month = datetime.now().strftime('%Y%m')
+        with self._lock:
+            self._load_index(index_code)
+            fetched = self._months.get(index_code, set())
+            missing = [m for m in (self._prev_month(month), month) if m not in fetched]
+            snapshot = self._latest_snapshot(index_code, day)
+
+            if missing == [current_month] and snapshot is not None:
+                # 新的调整月份：先返回已有的最新快照，后台获取新快照
+                last_check = self._last_check.get(index_code, 0)
+                if time.time() - last_check >= self.RECHECK_INTERVAL:
+                    self._refresh_in_background(index_code, missing)
+                missing = []
+
+        if missing:
+            try:
+                self._fetch_months(index_code, missing)
+            except Exception as e:
+                logger.error(f"获取指数{index_code}成分权重失败: {str(e)}")
+
+        with self._lock:
+            snapshot = self._latest_snapshot(index_code, day)
+            if snapshot is None:
+                logger.warning(f"未获取到指数{index_code}在{day}之前的成分权重")
+                return pd.DataFrame(columns=['index_code', 'con_code', 'trade_date', 'weight'])
+            return self._snapshots[index_code][snapshot].copy()
+
+    def get_constituents(self, index_code, as_of=None):
+        """获取截至as_of最新的指数成分股代码列表"""
+        return self.get_weights(index_code, as_of)['con_code'].tolist()
+
+    def stock_basic(self):
+        """获取全市场上市股票基本信息（本地缓存STOCK_BASIC_TTL_DAYS天）"""
+        with self._lock:
+            if self._stock_basic is not None:
+                return self._stock_basic
+            path = os.path.join(self.cache_dir, 'stock_basic.csv')
+            if os.path.exists(path):
+                age_days = (time.time() - os.path.getmtime(path)) / 86400
+                if age_days < self.STOCK_BASIC_TTL_DAYS:
+                    self._stock_basic = pd.read_csv(path, dtype=str)
+                    return self._stock_basic
+            df = self._get_pro().stock_basic(exchange='', list_status='L')
+            if df is not None and not df.empty:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                df.to_csv(path, index=False)
+                self._stock_basic = df
+                return self._stock_basic
+            return df
@@ -0,0 +1,147 @@
+import time
+import threading
+import numpy as np
+import pandas as pd
+import akshare as ak
+from loguru import logger
+
+
+class RealtimeSnapshotProvider:
+    """全市场实时行情快照
+
+    按证券类型（A股/ETF/指数）各用一次东方财富全市场行情接口获取整张行情表，
+    向量化地转换为以ts_code为索引的快照，并在内存中缓存ttl秒。
+    同一轮执行中所有证券都从同一份快照读取，轮询数百只证券也只需每类一次请求。
+    """
+
+    # 快照的列，与get_realtime_data原有的返回格式一致
+    COLUMNS = ['ts_code', 'open', 'high', 'low', 'close', 'pre_close', 'vol', 'amount']
+
+    # 证券类型 -> (akshare接口, 接口参数)
+    SOURCES = {
+        'stock': ('stock_zh_a_spot_em', {}),
+        'etf': ('fund_etf_spot_em', {}),
+        'index': ('stock_zh_index_spot_em', {'symbol': '沪深重要指数'}),
+    }
+
+    # 行情表中文列名 -> 快照列名（ETF行情表的开高低列名为开盘价/最高价/最低价）
+    COLUMN_MAP = {
+        '今开': 'open', '开盘价': 'open',
+        '最高': 'high', '最高价': 'high',
+        '最低': 'low', '最低价': 'low',
+        '最新价': 'close',
+        '昨收': 'pre_close',
+        '成交量': 'vol',
+        '成交额': 'amount',
+    }
+
+    SHARES_PER_LOT = 100  # 每手股数
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, ttl=10.0):
+        """
+        Args:
+            ttl: 快照的缓存时间（秒）
+        """
+        self.ttl = ttl
+        self._boards = {}  # 证券类型 -> (获取时间, 快照DataFrame)
+        self._locks = {kind: threading.Lock() for kind in self.SOURCES}
+
+    @classmethod
+    def shared(cls):
+        """返回进程内共享的实例"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @staticmethod
+    def classify(ts_code):
+        """按代码判断证券类型：index指数 / etf / stock A股"""
+        code, _, market = ts_code.partition('.')
+        if (market == 'SH' and code.startswith('000')) or (market == 'SZ' and code.startswith('399')):
+            return 'index'
+        if code.startswith(('51', '52', '56', '58', '159')):
+            return 'etf'
+        return 'stock'
+
+    @staticmethod
+    def _to_ts_codes(codes, kind):
+        """将行情表中的6位代码向量化地转换为ts_code"""
+        codes = codes.astype(str).str.zfill(6)
+        first = codes.str[0]
+        if kind == 'index':
+            market = np.where(codes.str.startswith('399'), '.SZ', '.SH')
+        elif kind == 'etf':
+            market = np.where(first == '5', '.SH', '.SZ')
+        else:
+            market = np.select([first.isin(['6', '9']), first.isin(['4', '8'])], ['.SH', '.BJ'], '.SZ')
+        return codes + market
+
+    def _fetch(self, kind):
+        """获取一类证券的整张行情表并转换为快照"""
+        func_name, kwargs = self.SOURCES[kind]
+        start = time.perf_counter()
+        raw = getattr(ak, func_name)(**kwargs)
+        if raw is None or raw.empty:
+            raise ValueError(f"{func_name}未返回行情数据")
+
+        df = raw.rename(columns=self.COLUMN_MAP)
+        snapshot = pd.DataFrame({'ts_code': self._to_ts_codes(df['代码'], kind).values})
+        for col in self.COLUMNS[1:]:
+            snapshot[col] = pd.to_numeric(df[col], errors='coerce').values
+        # 东方财富行情表的成交量单位为手，转换为股，与原雪球接口的返回一致
+        snapshot['vol'] *= self.SHARES_PER_LOT
+        # 停牌等无最新价的证券不进入快照
+        snapshot = snapshot.dropna(subset=['close']).drop_duplicates('ts_code').set_index('ts_code', drop=False)
+        logger.info(f"获取{kind}实时行情快照 - 证券数: {len(snapshot)}, 耗时: {time.perf_counter() - start:.2f}秒")
+        return snapshot
+
+    def _board(self, kind):
+        """返回一类证券的快照，过期时重新获取（并发请求只获取一次）"""
+        with self._locks[kind]:
+            cached = self._boards.get(kind)
+            if cached is not None and time.time() - cached[0] < self.ttl:
+                return cached[1]
+            snapshot = self._fetch(kind)
+            self._boards[kind] = (time.time(), snapshot)
+            return snapshot
+
+    def get_snapshot(self, ts_codes):
+        """获取一组证券的实时行情快照
+
+        Args:
+            ts_codes: 证券代码列表
+        Returns:
+            pd.DataFrame: 以ts_code为索引，列为COLUMNS，快照中没有的证券不包含在内
+        """
+        ts_codes = list(dict.fromkeys(ts_codes))
+        kinds = {}
+        for ts_code in ts_codes:
+            kinds.setdefault(self.classify(ts_code), []).append(ts_code)
+
+        frames = []
+        for kind, codes in kinds.items():
+            try:
+                board = self._board(kind)
+            except Exception as e:
+                logger.error(f"获取{kind}实时行情快照失败: {str(e)}")
+                continue
+            frames.append(board.loc[board.index.intersection(codes)])
+
+        if not frames:
+            return pd.DataFrame(columns=self.COLUMNS).set_index('ts_code', drop=False)
+        snapshot = pd.concat(frames)
+        missing = len(ts_codes) - len(snapshot)
+        if missing:
+            logger.warning(f"实时行情快照中缺少{missing}只证券")
+        return snapshot
+
+    def get_quote(self, ts_code):
+        """获取单只证券的实时行情，格式与原get_realtime_data一致（单行DataFrame），无数据时返回None"""
+        snapshot = self.get_snapshot([ts_code])
+        if snapshot.empty:
+            return None
+        return snapshot.reset_index(drop=True)
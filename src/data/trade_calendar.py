@@ -0,0 +1,170 @@
+import os
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, date, timedelta
+import pandas as pd
+import tushare as ts
+from loguru import logger
+
+
+class TradeCalendar:
+    """本地交易日历
+
+    一次性下载交易所的完整交易日历并保存到本地，之后的是否交易日、前后交易日、
+    区间交易日查询都在内存中的有序日期列表上二分查找完成，不再访问接口。
+    查询日期超出本地日历范围时才重新下载。
+    """
+
+    # 下载日历的起始日期
+    EARLIEST_DATE = '19900101'
+
+    _shared = {}  # 交易所 -> 进程内共享的实例
+    _shared_lock = threading.Lock()
+
+    def __init__(self, exchange='SSE', pro=None, cache_dir='cache'):
+        """
+        Args:
+            exchange: 交易所代码，SSE上交所 / SZSE深交所
+            pro: Tushare pro_api实例，不提供时使用TUSHARE_TOKEN环境变量创建
+            cache_dir: 缓存目录
+        """
+        self.exchange = exchange or 'SSE'
+        self.pro = pro
+        self.cache_file = os.path.join(cache_dir, f'trade_cal_{self.exchange}.json')
+        self.open_days = []  # 有序的交易日列表，YYYYMMDD字符串
+        self.start = None  # 日历覆盖的起止日期（含非交易日）
+        self.end = None
+        self._lock = threading.Lock()
+        self._refreshed_on = None  # 本进程最近一次下载日历的日期
+        self._load_from_cache()
+
+    @classmethod
+    def shared(cls, exchange='SSE', pro=None):
+        """返回进程内共享的交易日历实例"""
+        exchange = exchange or 'SSE'
+        with cls._shared_lock:
+            calendar = cls._shared.get(exchange)
+            if calendar is None:
+                calendar = cls._shared[exchange] = cls(exchange, pro=pro)
+            elif calendar.pro is None and pro is not None:
+                calendar.pro = pro
+            return calendar
+
+    @staticmethod
+    def _to_str(value):
+        """将datetime/date/'YYYY-MM-DD'/'YYYYMMDD'统一转换为YYYYMMDD字符串"""
+        if isinstance(value, (datetime, date)):
+            return value.strftime('%Y%m%d')
+        value = str(value)
+        if len(value) == 8 and value.isdigit():
+            return value
+        return pd.to_datetime(value).strftime('%Y%m%d')
+
+    def _load_from_cache(self):
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'r') as f:
+                    data = json.load(f)
+                self.open_days = sorted(data['open_days'])
+                self.start = data['start']
+                self.end = data['end']
+        except Exception as e:
+            logger.warning(f"读取交易日历缓存失败: {str(e)}")
+
+    def _save_to_cache(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+            with open(self.cache_file, 'w') as f:
+                json.dump({'exchange': self.exchange, 'start': self.start, 'end': self.end,
+                           'open_days': self.open_days}, f)
+        except Exception as e:
+            logger.warning(f"保存交易日历缓存失败: {str(e)}")
+
+    def _get_pro(self):
+        if self.pro is None:
+            tushare_token = os.getenv('TUSHARE_TOKEN')
+            if not tushare_token:
+                raise ValueError("未设置TUSHARE_TOKEN环境变量")
+            ts.set_token(tushare_token)
+            self.pro = ts.pro_api()
+        return self.pro
+
+    def refresh(self):
+        """下载交易所截至明年年底的完整交易日历并保存"""
+        end = f"{datetime.now().year + 1}1231"
+        df = self._get_pro().trade_cal(exchange=self.exchange, start_date=self.EARLIEST_DATE, end_date=end)
+        if df is None or df.empty:
+            raise ValueError(f"未获取到{self.exchange}交易日历")
+        cal_dates = df['cal_date'].astype(str)
+        self.open_days = sorted(cal_dates[df['is_open'].astype(int) == 1].tolist())
+        self.start = cal_dates.min()
+        self.end = cal_dates.max()
+        self._refreshed_on = datetime.now().date()
+        self._save_to_cache()
+        logger.info(f"{self.exchange}交易日历已更新 - 范围: {self.start} 至 {self.end}, 交易日: {len(self.open_days)}")
+
+    def _ensure(self, *dates):
+        """确保日历覆盖给定日期，否则重新下载（每天最多下载一次）"""
+        if self.open_days and all(self.start <= d <= self.end for d in dates):
+            return
+        with self._lock:
+            if self.open_days and all(self.start <= d <= self.end for d in dates):
+                return
+            if self._refreshed_on == datetime.now().date() and self.open_days:
+                return
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"下载交易日历失败: {str(e)}")
+                if not self.open_days:
+                    raise
+
+    def is_open(self, day):
+        """是否为交易日"""
+        day = self._to_str(day)
+        self._ensure(day)
+        i = bisect_left(self.open_days, day)
+        return i < len(self.open_days) and self.open_days[i] == day
+
+    def prev_trading_day(self, day, include=False):
+        """day之前（include为True时含day）的最近一个交易日，不存在时返回None"""
+        day = self._to_str(day)
+        self._ensure(day)
+        i = bisect_right(self.open_days, day) if include else bisect_left(self.open_days, day)
+        return self.open_days[i - 1] if i > 0 else None
+
+    def next_trading_day(self, day, include=False):
+        """day之后（include为True时含day）的最近一个交易日，不存在时返回None"""
+        day = self._to_str(day)
+        self._ensure(day)
+        i = bisect_left(self.open_days, day) if include else bisect_right(self.open_days, day)
+        return self.open_days[i] if i < len(self.open_days) else None
+
+    def trading_days(self, start_date, end_date):
+        """[start_date, end_date]内的交易日列表，YYYYMMDD字符串，升序"""
+        start, end = self._to_str(start_date), self._to_str(end_date)
+        self._ensure(start, end)
+        return self.open_days[bisect_left(self.open_days, start):bisect_right(self.open_days, end)]
+
+    def recent_trading_days(self, days=30, end_date=None):
+        """截至end_date（默认今天）最近days个自然日内的交易日，降序"""
+        end = self._to_str(end_date or datetime.now())
+        start = (datetime.strptime(end, '%Y%m%d') - timedelta(days=days)).strftime('%Y%m%d')
+        return self.trading_days(start, end)[::-1]
+
+    def trade_cal(self, start_date, end_date):
+        """返回与pro.trade_cal(is_open=1)格式一致的DataFrame（按日期降序）"""
+        start, end = self._to_str(start_date), self._to_str(end_date)
+        self._ensure(start, end)
+        lo = bisect_left(self.open_days, start)
+        hi = bisect_right(self.open_days, end)
+        days = self.open_days[lo:hi]
+        pretrade = ([self.open_days[lo - 1]] if lo > 0 else [None]) + days[:-1]
+        df = pd.DataFrame({
+            'exchange': self.exchange,
+            'cal_date': days,
+            'is_open': 1,
+            'pretrade_date': pretrade[:len(days)],
+        })
+        return df.iloc[::-1].reset_index(drop=True)
@@ -0,0 +1,284 @@
+import tushare as ts
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from loguru import logger
+import os
+import time
+import json
+import threading
+
+
+class RateLimiter:
+    """线程安全的接口限流器，多个线程共享同一最小调用间隔"""
+    def __init__(self, min_interval=1.0):
+        self.min_interval = min_interval  # 最小调用间隔（秒）
+        self._lock = threading.Lock()
+        self._next_time = 0.0  # 下一次允许调用的时间
+
+    def wait(self):
+        """等待到允许调用的时间，并预留下一个调用时间片"""
+        with self._lock:
+            now = time.time()
+            scheduled = max(now, self._next_time)
+            self._next_time = scheduled + self.min_interval
+        if scheduled > now:
+            time.sleep(scheduled - now)
+
+
+def merge_ranges(ranges):
+    """合并重叠或相邻的日期区间，区间为(YYYYMMDD, YYYYMMDD)"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged:
+            prev_end = datetime.strptime(merged[-1][1], '%Y%m%d') + timedelta(days=1)
+            if start <= prev_end.strftime('%Y%m%d'):
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+                continue
+        merged.append((start, end))
+    return merged
+
+
+def missing_ranges(ranges, start, end):
+    """返回[start, end]中尚未被已查询区间（已合并、有序）覆盖的部分"""
+    missing = []
+    cursor = start
+    for r_start, r_end in ranges:
+        if r_end < cursor:
+            continue
+        if r_start > end:
+            break
+        if r_start > cursor:
+            gap_end = datetime.strptime(r_start, '%Y%m%d') - timedelta(days=1)
+            missing.append((cursor, gap_end.strftime('%Y%m%d')))
+        cursor = (datetime.strptime(r_end, '%Y%m%d') + timedelta(days=1)).strftime('%Y%m%d')
+        if cursor > end:
+            return missing
+    if cursor <= end:
+        missing.append((cursor, end))
+    return missing
+
+
+class DividendStore:
+    """ETF分红数据的合并存储
+
+    所有ETF的分红记录和已查询过的日期区间（包括无分红的区间）保存在同一个JSON文件中，
+    按代码索引。prefetch可对一批ETF并发补齐缺失区间，所有线程共享同一个限流器。
+    """
+    # 未指定开始日期时的查询起点
+    EARLIEST_DATE = '19900101'
+
+    _shared = {}  # 文件路径 -> 进程内共享的实例
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path='cache/dividend_store.json', min_interval=1.0, max_workers=4):
+        """
+        Args:
+            path: 存储文件路径
+            min_interval: fund_div接口的最小调用间隔（秒）
+            max_workers: 批量预取时的并发线程数
+        """
+        self.path = path
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(min_interval)
+        self._lock = threading.RLock()
+        self._entries = {}  # ts_code -> {'ranges': [(start, end)], 'records': DataFrame}
+        self._mtime = None
+        self._pro = None
+
+    @classmethod
+    def shared(cls, path='cache/dividend_store.json'):
+        """返回进程内共享的实例，各策略实例初始化时不必重复读取文件"""
+        key = os.path.abspath(path)
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(path)
+            return cls._shared[key]
+
+    def _get_pro(self):
+        if self._pro is None:
+            tushare_token = os.getenv('TUSHARE_TOKEN')
+            if not tushare_token:
+                raise ValueError("未设置TUSHARE_TOKEN环境变量")
+            ts.set_token(tushare_token)
+            self._pro = ts.pro_api()
+        return self._pro
+
+    def _reload(self):
+        """文件被其他进程更新时重新读取"""
+        try:
+            mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+            if mtime == self._mtime:
+                return
+            entries = {}
+            if mtime is not None:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+                for ts_code, entry in data.get('etfs', {}).items():
+                    entries[ts_code] = {
+                        'ranges': [tuple(r) for r in entry.get('ranges', [])],
+                        'records': self._to_frame(entry.get('records', [])),
+                    }
+            self._entries = entries
+            self._mtime = mtime
+        except Exception as e:
+            logger.warning(f"读取分红数据存储失败: {str(e)}")
+
+    @staticmethod
+    def _to_frame(records):
+        df = pd.DataFrame(records, columns=['date', 'dividend'])
+        df['date'] = pd.to_datetime(df['date'])
+        df['dividend'] = df['dividend'].astype(float)
+        return df
+
+    def _load_legacy(self, ts_code):
+        """读取旧版单个ETF的缓存文件cache/dividend_{ts_code}.json"""
+        path = os.path.join(os.path.dirname(self.path) or '.', f'dividend_{ts_code}.json')
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                return {'ranges': [tuple(r) for r in data.get('ranges', [])],
+                        'records': self._to_frame(data.get('records', []))}
+            # 更早的缓存只有分红记录，没有查询区间，需要重新查询一次
+            return {'ranges': [], 'records': self._to_frame(data)}
+        except Exception as e:
+            logger.warning(f"读取旧版分红缓存{path}失败: {str(e)}")
+            return None
+
+    def _entry(self, ts_code):
+        entry = self._entries.get(ts_code)
+        if entry is None:
+            entry = self._load_legacy(ts_code) or {'ranges': [], 'records': self._to_frame([])}
+            self._entries[ts_code] = entry
+        return entry
+
+    def save(self):
+        """写回存储文件（先写临时文件再替换，避免并发读到半个文件）"""
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+                data = {'etfs': {}}
+                for ts_code, entry in sorted(self._entries.items()):
+                    records = entry['records'].copy()
+                    records['date'] = records['date'].dt.strftime('%Y-%m-%d')
+                    data['etfs'][ts_code] = {
+                        'ranges': [list(r) for r in entry['ranges']],
+                        'records': records.to_dict('records'),
+                    }
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+                self._mtime = os.path.getmtime(self.path)
+            except Exception as e:
+                logger.warning(f"保存分红数据存储失败: {str(e)}")
+
+    @staticmethod
+    def _clean_dividend_data(df):
+        """清理分红数据，过滤掉非数值的分红记录"""
+        try:
+            # 将分红列转换为数值类型，非数值将变为NaN
+            df['dividend'] = pd.to_numeric(df['dividend'], errors='coerce')
+
+            # 删除分红为NaN的记录
+            df = df.dropna(subset=['dividend'])
+
+            # 删除分红为0的记录
+            df = df[df['dividend'] > 0]
+
+            return df
+        except Exception as e:
+            logger.error(f"清理分红数据时出错: {str(e)}")
+            return df
+
+    def _fetch(self, ts_code, start, end):
+        """调用fund_div获取一个区间的分红记录"""
+        self.rate_limiter.wait()
+        df = self._get_pro().fund_div(ts_code=ts_code, start_date=start, end_date=end)
+        if df is None or df.empty:
+            logger.info(f"ETF在该区间无分红数据 - {ts_code}, {start} 至 {end}")
+            return self._to_frame([])
+
+        # 重命名列并转换日期格式
+        df = df.rename(columns={
+            'ann_date': 'date',
+            'div_cash': 'dividend'
+        })
+        df['date'] = pd.to_datetime(df['date'])
+        df = self._clean_dividend_data(df)[['date', 'dividend']]
+        logger.info(f"成功获取ETF分红数据 - {ts_code}, {start} 至 {end}, 数据长度: {len(df)}")
+        return df
+
+    def _update(self, ts_code, fetched):
+        """合并新获取的记录和已查询区间"""
+        with self._lock:
+            entry = self._entry(ts_code)
+            frames = [f for f in [entry['records']] + [df for _, _, df in fetched] if not f.empty]
+            if frames:
+                df = pd.concat(frames, ignore_index=True)
+                entry['records'] = df.drop_duplicates(['date', 'dividend']).sort_values(
+                    'date', kind='stable').reset_index(drop=True)
+            entry['ranges'] = merge_ranges(entry['ranges'] + [(start, end) for start, end, _ in fetched])
+
+    def prefetch(self, ts_codes, start_date=None, end_date=None):
+        """批量补齐一组ETF在[start_date, end_date]内缺失的分红数据
+
+        已查询过的区间不再调用接口；缺失区间由线程池并发获取，共享同一个限流器，
+        全部完成后一次性写回存储文件。
+        Args:
+            ts_codes: ETF代码列表
+            start_date: 开始日期，为None时从最早的数据开始
+            end_date: 结束日期，为None时到今天
+        Returns:
+            dict: ts_code -> 是否成功（全部缺失区间都已获取）
+        """
+        start = start_date.strftime('%Y%m%d') if start_date else self.EARLIEST_DATE
+        today = datetime.now().strftime('%Y%m%d')
+        # 今天之后的区间可能还会有新的分红公告，不记为已查询
+        end = min(end_date.strftime('%Y%m%d'), today) if end_date else today
+
+        with self._lock:
+            self._reload()
+            tasks = {}
+            for ts_code in dict.fromkeys(ts_codes):
+                missing = missing_ranges(self._entry(ts_code)['ranges'], start, end) if start <= end else []
+                if missing:
+                    tasks[ts_code] = missing
+
+        results = {ts_code: True for ts_code in ts_codes}
+        if not tasks:
+            return results
+
+        logger.info(f"批量获取ETF分红数据 - {len(tasks)}/{len(results)}只ETF需要更新, 区间: {start} 至 {end}")
+
+        def fetch_one(ts_code):
+            fetched = []
+            for missing_start, missing_end in tasks[ts_code]:
+                try:
+                    fetched.append((missing_start, missing_end, self._fetch(ts_code, missing_start, missing_end)))
+                except Exception as e:
+                    logger.error(f"获取ETF分红数据出错 - {ts_code}: {str(e)}")
+                    results[ts_code] = False
+            self._update(ts_code, fetched)
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(tasks))) as executor:
+            list(executor.map(fetch_one, tasks))
+        self.save()
+        return results
+
+    def get(self, ts_code):
+        """返回ETF的分红记录DataFrame，列为date/dividend"""
+        with self._lock:
+            self._reload()
+            return self._entry(ts_code)['records'].copy()
+
+    def dividend_map(self, ts_code):
+        """返回ETF的 日期 -> 每股分红 字典，同一日期取第一条记录"""
+        records = self.get(ts_code)
+        dividend_map = {}
+        for date, dividend in zip(records['date'].dt.date, records['dividend']):
+            dividend_map.setdefault(date, float(dividend))
+        return dividend_map
@@ -6,6 +6,7 @@ import numpy as np
 import os
 import akshare as ak
 from src.data.data_loader import DataLoader
+from src.data.trade_calendar import TradeCalendar
 from arch import arch_model
 import os
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
@@ -221,21 +222,11 @@ def get_sentiment_data(start_date = None, end_date = None):
             if result and 'sentiment' in result and isinstance(result['sentiment'], list):
                 # 获取交易日历
                 try:
-                    from src.data.data_loader import DataLoader
-                    tushare_token = os.getenv('TUSHARE_TOKEN')
-                    if not tushare_token:
-                        raise ValueError("未设置TUSHARE_TOKEN环境变量")
-                    data_loader = DataLoader(tushare_token=tushare_token)
-                    start_date_str = start_date.strftime('%Y%m%d')
-                    end_date_str = end_date.strftime('%Y%m%d')
-                    trade_cal = data_loader.pro.trade_cal(exchange='SSE', 
-                                        start_date=start_date_str,
-                                        end_date=end_date_str,
-                                        is_open=1)
+                    trading_days = TradeCalendar.shared('SSE').trading_days(start_date, end_date)
                     
-                    if not trade_cal.empty:
-                        actual_start_date = trade_cal['cal_date'].min()
-                        actual_end_date = trade_cal['cal_date'].max()
+                    if trading_days:
+                        actual_start_date = trading_days[0]
+                        actual_end_date = trading_days[-1]
                         actual_start_date = f"{actual_start_date[:4]}-{actual_start_date[4:6]}-{actual_start_date[6:]}"
                         actual_end_date = f"{actual_end_date[:4]}-{actual_end_date[4:6]}-{actual_end_date[6:]}"
                         
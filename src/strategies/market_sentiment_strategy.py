@@ -385,12 +385,11 @@ class MarketSentimentStrategy(bt.Strategy):
             
         # 检查是否有分红
         current_date = self.data.datetime.date()
-        current_date_str = current_date.strftime('%Y-%m-%d')
         
         # 处理ETF分红
         if self.p.handle_dividend and self.dividend_handler and self.position and self.position.size > 0:
             dividend_amount = self.dividend_handler.process_dividend(
-                current_date_str, 
+                current_date, 
                 self.position.size,
                 self.data.close[0]
             )
@@ -4,6 +4,34 @@ import pandas as pd
 import torch
 from loguru import logger
 import json
+import os
+
+
+class RingBuffer:
+    """固定容量的环形缓冲区，按行追加，按时间顺序读出"""
+
+    def __init__(self, capacity, width):
+        self.data = np.zeros((capacity, width))
+        self.capacity = capacity
+        self.pos = 0
+        self.count = 0
+
+    def append(self, row):
+        self.data[self.pos] = row
+        self.pos = (self.pos + 1) % self.capacity
+        self.count += 1
+
+    @property
+    def full(self):
+        return self.count >= self.capacity
+
+    def ordered(self, out):
+        """按从旧到新的顺序写入out（形状与data相同）"""
+        tail = self.capacity - self.pos
+        out[:tail] = self.data[self.pos:]
+        out[tail:] = self.data[:self.pos]
+        return out
+
 
 class RLModelStrategy(bt.Strategy):
     params = (
@@ -15,8 +43,17 @@ class RLModelStrategy(bt.Strategy):
         ('price_limit', 0.10),        # 涨跌停限制(10%)
         ('min_shares', 100),          # 最小交易股数
         ('cash_buffer', 0.95),        # 现金缓冲比例
+        ('normalizer_path', None),    # DataNormalizer保存路径，提供时按其统计量归一化状态
     )
 
+    # 状态中每根K线的价格字段和技术指标特征
+    PRICE_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+    FEATURE_FIELDS = ('ma5', 'ma10', 'ma20', 'momentum', 'volatility', 'volume_ma5')
+    # 计算技术指标所需的最长历史（ma20）
+    FEATURE_LOOKBACK = 20
+    # 模型输出的动作数：0持有，1买入，2卖出
+    ACTION_DIM = 3
+
     def __init__(self):
         """初始化策略"""
         # 加载配置和模型
@@ -27,6 +64,18 @@ class RLModelStrategy(bt.Strategy):
 
         # 设置设备
         self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.state_dim = self.p.window_size * (len(self.PRICE_FIELDS) + len(self.FEATURE_FIELDS)) + 2
+
+        # 滚动窗口：最近FEATURE_LOOKBACK根K线的收盘价和成交量，以及最近window_size根K线的价格和特征
+        self._bar_history = RingBuffer(self.FEATURE_LOOKBACK, 2)
+        self._bar_ordered = np.zeros((self.FEATURE_LOOKBACK, 2))
+        self._rows = RingBuffer(self.p.window_size, len(self.PRICE_FIELDS) + len(self.FEATURE_FIELDS))
+        self._rows_ordered = np.zeros_like(self._rows.data)
+        self._state = np.zeros(self.state_dim, dtype=np.float32)
+        self._last_bar = None
+
+        # 状态归一化：按DataNormalizer的统计量换算成逐元素的缩放和偏移
+        self._state_scale, self._state_offset = self._load_normalizer()
 
         # 初始化智能体
         if self.p.model_path:
@@ -54,52 +103,127 @@ class RLModelStrategy(bt.Strategy):
         logger.info("强化学习模型策略初始化完成")
 
     def _load_agent(self):
-        """加载训练好的智能体"""
-        # 计算状态维度
-        pass
+        """
+        加载训练好的智能体，返回TorchScript追踪并冻结的推理网络
+
+        支持ElegantRL PPOAgent保存的.pt检查点（使用actor网络）和
+        Stable-Baselines3 DQNAgent保存的.zip模型（使用Q网络），网络输出的最大值对应的动作即为决策：
+        0持有，1买入，2卖出。
+
+        模型必须是在本策略的单证券状态上训练的：状态维度为window_size*11+2
+        （window_size根K线的5个价格字段和6个技术指标，加上现金比例和持仓比例），动作维度为3。
+        在ETFTradingEnv等多ETF环境上训练的模型状态和动作布局不同，不能直接使用。
+
+        Raises:
+            FileNotFoundError: 模型文件不存在
+            ValueError: 模型的状态维度或动作维度与本策略不一致
+        """
+        path = self.p.model_path
+        if not os.path.exists(path):
+            logger.error(f"模型文件不存在: {path}")
+            raise FileNotFoundError(f"模型文件不存在: {path}")
+
+        if path.endswith('.zip'):
+            from stable_baselines3 import DQN
+            model = DQN.load(path, device=self.device)
+            self._check_model_dims(path, int(np.prod(model.observation_space.shape)), int(model.action_space.n))
+            network = model.q_net
+        else:
+            from src.strategies.rl_model_finrl.agents.elegantrl.ppo_agent import ActorNetwork
+            checkpoint = torch.load(path, map_location=self.device)
+            weights = checkpoint['actor_state_dict']
+            model_info = checkpoint.get('model_info', {})
+            state_dim = model_info.get('state_dim', weights['fc1.weight'].shape[1])
+            action_dim = model_info.get('action_dim', weights['fc_mean.weight'].shape[0])
+            self._check_model_dims(path, state_dim, action_dim)
+            network = ActorNetwork(state_dim, action_dim, weights['fc1.weight'].shape[0])
+            network.load_state_dict(weights)
+
+        network = network.to(self.device).eval()
+        example = torch.zeros((1, self.state_dim), dtype=torch.float32, device=self.device)
+        with torch.no_grad():
+            traced = torch.jit.freeze(torch.jit.trace(network, example))
+        logger.info(f"已加载模型: {path}, 状态维度: {self.state_dim}")
+        return traced
+
+    def _check_model_dims(self, path, state_dim, action_dim):
+        """检查模型的状态维度和动作维度与本策略一致，不一致时抛出ValueError"""
+        if state_dim != self.state_dim or action_dim != self.ACTION_DIM:
+            message = (f"模型{path}的状态维度为{state_dim}、动作维度为{action_dim}，"
+                       f"本策略需要状态维度{self.state_dim}（window_size={self.p.window_size}）、动作维度{self.ACTION_DIM}；"
+                       f"请使用在单证券状态上训练的模型，或调整window_size")
+            logger.error(message)
+            raise ValueError(message)
+
+    def _load_normalizer(self):
+        """
+        按DataNormalizer的统计量生成状态的逐元素缩放和偏移
+
+        DataNormalizer的缩放器都是仿射变换，用0和1两点换算出每个特征的缩放和偏移，
+        按特征名（open/close/ma5等）对应到状态中每根K线的位置，账户状态不做归一化。
+        """
+        if not self.p.normalizer_path:
+            return None, None
+        from src.strategies.rl_model_finrl.meta.preprocessor.data_normalizer import DataNormalizer
+        normalizer = DataNormalizer.load(self.p.normalizer_path)
+
+        names = list(self.PRICE_FIELDS) * self.p.window_size
+        names += list(self.FEATURE_FIELDS) * self.p.window_size
+        scale = np.ones(self.state_dim, dtype=np.float32)
+        offset = np.zeros(self.state_dim, dtype=np.float32)
+        for name, scaler in normalizer.scalers.items():
+            zero, one = scaler.transform(np.array([[0.0], [1.0]])).ravel()
+            index = [i for i, n in enumerate(names) if n == name]
+            scale[index] = one - zero
+            offset[index] = zero
+        logger.info(f"已加载归一化器: {self.p.normalizer_path}, 归一化特征: {list(normalizer.scalers)}")
+        return scale, offset
+
+    def _update_window(self):
+        """将当前K线及其技术指标写入滚动窗口，每根K线只计算一次"""
+        bar = len(self.data)
+        if bar == self._last_bar:
+            return
+        self._last_bar = bar
+
+        close, volume = self.data.close[0], self.data.volume[0]
+        self._bar_history.append((close, volume))
+        if not self._bar_history.full:
+            return
+        history = self._bar_history.ordered(self._bar_ordered)
+        closes, volumes = history[:, 0], history[:, 1]
+
+        self._rows.append((
+            self.data.open[0], self.data.high[0], self.data.low[0], close, volume,
+            np.mean(closes[-5:]),                 # 趋势指标
+            np.mean(closes[-10:]),
+            np.mean(closes),
+            close / closes[-6] - 1,               # 动量指标
+            np.std(closes[-5:]),                  # 波动率指标
+            np.mean(volumes[-5:]),                # 成交量指标
+        ))
 
     def _get_state(self):
-        """构建当前状态"""
-        # 获取价格历史
-        price_data = np.array([
-            [self.data.open[i], self.data.high[i], self.data.low[i], 
-             self.data.close[i], self.data.volume[i]]
-            for i in range(-self.p.window_size + 1, 1)
-        ]).flatten()
-
-        # 生成技术指标特征
-        features = []
-        for i in range(-self.p.window_size + 1, 1):
-            # 趋势指标
-            ma5 = np.mean([self.data.close[j] for j in range(i-4, i+1)])
-            ma10 = np.mean([self.data.close[j] for j in range(i-9, i+1)])
-            ma20 = np.mean([self.data.close[j] for j in range(i-19, i+1)])
-            
-            # 动量指标
-            momentum = self.data.close[i] / self.data.close[i-5] - 1
-            
-            # 波动率指标
-            volatility = np.std([self.data.close[j] for j in range(i-4, i+1)])
-            
-            # 成交量指标
-            volume_ma5 = np.mean([self.data.volume[j] for j in range(i-4, i+1)])
-            
-            features.extend([ma5, ma10, ma20, momentum, volatility, volume_ma5])
+        """构建当前状态，窗口不足时返回None"""
+        if not self._rows.full:
+            return None
+
+        # 滚动窗口按时间顺序展开：先是每根K线的价格，再是每根K线的技术指标
+        rows = self._rows.ordered(self._rows_ordered)
+        n_price = self.p.window_size * len(self.PRICE_FIELDS)
+        state = self._state
+        state[:n_price] = rows[:, :len(self.PRICE_FIELDS)].ravel()
+        state[n_price:-2] = rows[:, len(self.PRICE_FIELDS):].ravel()
 
         # 账户状态
         portfolio_value = self.broker.getvalue()
         position_value = self.position.size * self.data.close[0] if self.position else 0
-        position_pct = position_value / portfolio_value if portfolio_value > 0 else 0
-        cash_pct = self.broker.getcash() / portfolio_value
-
-        # 组合状态
-        state = np.concatenate([
-            price_data,
-            features,
-            [cash_pct, position_pct]
-        ])
+        state[-2] = self.broker.getcash() / portfolio_value
+        state[-1] = position_value / portfolio_value if portfolio_value > 0 else 0
 
-        return state.astype(np.float32)
+        if self._state_scale is not None:
+            state = state * self._state_scale + self._state_offset
+        return state
 
     def round_shares(self, shares):
         """将股数调整为100的整数倍"""
@@ -140,7 +264,13 @@ class RLModelStrategy(bt.Strategy):
             
         return shares if shares >= self.p.min_shares else 0
 
+    def prenext(self):
+        self._update_window()
+
     def next(self):
+        # 每根K线都更新滚动窗口
+        self._update_window()
+
         # 如果有未完成的订单，不执行新的交易
         if self.order:
             return
@@ -164,12 +294,13 @@ class RLModelStrategy(bt.Strategy):
 
         # 获取当前状态
         state = self._get_state()
-        state_tensor = torch.FloatTensor(state).unsqueeze(0).to(self.device)
+        if state is None:
+            return
+        state_tensor = torch.from_numpy(state).unsqueeze(0).to(self.device)
 
-        # 使用智能体选择动作
-        with torch.no_grad():
-            q_values = self.agent.q_network(state_tensor)
-            action = q_values.argmax().item()
+        # 使用智能体选择动作（确定性策略）
+        with torch.inference_mode():
+            action = self.agent(state_tensor).argmax().item()
 
         current_price = self.data.close[0]
 
@@ -0,0 +1,321 @@
+import queue
+import threading
+import time
+import backtrader as bt
+import numpy as np
+import pandas as pd
+from src.utils.logger import setup_logger
+
+logger = setup_logger()
+
+
+class LiveBarFeed(bt.feeds.DataBase):
+    """实盘数据源
+
+    先逐根回放历史K线为策略预热，之后阻塞等待push推送的新K线。
+    每推送一根K线，策略只执行一次next。
+    """
+    params = (
+        ('history', None),  # 预热用的历史K线，索引为日期，列为open/high/low/close/volume
+        ('ts_code', None),  # 证券代码
+    )
+
+    # K线字段，与history的列对应
+    BAR_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self):
+        self._bars = queue.Queue()  # 待处理的新K线
+        self.results = queue.Queue()  # 策略处理完新K线后的结果
+        self.warmed_up = threading.Event()  # 历史K线已全部回放
+        self.sentiment_data = None  # 最新的市场情绪数据，随K线推送
+        self._history = []
+        self._live_seq = None  # 当前正在处理的新K线序号，预热期间为None
+
+    def islive(self):
+        return True
+
+    def _start_finish(self):
+        super()._start_finish()
+        # todate仅供策略读取回测区间，新推送的K线不受其限制
+        self.todate = float('inf')
+
+    def start(self):
+        super().start()
+        history = self.p.history
+        if history is None or history.empty:
+            self._history = []
+        else:
+            values = history[list(self.BAR_FIELDS)].to_numpy(dtype=float)
+            self._history = list(zip(pd.DatetimeIndex(history.index).to_pydatetime(), values))
+        self._history.reverse()
+
+    def _fill(self, dt, values):
+        self.lines.datetime[0] = bt.date2num(dt)
+        self.lines.open[0], self.lines.high[0], self.lines.low[0], self.lines.close[0], self.lines.volume[0] = values
+        self.lines.openinterest[0] = 0.0
+
+    def _load(self):
+        if self._history:
+            self._fill(*self._history.pop())
+            return True
+
+        self.warmed_up.set()
+        item = self._bars.get()
+        if item is None:  # 停止
+            return False
+        seq, dt, values, sentiment_data = item
+        self._live_seq = seq
+        if sentiment_data is not None:
+            self.sentiment_data = sentiment_data
+        self._fill(dt, values)
+        return True
+
+    def push(self, seq, dt, values, sentiment_data=None):
+        """推送一根新K线
+
+        Args:
+            seq: K线序号，策略处理完后随结果返回
+            dt: K线日期
+            values: (open, high, low, close, volume)
+            sentiment_data: 最新的市场情绪数据（get_sentiment_data的返回值），为None时沿用原数据
+        """
+        self._bars.put((seq, dt, tuple(float(v) for v in values), sentiment_data))
+
+    def report(self, signals, error=None):
+        """策略处理完新K线后回报结果，预热期间不回报"""
+        if self._live_seq is not None:
+            self.results.put((self._live_seq, signals, error))
+
+    def stop_feed(self):
+        self._bars.put(None)
+
+
+def make_live_strategy(strategy_class):
+    """生成实盘版本的策略子类
+
+    记录每根新K线上产生的买卖信号并回报给数据源；
+    新K线的日期不在已加载的情绪数据中时，使用数据源推送的最新情绪数据。
+    """
+
+    class LiveStrategy(strategy_class):
+
+        def __init__(self):
+            super().__init__()
+            self._bar_signals = []
+            # 预热前已提供情绪数据时直接使用，不再在首次next时自行获取
+            if self.data.sentiment_data is not None:
+                self.sentiment_data = self.data.sentiment_data
+
+        def buy(self, *args, **kwargs):
+            order = super().buy(*args, **kwargs)
+            self._capture('buy', order)
+            return order
+
+        def sell(self, *args, **kwargs):
+            order = super().sell(*args, **kwargs)
+            self._capture('sell', order)
+            return order
+
+        def _capture(self, action, order):
+            if order is None or self.data._live_seq is None:
+                return
+            self._bar_signals.append({
+                'action': action,
+                'signal': 1 if action == 'buy' else -1,
+                'price': float(self.data.close[0]),
+                'size': abs(int(order.created.size)),
+                'reason': getattr(self, 'trade_reason', None),
+                'date': self.data.datetime.date(0),
+            })
+
+        def _update_sentiment(self):
+            sentiment_data = self.data.sentiment_data
+            if sentiment_data is None or sentiment_data is getattr(self, 'sentiment_data', None):
+                return
+            self.sentiment_data = sentiment_data
+            self.sentiment_dict = {item['date']: item['value'] for item in sentiment_data['sentiment']}
+
+        def prenext(self):
+            super().prenext()
+            self.data.report([])
+
+        def next(self):
+            self._bar_signals = []
+            if self.data._live_seq is None:
+                super().next()
+                return
+            try:
+                self._update_sentiment()
+                super().next()
+            except Exception as e:
+                logger.error(f"实盘策略处理{self.data.p.ts_code}新K线时出错: {str(e)}")
+                self.data.report(self._bar_signals, error=str(e))
+                return
+            self.data.report(self._bar_signals)
+
+    LiveStrategy.__name__ = f"Live{strategy_class.__name__}"
+    return LiveStrategy
+
+
+class LiveSymbolRunner:
+    """单个证券的常驻实盘引擎
+
+    cerebro在后台线程中运行，策略状态、指标和持仓常驻内存；
+    每次step只推送新K线并等待策略执行一次next。
+
+    由实时行情快照生成的当天K线是临时K线：推送给策略后不计入last_date，
+    同一天不会重复推送；正式日线发布后，由LiveEngine.rebuild_runner用包含正式日线的历史重建引擎替换。
+    """
+
+    def __init__(self, symbol, strategy_class, history, cash=1000000.0, commission=0.0003,
+                 strategy_params=None, start_date=None, end_date=None, sentiment_data=None):
+        """
+        Args:
+            symbol: 证券代码
+            strategy_class: 策略类
+            history: 预热用的历史K线DataFrame
+            cash: 初始资金
+            commission: 手续费率
+            strategy_params: 策略参数
+            start_date: 策略读取的回测开始日期（默认为历史K线的第一天）
+            end_date: 策略读取的回测结束日期（默认为历史K线的最后一天）
+            sentiment_data: 覆盖预热区间的情绪数据，为None时由策略自行获取
+        """
+        self.symbol = symbol
+        self.last_date = pd.Timestamp(history.index[-1]) if not history.empty else None  # 最后一根正式K线的日期
+        self.provisional_date = None  # 已推送的临时K线的日期
+        self._seq = 0
+        self.error = None
+
+        self.feed = LiveBarFeed(
+            history=history,
+            ts_code=symbol,
+            fromdate=start_date or (history.index[0] if not history.empty else None),
+            todate=end_date or (history.index[-1] if not history.empty else None),
+        )
+        self.feed.sentiment_data = sentiment_data
+        self.cerebro = bt.Cerebro(stdstats=False)
+        self.cerebro.broker.setcash(cash)
+        self.cerebro.broker.setcommission(commission=commission)
+        self.cerebro.adddata(self.feed, name=symbol)
+        self.cerebro.addstrategy(make_live_strategy(strategy_class), **(strategy_params or {}))
+        self._thread = threading.Thread(target=self._run, name=f"live-{symbol}", daemon=True)
+
+    def _run(self):
+        try:
+            self.cerebro.run()
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"{self.symbol}实盘引擎异常退出: {str(e)}")
+        finally:
+            # 异常退出时不再阻塞等待预热的调用方
+            self.feed.warmed_up.set()
+
+    @property
+    def alive(self):
+        return self._thread.is_alive()
+
+    def start(self, timeout=None):
+        """启动引擎并等待历史K线预热完成"""
+        start = time.perf_counter()
+        self._thread.start()
+        self.feed.warmed_up.wait(timeout)
+        logger.info(f"{self.symbol}实盘引擎预热完成 - 耗时: {time.perf_counter() - start:.2f}秒")
+        return self.alive
+
+    def step(self, bars, sentiment_data=None, timeout=30.0, provisional_date=None):
+        """推送新K线并等待策略处理完成
+
+        Args:
+            bars: 新K线DataFrame，只推送日期晚于已处理日期的K线
+            sentiment_data: 最新的市场情绪数据
+            timeout: 等待策略处理完成的超时时间（秒）
+            provisional_date: bars中该日期的K线为实时快照生成的临时K线，不计入last_date；
+                              该日期已推送过临时K线时不再推送
+        Returns:
+            list: 新K线上产生的信号列表，每个信号为包含action/signal/price/size/reason/date的字典
+        Raises:
+            TimeoutError: 超时未处理完成
+            RuntimeError: 引擎已停止、策略处理出错，或已推送临时K线的日期收到了正式K线（需重建引擎）
+        """
+        if not self.alive:
+            raise RuntimeError(f"{self.symbol}实盘引擎未运行: {self.error}")
+        if bars is None or bars.empty:
+            return []
+        index = pd.DatetimeIndex(bars.index)
+        keep = index > self.last_date if self.last_date is not None else np.ones(len(bars), dtype=bool)
+        if self.provisional_date is not None:
+            if provisional_date is not None and provisional_date <= self.provisional_date:
+                keep &= index != provisional_date
+            official = keep & (index != provisional_date) if provisional_date is not None else keep
+            if (index[official] <= self.provisional_date).any():
+                raise RuntimeError(f"{self.symbol}已推送{self.provisional_date.date()}的临时K线，"
+                                   f"正式K线需重建引擎后推送")
+        bars = bars[keep]
+        if bars.empty:
+            return []
+
+        deadline = time.perf_counter() + timeout
+        signals = []
+        for dt, row in bars[list(LiveBarFeed.BAR_FIELDS)].iterrows():
+            self._seq += 1
+            self.feed.push(self._seq, pd.Timestamp(dt).to_pydatetime(), row.values, sentiment_data)
+            if provisional_date is not None and pd.Timestamp(dt) == provisional_date:
+                self.provisional_date = pd.Timestamp(dt)
+            else:
+                self.last_date = pd.Timestamp(dt)
+            while True:
+                remaining = deadline - time.perf_counter()
+                try:
+                    seq, bar_signals, error = self.feed.results.get(timeout=max(remaining, 0))
+                except queue.Empty:
+                    raise TimeoutError(f"{self.symbol}策略处理新K线超时")
+                if seq == self._seq:
+                    break
+                # 之前超时的K线的迟到结果，丢弃
+            if error:
+                raise RuntimeError(error)
+            signals.extend(bar_signals)
+        return signals
+
+    def stop(self, timeout=5.0):
+        self.feed.stop_feed()
+        self._thread.join(timeout)
+
+
+class LiveEngine:
+    """管理一组证券的常驻实盘引擎"""
+
+    def __init__(self, strategy_class, cash=1000000.0, commission=0.0003, strategy_params=None,
+                 warmup_days=365):
+        self.strategy_class = strategy_class
+        self.cash = cash
+        self.commission = commission
+        self.strategy_params = strategy_params or {}
+        self.warmup_days = warmup_days
+        self.runners = {}  # 证券代码 -> LiveSymbolRunner
+
+    def ensure_runner(self, symbol, history, start_date=None, end_date=None, sentiment_data=None):
+        """返回证券的引擎，不存在或已停止时用历史K线创建并预热"""
+        runner = self.runners.get(symbol)
+        if runner is not None and runner.alive:
+            return runner
+        runner = LiveSymbolRunner(symbol, self.strategy_class, history, cash=self.cash,
+                                  commission=self.commission, strategy_params=self.strategy_params,
+                                  start_date=start_date, end_date=end_date, sentiment_data=sentiment_data)
+        runner.start()
+        self.runners[symbol] = runner
+        return runner
+
+    def rebuild_runner(self, symbol, history, start_date=None, end_date=None, sentiment_data=None):
+        """停止证券现有的引擎，用新的历史K线重新创建并预热（用正式日线替换已推送的临时K线）"""
+        runner = self.runners.pop(symbol, None)
+        if runner is not None:
+            runner.stop()
+        return self.ensure_runner(symbol, history, start_date=start_date, end_date=end_date,
+                                  sentiment_data=sentiment_data)
+
+    def stop(self):
+        for runner in self.runners.values():
+            runner.stop()
+        self.runners.clear()
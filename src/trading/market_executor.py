@@ -2,6 +2,8 @@ import pandas as pd
 import os
 from datetime import datetime, timedelta
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
 import tushare as ts
 import akshare as ak
 import backtrader as bt
@@ -9,63 +11,57 @@ from src.utils.logger import setup_logger
 from src.utils.notification import send_notification
 from src.strategies.market_sentiment_strategy import MarketSentimentStrategy
 from src.data.data_loader import DataLoader
+from src.data.trade_calendar import TradeCalendar
+from src.data.realtime_snapshot import RealtimeSnapshotProvider
+from src.strategies.market_sentiment.sentiment_data import get_sentiment_data
+from src.trading.live_engine import LiveEngine
+from src.trading.trade_journal import TradeJournal
 from src.utils.analysis import Analysis
 
 logger = setup_logger()
 
 class MarketExecutor:
-    def __init__(self, symbols: list, tushare_token: str):
+    def __init__(self, symbols: list, tushare_token: str, live: bool = True, use_realtime: bool = False,
+                 max_workers: int = 8, tick_deadline: float = 60.0):
+        """
+        Args:
+            symbols: 证券代码列表
+            tushare_token: Tushare的API token
+            live: 是否使用常驻实盘引擎。为True时每个证券的策略状态、指标和持仓常驻内存，
+                  每次执行只推送新K线；为False时每次执行都重新下载一年数据并完整回测
+            use_realtime: 常驻模式下，当天日线尚未发布时是否用实时行情快照作为当天K线
+            max_workers: 常驻模式下并发处理证券的最大线程数
+            tick_deadline: 常驻模式下每次执行等待各证券处理完成的最长时间（秒）
+        """
         self.symbols = symbols
         self.records_dir = "data/trading_records"
+        self.journal = TradeJournal.shared(os.path.join(self.records_dir, "trades.db"))
         self.data_loader = DataLoader(tushare_token=tushare_token)
         self.analysis = Analysis()
+        self.live = live
+        self.use_realtime = use_realtime
+        self.snapshot_provider = RealtimeSnapshotProvider.shared()
+        self.live_engine = LiveEngine(MarketSentimentStrategy) if live else None
+        self.tick_deadline = tick_deadline
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='executor') if live else None
+        self._pending = {}  # 超时未完成的证券 -> (future, 提交时间)
+        self._sentiment_lock = threading.Lock()
+        self._sentiment_cache = None  # (执行时间, 情绪数据)
+        self.last_report = None  # 最近一次执行各证券的状态、信号和延迟
         os.makedirs(self.records_dir, exist_ok=True)
         
     def is_trading_day(self):
         """判断当前是否为交易日"""
         today = datetime.now().date()
-        # 获取交易日历
-        trade_cal = self.data_loader.pro.trade_cal(exchange='SSE', 
-                                 start_date=today.strftime('%Y%m%d'),
-                                 end_date=today.strftime('%Y%m%d'))
-        return trade_cal.iloc[0]['is_open'] == 1
+        # 使用本地交易日历
+        return TradeCalendar.shared('SSE', pro=self.data_loader.pro).is_open(today)
         
     def get_realtime_data(self, ts_code):
-        """获取实时行情数据"""
+        """获取实时行情数据（从共享的全市场行情快照中读取）"""
         try:
-            # 获取实时行情
-            # 转换为雪球指数代码格式
-            if ts_code == '000001.SH':
-                market_code = 'SH000001'
-            elif ts_code == '000300.SH':
-                market_code = 'SH000300'
-            elif ts_code == '000016.SH':
-                market_code = 'SH000016'
-            elif ts_code == '399240.SZ':
-                market_code = 'SZ399240'
-            else:
-                market_code = ts_code.replace('.SH', 'SH').replace('.SZ', 'SZ')
-                
-            realtime_data = ak.stock_individual_spot_xq(symbol=market_code)
-            if realtime_data is not None and not realtime_data.empty:
-                # 将数据转换为以item为索引的格式
-                realtime_data = realtime_data.set_index('item')
-                # 转换数据格式以匹配原有接口
-                return pd.DataFrame({
-                    'ts_code': [ts_code],
-                    'open': [float(realtime_data.loc['今开', 'value'])],
-                    'high': [float(realtime_data.loc['最高', 'value'])],
-                    'low': [float(realtime_data.loc['最低', 'value'])],
-                    'close': [float(realtime_data.loc['现价', 'value'])],
-                    'pre_close': [float(realtime_data.loc['昨收', 'value'])],
-                    'vol': [float(realtime_data.loc['成交量', 'value'])],
-                    'amount': [float(realtime_data.loc['成交额', 'value'])]
-                })
-            return None
+            return self.snapshot_provider.get_quote(ts_code)
         except Exception as e:
             logger.error(f"获取实时数据失败: {str(e)}")
-            import traceback
-            traceback.print_exc()
             return None
             
     def execute(self):
@@ -78,6 +74,10 @@ class MarketExecutor:
                 
             # 获取当前时间
             current_time = datetime.now()
+
+            if self.live:
+                self._execute_live(current_time)
+                return
                             
             # 遍历上证50成分股进行回测
             for symbol in self.symbols:
@@ -177,12 +177,207 @@ class MarketExecutor:
             logger.error(f"执行策略回测时出错: {str(e)}")
             send_notification(f"策略回测错误: {str(e)}")
             
-    def _record_trade(self, symbol: str, action: str, timestamp: datetime, signal: float, 
-                     price: float, size: int, reason: str):
-        """记录交易到CSV文件"""
-        record_file = os.path.join(self.records_dir, f"trades_{timestamp.strftime('%Y%m%d')}.csv")
-        
-        record = {
+    def _get_new_bars(self, symbol, last_date, current_time, snapshot=None):
+        """获取last_date之后的新K线，当天日线未发布时用本次执行的实时行情快照补充
+
+        Returns:
+            tuple: (新K线DataFrame或None, 临时K线的日期)，未使用实时行情快照时临时K线的日期为None
+        """
+        bars = None
+        start_date = last_date + timedelta(days=1)
+        if start_date.date() <= current_time.date():
+            data = self.data_loader.download_data(symbol=symbol, start_date=start_date, end_date=current_time)
+            if data is not None:
+                bars = data.p.dataname
+        return self._append_snapshot(symbol, bars, last_date, current_time, snapshot)
+
+    def _append_snapshot(self, symbol, bars, last_date, current_time, snapshot=None):
+        """当天日线未发布时，在新K线后追加由实时行情快照生成的当天临时K线
+
+        Returns:
+            tuple: (新K线DataFrame或None, 临时K线的日期)，未追加临时K线时临时K线的日期为None
+        """
+        provisional_date = None
+        today = pd.Timestamp(current_time.date())
+        has_today = bars is not None and not bars.empty and pd.Timestamp(bars.index[-1]) >= today
+        if snapshot is not None and symbol in snapshot.index and not has_today and \
+                (last_date is None or last_date < today):
+            quote = snapshot.loc[symbol]
+            snapshot_bar = pd.DataFrame({
+                'open': [quote['open']],
+                'high': [quote['high']],
+                'low': [quote['low']],
+                'close': [quote['close']],
+                # 快照成交量的单位为股，日线的单位为手
+                'volume': [quote['vol'] / RealtimeSnapshotProvider.SHARES_PER_LOT],
+            }, index=pd.DatetimeIndex([today]))
+            bars = snapshot_bar if bars is None else pd.concat([bars, snapshot_bar])
+            provisional_date = today
+        return bars, provisional_date
+
+    def _get_sentiment_data(self, start_date, current_time):
+        """获取本次执行的最新情绪数据，多个线程同时请求时只获取一次"""
+        with self._sentiment_lock:
+            if self._sentiment_cache is None or self._sentiment_cache[0] != current_time:
+                self._sentiment_cache = (current_time, get_sentiment_data(start_date=start_date.date(),
+                                                                          end_date=current_time.date()))
+            return self._sentiment_cache[1]
+
+    def _evaluate_symbol(self, symbol, start_date, current_time, snapshot=None):
+        """在工作线程中处理单个证券：首次用上一交易日及之前的历史预热策略，之后推送新K线并执行一次next
+
+        首次处理时预热后即推送当天的K线，当天的信号在首次执行时即可产生。
+
+        Returns:
+            dict: 处理结果，包含symbol/status/signals/latency/error，
+                  status为warmup（预热）/signal（产生信号）/idle（无信号或无新K线）/error（出错）
+        """
+        started = time.perf_counter()
+        result = {'symbol': symbol, 'status': 'idle', 'signals': [], 'latency': 0.0, 'error': None}
+        try:
+            runner = self.live_engine.runners.get(symbol)
+            if runner is None or not runner.alive:
+                data = self.data_loader.download_data(symbol=symbol, start_date=start_date, end_date=current_time)
+                if data is None:
+                    raise ValueError("获取历史数据失败")
+                # 预热到上一交易日为止，预热期间产生的历史信号不再记录；
+                # 当天的日线（或实时行情快照）在预热后立即推送，其信号与之后的K线一样记录
+                history = data.p.dataname
+                today = pd.Timestamp(current_time.date())
+                is_today = pd.DatetimeIndex(history.index) >= today
+                sentiment_data = self._get_sentiment_data(start_date, current_time)
+                runner = self.live_engine.ensure_runner(symbol, history[~is_today], start_date=start_date,
+                                                        end_date=current_time, sentiment_data=sentiment_data)
+                result['status'] = 'warmup'
+                bars = history[is_today] if is_today.any() else None
+                bars, provisional_date = self._append_snapshot(symbol, bars, runner.last_date, current_time, snapshot)
+            else:
+                bars, provisional_date = self._get_new_bars(symbol, runner.last_date, current_time, snapshot)
+            if bars is not None and not bars.empty:
+                # 所有证券共用本次执行获取的最新情绪数据
+                sentiment_data = self._get_sentiment_data(start_date, current_time)
+                official = pd.DatetimeIndex(bars.index)
+                if provisional_date is not None:
+                    official = official[official != provisional_date]
+                if runner.provisional_date is not None and (official <= runner.provisional_date).any():
+                    # 临时K线的正式日线已发布：用截至该日的正式历史重建引擎替换临时K线，
+                    # 临时K线上的信号已在推送时记录，重建预热期间的信号不再记录
+                    runner = self._rebuild_runner(symbol, start_date, runner.provisional_date, sentiment_data)
+                result['signals'] = runner.step(bars, sentiment_data=sentiment_data, timeout=self.tick_deadline,
+                                                provisional_date=provisional_date)
+                if result['signals']:
+                    result['status'] = 'signal'
+        except Exception as e:
+            result['status'] = 'error'
+            result['error'] = str(e)
+        result['latency'] = time.perf_counter() - started
+        return result
+
+    def _rebuild_runner(self, symbol, start_date, end_date, sentiment_data):
+        """用start_date至end_date的正式日线重建证券的引擎"""
+        data = self.data_loader.download_data(symbol=symbol, start_date=start_date, end_date=end_date)
+        if data is None:
+            raise ValueError("获取历史数据失败")
+        logger.info(f"{symbol}正式日线已发布，重建实盘引擎替换{end_date.date()}的临时K线")
+        return self.live_engine.rebuild_runner(symbol, data.p.dataname, start_date=start_date, end_date=end_date,
+                                               sentiment_data=sentiment_data)
+
+    def _handle_result(self, result, current_time, records):
+        """处理单个证券的结果，信号追加到本次执行的交易记录中"""
+        symbol = result['symbol']
+        if result['status'] == 'error':
+            logger.error(f"处理股票 {symbol} 时出错: {result['error']}")
+        for signal in result['signals']:
+            records.append(self._trade_record(
+                symbol=symbol,
+                action=signal['action'],
+                timestamp=current_time,
+                signal=signal['signal'],
+                price=signal['price'],
+                size=signal['size'],
+                reason=signal['reason']
+            ))
+
+    def _execute_live(self, current_time):
+        """常驻模式：各证券在工作线程池中并发处理
+
+        首次执行时用历史数据预热各证券的策略，之后每次只推送新K线并执行一次next。
+        单个证券出错不影响其他证券；超过本次执行的截止时间仍未完成的证券不再等待，
+        其结果在下次执行时收取，期间不会重复提交该证券。
+        """
+        tick_start = time.perf_counter()
+        start_date = current_time - timedelta(days=self.live_engine.warmup_days)
+        report = []
+        records = []
+
+        # 收取上次超时证券的迟到结果
+        for symbol, (future, submitted_at) in list(self._pending.items()):
+            if future.done():
+                del self._pending[symbol]
+                result = future.result()
+                result['late'] = True
+                self._handle_result(result, submitted_at, records)
+                report.append(result)
+
+        # 本次执行的所有证券共用同一份实时行情快照
+        snapshot = None
+        if self.use_realtime:
+            snapshot = self.snapshot_provider.get_snapshot(self.symbols)
+
+        futures = {}
+        for symbol in self.symbols:
+            if symbol in self._pending:
+                continue
+            futures[self._pool.submit(self._evaluate_symbol, symbol, start_date, current_time,
+                                      snapshot)] = symbol
+
+        done, not_done = wait(futures, timeout=self.tick_deadline)
+        for future in done:
+            result = future.result()
+            self._handle_result(result, current_time, records)
+            report.append(result)
+        for future in not_done:
+            symbol = futures[future]
+            self._pending[symbol] = (future, current_time)
+            report.append({'symbol': symbol, 'status': 'timeout', 'signals': [],
+                           'latency': time.perf_counter() - tick_start, 'error': None})
+
+        # 本次执行的全部交易记录在一个事务中写入
+        try:
+            self.journal.record_many(records)
+        except Exception as e:
+            logger.error(f"写入交易记录失败: {str(e)}")
+
+        # 发送通知（异步分发，同一次执行的多条通知会合并发送）
+        for record in records:
+            message = f"交易提醒: {record['symbol']} {record['action'].upper()} 信号\n"
+            message += f"价格: {record['price']}, 数量: {record['size']}\n"
+            message += f"原因: {record['reason']}"
+            send_notification(message)
+
+        self.last_report = pd.DataFrame([{
+            'symbol': r['symbol'],
+            'status': r['status'],
+            'signal': ','.join(s['action'] for s in r['signals']),
+            'latency_ms': round(r['latency'] * 1000, 1),
+            'late': r.get('late', False),
+            'error': r['error'],
+        } for r in report], columns=['symbol', 'status', 'signal', 'latency_ms', 'late', 'error'])
+
+        counts = self.last_report['status'].value_counts().to_dict()
+        latency = self.last_report['latency_ms']
+        logger.info(f"本次执行完成 - 证券数: {len(self.symbols)}, 状态: {counts}, "
+                    f"耗时: {time.perf_counter() - tick_start:.2f}秒, "
+                    f"单证券延迟中位数/最大值: {latency.median():.1f}/{latency.max():.1f}毫秒")
+        signals = self.last_report[self.last_report['signal'] != '']
+        if not signals.empty:
+            logger.info(f"本次执行信号:\n{signals.to_string(index=False)}")
+        return self.last_report
+
+    @staticmethod
+    def _trade_record(symbol: str, action: str, timestamp: datetime, signal: float,
+                      price: float, size: int, reason: str):
+        return {
             "timestamp": timestamp,
             "symbol": symbol,
             "action": action,
@@ -192,13 +387,11 @@ class MarketExecutor:
             "reason": reason,
             "strategy": "market_sentiment"
         }
-        
-        df = pd.DataFrame([record])
-        
-        if os.path.exists(record_file):
-            df.to_csv(record_file, mode='a', header=False, index=False)
-        else:
-            df.to_csv(record_file, index=False)
+
+    def _record_trade(self, symbol: str, action: str, timestamp: datetime, signal: float, 
+                     price: float, size: int, reason: str):
+        """记录交易到交易日志"""
+        self.journal.record(**self._trade_record(symbol, action, timestamp, signal, price, size, reason))
             
     def run_continuously(self, interval: int = 3600):
         """持续运行策略回测，每小时执行一次"""
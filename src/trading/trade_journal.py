@@ -0,0 +1,157 @@
+import os
+import glob
+import sqlite3
+import threading
+from datetime import datetime
+import pandas as pd
+from loguru import logger
+
+
+class TradeJournal:
+    """实盘交易信号日志
+
+    交易记录只追加写入SQLite数据库（WAL模式），每批记录在一个事务中提交，
+    进程崩溃时不会留下半条记录。按交易日期、证券代码建有索引，
+    读取当天的交易记录只需一次索引查询。
+    """
+
+    # 交易记录的列，与原CSV文件的列一致
+    COLUMNS = ['timestamp', 'symbol', 'action', 'signal', 'price', 'size', 'reason', 'strategy']
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            trade_date TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            symbol TEXT NOT NULL,
+            action TEXT NOT NULL,
+            signal REAL,
+            price REAL,
+            size INTEGER,
+            reason TEXT,
+            strategy TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_trades_date_symbol ON trades (trade_date, symbol);
+        CREATE INDEX IF NOT EXISTS idx_trades_symbol_date ON trades (symbol, trade_date);
+    """
+
+    _shared = {}  # 数据库路径 -> 进程内共享的实例
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path='data/trading_records/trades.db'):
+        """
+        Args:
+            path: 数据库文件路径，所在目录中的旧版trades_YYYYMMDD.csv会在首次创建数据库时导入
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        is_new = not os.path.exists(path)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        if is_new:
+            self._import_csv(os.path.dirname(path) or '.')
+
+    @classmethod
+    def shared(cls, path='data/trading_records/trades.db'):
+        """返回进程内共享的实例"""
+        key = os.path.abspath(path)
+        with cls._shared_lock:
+            if key not in cls._shared:
+                cls._shared[key] = cls(path)
+            return cls._shared[key]
+
+    @staticmethod
+    def _to_row(record):
+        timestamp = pd.Timestamp(record['timestamp'])
+        return (
+            timestamp.strftime('%Y%m%d'),
+            timestamp.isoformat(sep=' '),
+            record['symbol'],
+            record['action'],
+            None if pd.isna(record.get('signal')) else float(record['signal']),
+            None if pd.isna(record.get('price')) else float(record['price']),
+            None if pd.isna(record.get('size')) else int(record['size']),
+            None if pd.isna(record.get('reason')) else str(record['reason']),
+            record.get('strategy'),
+        )
+
+    def record_many(self, records):
+        """在一个事务中追加一批交易记录
+
+        Args:
+            records: 字典列表，键为COLUMNS
+        """
+        rows = [self._to_row(record) for record in records]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO trades (trade_date, timestamp, symbol, action, signal, price, size, reason, strategy) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def record(self, **record):
+        """追加一条交易记录"""
+        self.record_many([record])
+
+    def _import_csv(self, records_dir):
+        """导入旧版按天保存的trades_YYYYMMDD.csv"""
+        files = sorted(glob.glob(os.path.join(records_dir, 'trades_*.csv')))
+        if not files:
+            return
+        try:
+            df = pd.concat([pd.read_csv(f) for f in files], ignore_index=True)
+            self.record_many(df.to_dict('records'))
+            logger.info(f"已导入旧版交易记录 - 文件数: {len(files)}, 记录数: {len(df)}")
+        except Exception as e:
+            logger.warning(f"导入旧版交易记录失败: {str(e)}")
+
+    @staticmethod
+    def _to_str(value):
+        if isinstance(value, datetime):
+            return value.strftime('%Y%m%d')
+        return pd.Timestamp(value).strftime('%Y%m%d')
+
+    def query(self, trade_date=None, symbol=None, start_date=None, end_date=None):
+        """按日期/证券代码查询交易记录
+
+        Args:
+            trade_date: 交易日期，指定时忽略start_date/end_date
+            symbol: 证券代码
+            start_date: 开始日期（含）
+            end_date: 结束日期（含）
+        Returns:
+            pd.DataFrame: 列为COLUMNS，按时间降序
+        """
+        conditions, params = [], []
+        if trade_date is not None:
+            conditions.append("trade_date = ?")
+            params.append(self._to_str(trade_date))
+        else:
+            if start_date is not None:
+                conditions.append("trade_date >= ?")
+                params.append(self._to_str(start_date))
+            if end_date is not None:
+                conditions.append("trade_date <= ?")
+                params.append(self._to_str(end_date))
+        if symbol is not None:
+            conditions.append("symbol = ?")
+            params.append(symbol)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = f"SELECT {', '.join(self.COLUMNS)} FROM trades{where} ORDER BY timestamp DESC, id DESC"
+        with self._lock:
+            df = pd.read_sql_query(sql, self._conn, params=params)
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        return df
+
+    def latest_trade_date(self):
+        """最近一条交易记录的日期（YYYYMMDD），无记录时返回None"""
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(trade_date) FROM trades").fetchone()
+        return row[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -4,10 +4,11 @@ from datetime import datetime
 from loguru import logger
 from .analysis import Analysis
 from .plot import Plot
+from .profiler import BacktestProfiler
 import sys
 
 class BacktestEngine:
-    def __init__(self, strategy_class, data_feed, cash=100000.0, commission=0.00025, strategy_params=None):
+    def __init__(self, strategy_class, data_feed, cash=100000.0, commission=0.00025, strategy_params=None, profile=False):
         """初始化回测引擎
         Args:
             strategy_class: 策略类
@@ -15,7 +16,13 @@ class BacktestEngine:
             cash: 初始资金
             commission: 股票交易手续费率
             strategy_params: 策略参数
+            profile: 是否开启耗时分析，开启后对策略、指标、数据加载和分析器逐个计时
         """
+        # 耗时分析器（仅在开启时挂载）
+        self.profiler = BacktestProfiler() if profile else None
+        if self.profiler:
+            strategy_class = self.profiler.instrument_strategy(strategy_class)
+        
         self.cerebro = bt.Cerebro()
         self.cerebro.broker.setcash(cash)
         
@@ -54,6 +61,10 @@ class BacktestEngine:
             if hasattr(data_feed, 'params'):
                 data_feed.params.pop('ts_code', None)
             self.cerebro.adddata(data_feed)
+        
+        if self.profiler:
+            for feed in self.cerebro.datas:
+                self.profiler.instrument_data(feed)
             
         # 添加策略和参数
         if strategy_params:
@@ -77,10 +88,15 @@ class BacktestEngine:
             self.cerebro.addanalyzer(bt.analyzers.Transactions, _name='txn')
         
         self.trades = []  # 存储交易记录
+        self.profile_report = None  # 耗时分析结果
         
     def run(self):
         """运行回测"""
-        results = self.cerebro.run()
+        if self.profiler:
+            results = self.profiler.run(self.cerebro)
+            self.profile_report = self.profiler.log_report()
+        else:
+            results = self.cerebro.run()
         
         self.strategy = results[0]
                 
@@ -97,6 +113,18 @@ class BacktestEngine:
         
         return analysis
     
+    def dump_profile(self, path=None):
+        """保存火焰图格式的耗时数据
+        Args:
+            path: 输出文件路径，默认保存到logs目录
+        """
+        if not self.profiler:
+            logger.warning("未开启耗时分析，请使用profile=True创建回测引擎")
+            return None
+        if path is None:
+            path = f"logs/profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.folded"
+        return self.profiler.dump_folded(path)
+    
     def plot(self, **kwargs):
         """使用Plotly绘制交互式回测结果"""
         fig = Plot(self.strategy).plot()
@@ -1,5 +1,8 @@
 import json
 import os
+import queue
+import threading
+import time
 import requests
 from src.utils.logger import setup_logger
 
@@ -14,17 +17,24 @@ def load_settings():
     return {"sms": {"enabled": False}, "wechat": {"enabled": False}}
 
 def send_sms(message: str, api_key: str, phone_number: str):
-    """发送短信通知"""
+    """发送短信通知，返回是否成功"""
     # 这里需要根据实际使用的短信服务商API来实现
     # 示例使用阿里云短信服务
     try:
         # TODO: 实现实际的短信发送逻辑
         logger.info(f"发送短信到 {phone_number}: {message}")
+        return True
     except Exception as e:
         logger.error(f"发送短信失败: {str(e)}")
+        return False
 
-def send_wechat(message: str, webhook_url: str):
-    """发送企业微信通知"""
+def send_wechat(message: str, webhook_url: str, session=None, timeout: float = 10.0):
+    """发送企业微信通知，返回是否成功
+
+    Args:
+        session: 复用连接的requests.Session，为None时每次新建连接
+        timeout: 请求超时时间（秒）
+    """
     try:
         data = {
             "msgtype": "text",
@@ -32,27 +42,228 @@ def send_wechat(message: str, webhook_url: str):
                 "content": message
             }
         }
-        response = requests.post(webhook_url, json=data)
+        response = (session or requests).post(webhook_url, json=data, timeout=timeout)
         response.raise_for_status()
         logger.info(f"发送企业微信通知成功: {message}")
+        return True
     except Exception as e:
         logger.error(f"发送企业微信通知失败: {str(e)}")
+        return False
+
+
+class NotificationDispatcher:
+    """异步通知分发器
+
+    通知先放入有界队列后立即返回，由后台线程发送，调用方不会阻塞在网络请求上。
+    后台线程在coalesce_window秒内收集到的多条通知合并为一条发送，
+    失败时按指数退避重试，并复用HTTP连接。队列已满时丢弃新通知并计数。
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_queue=1000, coalesce_window=0.5, max_retries=3, backoff=1.0,
+                 max_message_length=2000, settings_ttl=60.0):
+        """
+        Args:
+            max_queue: 队列容量
+            coalesce_window: 合并通知的时间窗口（秒）
+            max_retries: 发送失败后的最大重试次数
+            backoff: 首次重试的等待时间（秒），之后每次翻倍
+            max_message_length: 合并后单条通知的最大UTF-8字节数（企业微信文本消息上限为2048字节）
+            settings_ttl: 通知设置的缓存时间（秒）
+        """
+        self.coalesce_window = coalesce_window
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_message_length = max_message_length
+        self.settings_ttl = settings_ttl
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._session = requests.Session()
+        self._settings = None
+        self._settings_loaded = 0.0
+        self._lock = threading.Lock()
+        self._stats = {'submitted': 0, 'sent': 0, 'dropped': 0, 'failed': 0, 'batches': 0,
+                       'latency_total': 0.0, 'latency_max': 0.0}
+        self._thread = threading.Thread(target=self._run, name='notification', daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def shared(cls):
+        """返回进程内共享的分发器"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def submit(self, message: str):
+        """提交一条通知，不阻塞；队列已满时丢弃并返回False"""
+        try:
+            self._queue.put_nowait((time.time(), message))
+        except queue.Full:
+            with self._lock:
+                self._stats['dropped'] += 1
+            logger.warning(f"通知队列已满，丢弃通知: {message}")
+            return False
+        with self._lock:
+            self._stats['submitted'] += 1
+        return True
+
+    def _get_settings(self):
+        if self._settings is None or time.time() - self._settings_loaded >= self.settings_ttl:
+            self._settings = load_settings()
+            self._settings_loaded = time.time()
+        return self._settings
+
+    def _collect(self):
+        """阻塞取出第一条通知，再收集合并窗口内的其余通知"""
+        batch = [self._queue.get()]
+        deadline = time.time() + self.coalesce_window
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    @staticmethod
+    def _size(text):
+        """文本的UTF-8字节数，企业微信按字节限制消息长度"""
+        return len(text.encode('utf-8'))
+
+    @staticmethod
+    def _header(count):
+        return f"共{count}条通知\n\n" if count > 1 else ""
+
+    def _join(self, chunk):
+        """把一批通知拼成一条消息"""
+        messages = [message for _, message in chunk]
+        return self._header(len(messages)) + "\n\n".join(messages)
+
+    def _split(self, message):
+        """把超过max_message_length字节的单条通知按字符边界切分为多段"""
+        parts, part, size = [], [], 0
+        for char in message:
+            char_size = self._size(char)
+            if part and size + char_size > self.max_message_length:
+                parts.append("".join(part))
+                part, size = [], 0
+            part.append(char)
+            size += char_size
+        if part:
+            parts.append("".join(part))
+        return parts
+
+    def _chunks(self, batch):
+        """把多条通知合并为UTF-8字节数（含标题行和分隔符）不超过max_message_length的若干批
+
+        Yields:
+            (通知列表, 要发送的消息列表)。超长的单条通知单独成批，切分为多段消息发送
+        """
+        chunk = []
+        size = 0  # 正文字节数，不含标题行
+        for item in batch:
+            message_size = self._size(item[1])
+            if message_size > self.max_message_length:
+                if chunk:
+                    yield chunk, [self._join(chunk)]
+                    chunk, size = [], 0
+                yield [item], self._split(item[1])
+                continue
+            new_size = size + message_size + (2 if chunk else 0)
+            if chunk and self._size(self._header(len(chunk) + 1)) + new_size > self.max_message_length:
+                yield chunk, [self._join(chunk)]
+                chunk, new_size = [], message_size
+            chunk.append(item)
+            size = new_size
+        if chunk:
+            yield chunk, [self._join(chunk)]
+
+    def _retry(self, channel, send):
+        """调用一个渠道的发送函数，失败时指数退避重试"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                if send():
+                    return True
+            except Exception as e:
+                logger.error(f"发送{channel}通知出错: {str(e)}")
+            if attempt < self.max_retries:
+                time.sleep(self.backoff * (2 ** attempt))
+        logger.error(f"发送{channel}通知失败，已重试{self.max_retries}次")
+        return False
+
+    def _send(self, message):
+        """发送一条（合并后的）通知到所有已启用的渠道，各渠道分别重试，返回是否全部成功"""
+        settings = self._get_settings()
+        ok = True
+        
+        # 发送短信通知
+        if settings["sms"]["enabled"]:
+            ok = self._retry("短信", lambda: send_sms(
+                message,
+                settings["sms"]["api_key"],
+                settings["sms"]["phone_number"]
+            )) and ok
+        
+        # 发送企业微信通知
+        if settings["wechat"]["enabled"]:
+            ok = self._retry("企业微信", lambda: send_wechat(
+                message,
+                settings["wechat"]["webhook_url"],
+                session=self._session
+            )) and ok
+        return ok
+
+    def _dispatch(self, batch):
+        for chunk, messages in self._chunks(batch):
+            # 切分后的各段都要发送，任一段失败即视为该通知发送失败
+            ok = all([self._send(message) for message in messages])
+            now = time.time()
+            with self._lock:
+                self._stats['batches'] += 1
+                if not ok:
+                    self._stats['failed'] += len(chunk)
+                    continue
+                self._stats['sent'] += len(chunk)
+                for submitted_at, _ in chunk:
+                    latency = now - submitted_at
+                    self._stats['latency_total'] += latency
+                    self._stats['latency_max'] = max(self._stats['latency_max'], latency)
+            logger.info(f"通知已发送 - 合并条数: {len(chunk)}, 最大投递延迟: {now - chunk[0][0]:.2f}秒")
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._dispatch(batch)
+            except Exception as e:
+                logger.error(f"通知分发出错: {str(e)}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def flush(self, timeout=None):
+        """等待队列中的通知全部处理完成，返回是否在超时前完成"""
+        deadline = None if timeout is None else time.time() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.time() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def stats(self):
+        """投递统计：提交/发送/丢弃/失败条数、发送批次数及平均/最大投递延迟（秒）"""
+        with self._lock:
+            stats = dict(self._stats)
+        latency_total = stats.pop('latency_total')
+        stats['latency_avg'] = latency_total / stats['sent'] if stats['sent'] else 0.0
+        stats['queued'] = self._queue.qsize()
+        return stats
+
 
 def send_notification(message: str):
-    """发送通知"""
-    settings = load_settings()
-    
-    # 发送短信通知
-    if settings["sms"]["enabled"]:
-        send_sms(
-            message,
-            settings["sms"]["api_key"],
-            settings["sms"]["phone_number"]
-        )
-    
-    # 发送企业微信通知
-    if settings["wechat"]["enabled"]:
-        send_wechat(
-            message,
-            settings["wechat"]["webhook_url"]
-        ) 
\ No newline at end of file
+    """发送通知（提交到异步分发器后立即返回）"""
+    return NotificationDispatcher.shared().submit(message)
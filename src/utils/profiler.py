@@ -0,0 +1,134 @@
+import os
+import time
+import backtrader as bt
+import pandas as pd
+from loguru import logger
+
+
+class BacktestProfiler:
+    """回测热点分析器
+
+    对策略的next/notify_order、策略注册的各个指标、数据源加载以及分析器逐个计时，
+    用于定位回测过程中的耗时热点。仅在BacktestEngine开启profile时才会挂载，
+    未开启时策略类和数据源保持原样，不产生任何额外开销。
+    """
+
+    # 分析器中需要计时的内部回调
+    ANALYZER_HOOKS = ('_prenext', '_nextstart', '_next', '_notify_order', '_notify_trade',
+                      '_notify_cashvalue', '_notify_fund', '_stop')
+
+    def __init__(self):
+        self.stats = {}  # (类别, 组件) -> [调用次数, 总耗时(纳秒)]
+        self.wall_time = 0  # cerebro.run总耗时(纳秒)
+
+    def wrap(self, category, name, func):
+        """返回带计时的函数包装，同一(类别, 组件)的耗时会累加"""
+        stat = self.stats.setdefault((category, name), [0, 0])
+        perf_counter = time.perf_counter_ns
+
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stat[0] += 1
+                stat[1] += perf_counter() - start
+
+        return wrapper
+
+    def instrument_strategy(self, strategy_class):
+        """生成带计时的策略子类
+
+        Args:
+            strategy_class: 原始策略类
+        Returns:
+            继承自原始策略类的子类，next/notify_order被计时，
+            并在start时挂载指标和分析器的计时
+        """
+        profiler = self
+        name = strategy_class.__name__
+
+        def start(strategy):
+            profiler.instrument_indicators(strategy)
+            profiler.instrument_analyzers(strategy)
+            strategy_class.start(strategy)
+
+        return type(name, (strategy_class,), {
+            'start': start,
+            'next': self.wrap('strategy', f'{name}.next', strategy_class.next),
+            'notify_order': self.wrap('strategy', f'{name}.notify_order', strategy_class.notify_order),
+        })
+
+    def instrument_data(self, data):
+        """对数据源的启动和预加载计时"""
+        name = getattr(data, '_name', None) or getattr(data.p, 'ts_code', None) or type(data).__name__
+        data._start = self.wrap('data', f'{name}.start', data._start)
+        data.preload = self.wrap('data', f'{name}.preload', data.preload)
+
+    def instrument_indicators(self, strategy):
+        """对策略直接注册的指标计时（子指标的耗时计入其所属指标）"""
+        # 优先使用策略中的属性名作为组件名，便于区分同类型的多个指标
+        attr_names = {id(value): key for key, value in vars(strategy).items()}
+        indicators = strategy._lineiterators[bt.LineIterator.IndType]
+        for i, indicator in enumerate(indicators):
+            cls_name = type(indicator).__name__
+            attr = attr_names.get(id(indicator))
+            name = f'{attr}({cls_name})' if attr else f'{cls_name}#{i}'
+            indicator._next = self.wrap('indicator', name, indicator._next)
+            indicator._once = self.wrap('indicator', name, indicator._once)
+
+    def instrument_analyzers(self, strategy):
+        """对策略挂载的分析器计时"""
+        for name, analyzer in strategy.analyzers.getitems():
+            for hook in self.ANALYZER_HOOKS:
+                setattr(analyzer, hook, self.wrap('analyzer', name, getattr(analyzer, hook)))
+
+    def run(self, cerebro):
+        """运行cerebro并记录总耗时"""
+        start = time.perf_counter_ns()
+        try:
+            return cerebro.run()
+        finally:
+            self.wall_time = time.perf_counter_ns() - start
+
+    def _entries(self):
+        """返回 (类别, 组件, 调用次数, 耗时纳秒) 列表，未被计时的框架开销归入cerebro.other"""
+        entries = [(category, name, calls, total) for (category, name), (calls, total) in self.stats.items()]
+        measured = sum(total for _, _, _, total in entries)
+        if self.wall_time > measured:
+            entries.append(('cerebro', 'other', 1, self.wall_time - measured))
+        return entries
+
+    def report(self):
+        """生成按耗时排序的组件统计表
+
+        Returns:
+            pd.DataFrame: 列为category/component/calls/total_ms/per_call_us/pct
+        """
+        wall_time = self.wall_time or sum(total for _, _, _, total in self._entries()) or 1
+        rows = [{
+            'category': category,
+            'component': name,
+            'calls': calls,
+            'total_ms': total / 1e6,
+            'per_call_us': total / calls / 1e3 if calls else 0.0,
+            'pct': total / wall_time,
+        } for category, name, calls, total in self._entries()]
+        df = pd.DataFrame(rows, columns=['category', 'component', 'calls', 'total_ms', 'per_call_us', 'pct'])
+        return df.sort_values('total_ms', ascending=False).reset_index(drop=True)
+
+    def log_report(self):
+        """将统计表输出到日志"""
+        df = self.report()
+        logger.info(f"=== 回测耗时分析 (总耗时: {self.wall_time / 1e6:.1f}ms) ===\n"
+                    f"{df.to_string(index=False, formatters={'pct': '{:.2%}'.format})}")
+        return df
+
+    def dump_folded(self, path):
+        """输出flamegraph.pl/speedscope可读取的折叠栈格式，计数单位为微秒"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            for category, name, _, total in self._entries():
+                f.write(f"backtest;{category};{name} {total // 1000}\n")
+        logger.info(f"回测耗时火焰图数据已保存: {path}")
+        return path
@@ -0,0 +1,62 @@
+import os
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# rl_model_finrl各模块按src.strategies.rl_model_finrl导入（在上层项目中的位置），
+# 本仓库中该包在根目录。这里只注册各级包的路径，不执行包的__init__，
+# 测试只导入被测模块本身及其依赖，不需要安装所有可选依赖。
+RL_PACKAGE = 'src.strategies.rl_model_finrl'
+RL_ROOT = os.path.join(ROOT, 'rl_model_finrl')
+if RL_PACKAGE not in sys.modules:
+    for dirpath, dirnames, filenames in os.walk(RL_ROOT):
+        dirnames[:] = [d for d in dirnames if d != '__pycache__']
+        if '__init__.py' not in filenames:
+            continue
+        relative = os.path.relpath(dirpath, RL_ROOT)
+        name = RL_PACKAGE if relative == '.' else RL_PACKAGE + '.' + relative.replace(os.sep, '.')
+        module = types.ModuleType(name)
+        module.__path__ = [dirpath]
+        module.__package__ = name
+        sys.modules[name] = module
+
+
+def make_etf_frame(num_tickers=3, num_days=120, seed=0):
+    """生成多只ETF的随机游走长表（索引为日期，包含tic和OHLCV列）"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2020-01-01', periods=num_days, name='date')
+    frames = []
+    for i in range(num_tickers):
+        close = 10 * (i + 1) * np.exp(np.cumsum(rng.normal(0, 0.01, num_days)))
+        frames.append(pd.DataFrame({
+            'tic': f'5100{i:02d}.SH',
+            'open': close * (1 + rng.normal(0, 0.003, num_days)),
+            'high': close * (1 + rng.random(num_days) * 0.01),
+            'low': close * (1 - rng.random(num_days) * 0.01),
+            'close': close,
+            'volume': rng.integers(100000, 1000000, num_days).astype(float),
+        }, index=dates))
+    return pd.concat(frames).sort_index(kind='stable')
+
+
+@pytest.fixture
+def etf_frame():
+    return make_etf_frame()
+
+
+@pytest.fixture
+def etf_env(etf_frame):
+    from src.strategies.rl_model_finrl.applications.stock_trading.etf_env import ETFTradingEnv
+    return ETFTradingEnv(
+        df=etf_frame,
+        stock_dim=etf_frame['tic'].nunique(),
+        reward_type='daily_return',
+        log_trades=False,
+    )
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from src.strategies.rl_model_finrl.applications.stock_trading.batched_env import BatchedETFTradingEnv
+
+
+def test_matches_single_env_on_full_actions(etf_env):
+    """随机起始关闭时，每个批量环境与单个ETFTradingEnv逐步一致"""
+    batched = BatchedETFTradingEnv(etf_env, num_envs=2, random_start=False, seed=0)
+    obs = batched.reset()
+    single_obs = etf_env.reset()
+    np.testing.assert_allclose(obs[0], single_obs, rtol=1e-6)
+
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        actions = rng.uniform(-1, 1, (2, etf_env.stock_dim))
+        obs, rewards, dones, _ = batched.step(actions)
+        single_obs, single_reward, _, _ = etf_env.step(actions[0])
+        np.testing.assert_allclose(obs[0], single_obs, rtol=1e-6)
+        assert rewards[0] == pytest.approx(single_reward, rel=1e-5)
+
+
+@pytest.mark.parametrize('shape', ['flat', 'column'])
+def test_per_env_scalar_actions_broadcast_like_single_env(etf_env, shape):
+    """每个环境一个动作值时广播到所有ETF，与ETFTradingEnv接受单个动作值的处理一致"""
+    batched = BatchedETFTradingEnv(etf_env, num_envs=2, random_start=False, seed=0)
+    batched.reset()
+    etf_env.reset()
+
+    values = np.array([0.5, 0.5])
+    actions = values if shape == 'flat' else values[:, None]
+    obs, rewards, _, _ = batched.step(actions)
+    single_obs, single_reward, _, _ = etf_env.step(np.array([0.5]))
+    np.testing.assert_allclose(obs[0], single_obs, rtol=1e-6)
+    assert rewards[0] == pytest.approx(single_reward, rel=1e-5)
+
+
+def test_rejects_mismatched_action_shape(etf_env):
+    batched = BatchedETFTradingEnv(etf_env, num_envs=2, seed=0)
+    batched.reset()
+    with pytest.raises(ValueError):
+        batched.step(np.zeros((2, etf_env.stock_dim + 1)))
@@ -0,0 +1,20 @@
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('tushare')
+
+from src.strategies.market_sentiment.etf_dividend_handler import ETFDividendHandler
+
+
+@pytest.mark.parametrize('when', [
+    date(2024, 6, 3),
+    datetime(2024, 6, 3, 15, 0),
+    pd.Timestamp('2024-06-03 15:00'),
+    '2024-06-03',
+])
+def test_process_dividend_accepts_date_like_values(when):
+    handler = ETFDividendHandler('510300.SH', store=object())
+    handler.dividend_map = {date(2024, 6, 3): 0.05}
+    assert handler.process_dividend(when, 1000, 4.0) == pytest.approx(50.0)
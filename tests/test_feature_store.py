@@ -0,0 +1,70 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from src.strategies.rl_model_finrl.meta.preprocessor.feature_store import FeatureStore
+
+
+def test_make_key_depends_on_options():
+    args = (['510300.SH', '510500.SH'], '2020-01-01', '2020-12-31', ['macd', 'rsi_30'], ['P', 2], 'tushare')
+    base = {'time_interval': '1d', 'adjust': 'qfq', 'use_turbulence': True, 'turbulence_window': 252}
+    key = FeatureStore.make_key(*args, options=base)
+    assert key == FeatureStore.make_key(*args, options=dict(base))
+    for name, value in [('time_interval', '1min'), ('adjust', 'hfq'), ('use_turbulence', False),
+                        ('turbulence_window', 60), ('definitions', 'pandas'), ('clean', {'dropna': False})]:
+        assert FeatureStore.make_key(*args, options={**base, name: value}) != key
+
+
+def test_get_or_build_round_trip_feeds_env(etf_env, tmp_path):
+    from src.strategies.rl_model_finrl.applications.stock_trading.shared_env import ENV_PARAMS
+
+    store = FeatureStore(str(tmp_path / 'feature_store'))
+    key = FeatureStore.make_key(list(etf_env.tickers), '2020-01-01', '2020-06-30', ['macd'], 1)
+    calls = []
+
+    def build():
+        calls.append(1)
+        return etf_env.get_market_data()
+
+    store.get_or_build(key, build)
+    market_data = store.get_or_build(key, build)
+    assert len(calls) == 1
+    assert isinstance(market_data['market_tensor'], np.memmap)
+    np.testing.assert_array_equal(market_data['close_matrix'], etf_env.get_market_data()['close_matrix'])
+
+    env_kwargs = {name: getattr(etf_env, name) for name in ENV_PARAMS}
+    env = type(etf_env)(df=None, market_data=market_data, **env_kwargs)
+    np.testing.assert_allclose(env.reset(), etf_env.reset(), rtol=1e-6)
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        actions = rng.uniform(-1, 1, etf_env.stock_dim)
+        obs, reward, _, _ = env.step(actions)
+        expected_obs, expected_reward, _, _ = etf_env.step(actions)
+        np.testing.assert_allclose(obs, expected_obs, rtol=1e-6)
+        assert reward == pytest.approx(expected_reward, rel=1e-6)
+
+
+def test_save_keeps_cache_published_concurrently(etf_env, tmp_path, monkeypatch):
+    from src.strategies.rl_model_finrl.meta.preprocessor import feature_store
+
+    market_data = etf_env.get_market_data()
+    store = FeatureStore(str(tmp_path / 'feature_store'))
+    other = FeatureStore(str(tmp_path / 'feature_store'))
+    key = 'race'
+    replace = os.replace
+
+    def publish_then_replace(src, dst):
+        # 在检查之后、重命名之前，另一个进程写入了同一个键
+        monkeypatch.setattr(feature_store.os, 'replace', replace)
+        other.save(key, market_data, info={'writer': 'other'})
+        return replace(src, dst)
+
+    monkeypatch.setattr(feature_store.os, 'replace', publish_then_replace)
+    store.save(key, market_data, info={'writer': 'self'})
+
+    assert store.load(key) is not None
+    with open(os.path.join(store.root, key, FeatureStore.META_FILE), encoding='utf-8') as f:
+        assert json.load(f)['info'] == {'writer': 'other'}
+    assert os.listdir(store.root) == [key]
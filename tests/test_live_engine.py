@@ -0,0 +1,60 @@
+import backtrader as bt
+import numpy as np
+import pandas as pd
+import pytest
+
+
+class BuyEveryBar(bt.Strategy):
+    """每根K线都买入1股，用于检查推送给策略的K线"""
+
+    def next(self):
+        self.buy(size=1)
+
+
+def make_bars(dates, close=10.0):
+    index = pd.DatetimeIndex(pd.to_datetime(dates))
+    values = np.full(len(index), close)
+    return pd.DataFrame({'open': values, 'high': values, 'low': values, 'close': values,
+                         'volume': np.full(len(index), 1000.0)}, index=index)
+
+
+@pytest.fixture
+def live_engine(tmp_path, monkeypatch):
+    # 导入时setup_logger会在当前目录创建logs/
+    monkeypatch.chdir(tmp_path)
+    from src.trading.live_engine import LiveEngine
+    engine = LiveEngine(BuyEveryBar)
+    yield engine
+    engine.stop()
+
+
+def test_provisional_bar_is_replaced_by_official_bar(live_engine):
+    history = make_bars(pd.bdate_range('2024-01-01', periods=20))
+    runner = live_engine.ensure_runner('510300.SH', history)
+    last_date = runner.last_date
+    today = last_date + pd.offsets.BDay(1)
+
+    # 临时K线推送给策略，但不计入last_date
+    signals = runner.step(make_bars([today], close=11.0), provisional_date=today)
+    assert [signal['price'] for signal in signals] == [11.0]
+    assert runner.last_date == last_date
+    assert runner.provisional_date == today
+
+    # 同一天的临时K线不重复推送
+    assert runner.step(make_bars([today], close=11.5), provisional_date=today) == []
+
+    # 正式日线不能推送到已推送临时K线的引擎，需重建
+    official = make_bars([today], close=12.0)
+    with pytest.raises(RuntimeError):
+        runner.step(official)
+
+    rebuilt = live_engine.rebuild_runner('510300.SH', pd.concat([history, official]))
+    assert not runner.alive
+    assert live_engine.runners['510300.SH'] is rebuilt
+    assert rebuilt.last_date == today
+    assert rebuilt.provisional_date is None
+
+    next_day = today + pd.offsets.BDay(1)
+    signals = rebuilt.step(make_bars([today, next_day], close=13.0))
+    assert [signal['date'] for signal in signals] == [next_day.date()]
+    assert rebuilt.last_date == next_day
@@ -0,0 +1,39 @@
+import pytest
+
+
+@pytest.fixture
+def dispatcher(tmp_path, monkeypatch):
+    # 导入时setup_logger会在当前目录创建logs/
+    monkeypatch.chdir(tmp_path)
+    from src.utils.notification import NotificationDispatcher
+    return NotificationDispatcher(coalesce_window=0.0, max_retries=0, max_message_length=60)
+
+
+def test_chunks_measure_utf8_bytes_including_header(dispatcher):
+    # 每条9个字符、25字节，按字符计数可以合并多条，加上标题行后按字节计算每批只能放一条
+    batch = [(0.0, "通知内容测试第%d条" % i) for i in range(5)]
+    chunks = list(dispatcher._chunks(batch))
+    for chunk, messages in chunks:
+        assert len(messages) == 1
+        assert dispatcher._size(messages[0]) <= dispatcher.max_message_length
+    assert [item for chunk, _ in chunks for item in chunk] == batch
+
+
+def test_oversized_message_is_split(dispatcher):
+    message = "超长通知" * 20 + "end"
+    batch = [(0.0, "短通知"), (1.0, message), (2.0, "短通知")]
+    chunks = list(dispatcher._chunks(batch))
+    assert [chunk for chunk, _ in chunks] == [[batch[0]], [batch[1]], [batch[2]]]
+    parts = chunks[1][1]
+    assert len(parts) > 1
+    assert "".join(parts) == message
+    assert all(dispatcher._size(part) <= dispatcher.max_message_length for part in parts)
+
+
+def test_dispatch_counts_split_message_once(dispatcher, monkeypatch):
+    sent = []
+    monkeypatch.setattr(dispatcher, "_send", lambda message: sent.append(message) or True)
+    dispatcher._dispatch([(0.0, "超长通知" * 20)])
+    assert len(sent) > 1
+    assert dispatcher._stats['sent'] == 1
+    assert dispatcher._stats['batches'] == 1
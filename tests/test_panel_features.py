@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.strategies.rl_model_finrl.meta.preprocessor.panel_features import PanelFeatureEngineer
+
+from conftest import make_etf_frame
+
+
+def _by_ticker(df, columns):
+    """按(tic, 日期)排列指定列，便于逐只ETF比较"""
+    return df.set_index('tic', append=True)[columns].swaplevel().sort_index()
+
+
+def _assert_frames_close(actual, expected, columns):
+    for column in columns:
+        a, b = actual[column].to_numpy(), expected[column].to_numpy()
+        np.testing.assert_array_equal(np.isnan(a), np.isnan(b), err_msg=column)
+        np.testing.assert_allclose(a[~np.isnan(a)], b[~np.isnan(b)], rtol=1e-7, atol=1e-7, err_msg=column)
+
+
+@pytest.fixture
+def staggered_frame():
+    """上市日期不同、中间有缺失交易日的多只ETF"""
+    frame = make_etf_frame(num_tickers=4, num_days=160, seed=1)
+    rng = np.random.default_rng(1)
+    listed = frame.groupby('tic').cumcount() >= frame['tic'].map({t: 10 * i for i, t in enumerate(frame['tic'].unique())})
+    keep = listed.to_numpy() & (rng.random(len(frame)) > 0.02)
+    return frame[keep]
+
+
+def test_feature_engineer_multi_ticker_matches_single_ticker(staggered_frame):
+    """多只ETF的长表与逐只ETF分别调用FeatureEngineer（TA-Lib分支）结果一致"""
+    pytest.importorskip('talib')
+    from src.strategies.rl_model_finrl.meta.preprocessor.feature_engineer import FeatureEngineer
+
+    engineer = FeatureEngineer()
+    panel = engineer.add_technical_indicators(staggered_frame)
+    single = pd.concat([engineer.add_technical_indicators(group) for _, group in staggered_frame.groupby('tic')])
+
+    columns = FeatureEngineer.PANEL_INDICATORS
+    _assert_frames_close(_by_ticker(panel, columns), _by_ticker(single, columns), columns)
+
+
+def test_data_processor_definitions_match_single_ticker_formulas(staggered_frame):
+    """pandas定义与DataProcessor对单只ETF的计算方式一致"""
+    columns = ['macd', 'macd_signal', 'rsi', 'cci', 'bollinger_upper', 'atr']
+    panel = PanelFeatureEngineer(columns, use_turbulence=False, definitions='pandas').compute(staggered_frame)
+
+    expected = []
+    for _, group in staggered_frame.groupby('tic'):
+        close, high, low = group['close'], group['high'], group['low']
+        out = group.copy()
+        macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+        out['macd'] = macd
+        out['macd_signal'] = macd.ewm(span=9, adjust=False).mean()
+        delta = close.diff()
+        out['rsi'] = 100 - 100 / (1 + delta.clip(lower=0).rolling(14).mean() / (-delta).clip(lower=0).rolling(14).mean())
+        tp = (high + low + close) / 3
+        mean_dev = tp.rolling(20).apply(lambda x: np.abs(x - x.mean()).mean(), raw=True)
+        out['cci'] = (tp - tp.rolling(20).mean()) / (0.015 * mean_dev)
+        out['bollinger_upper'] = close.rolling(20).mean() + 2 * close.rolling(20).std()
+        tr = pd.concat([high - low, (high - close.shift()).abs(), (low - close.shift()).abs()], axis=1).max(axis=1)
+        out['atr'] = tr.rolling(14).mean()
+        expected.append(out)
+
+    _assert_frames_close(_by_ticker(panel, columns), _by_ticker(pd.concat(expected), columns), columns)
+
+
+def test_build_market_data_layout(etf_frame):
+    indicators = ['macd', 'rsi_30', 'close_30_sma']
+    market_data = PanelFeatureEngineer(indicators).build_market_data(etf_frame)
+
+    num_days = etf_frame.index.nunique()
+    num_tickers = etf_frame['tic'].nunique()
+    assert market_data['feature_columns'] == ['open', 'high', 'low', 'close'] + indicators
+    assert market_data['market_tensor'].shape == (num_days, num_tickers, 4 + len(indicators))
+    assert market_data['market_tensor'].dtype == np.float32
+    assert not np.isnan(market_data['market_tensor']).any()
+    assert list(market_data['tickers']) == list(pd.unique(etf_frame['tic']))
+    assert market_data['turbulence_series'].shape == (num_days,)
@@ -0,0 +1,75 @@
+import importlib
+
+import numpy as np
+import pytest
+
+from src.strategies.rl_model_finrl.applications.stock_trading.batched_env import BatchedETFTradingEnv
+
+
+@pytest.fixture
+def ppo_module(tmp_path, monkeypatch):
+    # 配置模块导入时在当前目录创建数据和模型目录，训练结束时也会保存模型
+    monkeypatch.chdir(tmp_path)
+    return importlib.import_module('src.strategies.rl_model_finrl.agents.elegantrl.ppo_agent')
+
+
+def test_train_on_multi_etf_batched_env(ppo_module, etf_env, tmp_path):
+    """离散策略在stock_dim大于1的批量环境上采集和更新若干轮"""
+    assert etf_env.stock_dim > 1
+    env = BatchedETFTradingEnv(etf_env, num_envs=4, episode_length=30, seed=0)
+    agent = ppo_module.PPOAgent(
+        env=env,
+        model_name='test_ppo',
+        batch_size=16,
+        n_steps=16,
+        n_epochs=2,
+        device='cpu',
+        tensorboard_log=str(tmp_path / 'runs'),
+    )
+    assert agent.action_dim == etf_env.stock_dim
+
+    agent.train(total_timesteps=3 * 16 * env.num_envs, eval_freq=2 * 16 * env.num_envs,
+                n_eval_episodes=2, log_interval=16 * env.num_envs)
+
+    assert (tmp_path / 'models' / 'test_ppo.pt').exists()
+    actions = agent.collector.policy_step(env.reset())[0]
+    assert actions.shape == (env.num_envs,)
+    assert np.all((actions >= 0) & (actions < agent.action_dim))
+
+
+def reference_gae(rewards, values, dones, last_values, gamma, gae_lambda):
+    """逐步反向递推的GAE"""
+    advantages = np.zeros_like(rewards)
+    next_advantage = np.zeros(rewards.shape[1])
+    next_values = last_values
+    for t in reversed(range(len(rewards))):
+        not_done = 1.0 - dones[t]
+        delta = rewards[t] + gamma * next_values * not_done - values[t]
+        next_advantage = delta + gamma * gae_lambda * not_done * next_advantage
+        advantages[t] = next_advantage
+        next_values = values[t]
+    return advantages, advantages + values
+
+
+@pytest.mark.parametrize('n_steps', [1, 2, 7, 16, 33])
+def test_compute_advantages_matches_reversed_loop(ppo_module, n_steps):
+    rng = np.random.default_rng(n_steps)
+    num_envs, gamma, gae_lambda = 3, 0.99, 0.95
+    memory = ppo_module.PPOMemory(n_steps, state_dim=4, num_envs=num_envs)
+    for _ in range(n_steps):
+        memory.store(
+            state=rng.normal(size=(num_envs, 4)),
+            action=rng.integers(0, 3, num_envs),
+            probs=rng.normal(size=num_envs),
+            vals=rng.normal(size=num_envs),
+            reward=rng.normal(size=num_envs),
+            done=rng.random(num_envs) < 0.2,
+        )
+    last_values = rng.normal(size=num_envs)
+    memory.compute_advantages(last_values, gamma, gae_lambda)
+
+    expected_advantages, expected_returns = reference_gae(
+        memory.rewards.astype(np.float64), memory.vals.astype(np.float64),
+        memory.dones.astype(np.float64), last_values, gamma, gae_lambda)
+    np.testing.assert_allclose(memory.advantages, expected_advantages, rtol=1e-5, atol=1e-5)
+    np.testing.assert_allclose(memory.returns, expected_returns, rtol=1e-5, atol=1e-5)
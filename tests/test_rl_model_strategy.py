@@ -0,0 +1,126 @@
+import backtrader as bt
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+
+from src.strategies.rl_model_finrl.agents.elegantrl.ppo_agent import ActorNetwork
+from src.strategies.rl_model_strategy import RLModelStrategy
+
+
+def save_checkpoint(path, state_dim, action_dim):
+    actor = ActorNetwork(state_dim, action_dim, 16)
+    torch.save({'actor_state_dict': actor.state_dict(),
+                'model_info': {'state_dim': state_dim, 'action_dim': action_dim}}, path)
+    return str(path)
+
+
+def random_walk_frame(num_days=80, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2024-01-01', periods=num_days)
+    close = 10 * np.exp(np.cumsum(rng.normal(0, 0.01, num_days)))
+    return pd.DataFrame({
+        'open': close * (1 + rng.normal(0, 0.003, num_days)),
+        'high': close * (1 + rng.random(num_days) * 0.01),
+        'low': close * (1 - rng.random(num_days) * 0.01),
+        'close': close,
+        'volume': rng.integers(100000, 1000000, num_days).astype(float),
+    }, index=index)
+
+
+def reference_state(strategy):
+    """逐个偏移量计算的状态（环形缓冲区实现之前的写法）"""
+    data, window_size = strategy.data, strategy.p.window_size
+    price_data = np.array([
+        [data.open[i], data.high[i], data.low[i], data.close[i], data.volume[i]]
+        for i in range(-window_size + 1, 1)
+    ]).flatten()
+    features = []
+    for i in range(-window_size + 1, 1):
+        features.extend([
+            np.mean([data.close[j] for j in range(i - 4, i + 1)]),
+            np.mean([data.close[j] for j in range(i - 9, i + 1)]),
+            np.mean([data.close[j] for j in range(i - 19, i + 1)]),
+            data.close[i] / data.close[i - 5] - 1,
+            np.std([data.close[j] for j in range(i - 4, i + 1)]),
+            np.mean([data.volume[j] for j in range(i - 4, i + 1)]),
+        ])
+    portfolio_value = strategy.broker.getvalue()
+    position_value = strategy.position.size * data.close[0] if strategy.position else 0
+    position_pct = position_value / portfolio_value if portfolio_value > 0 else 0
+    cash_pct = strategy.broker.getcash() / portfolio_value
+    return np.concatenate([price_data, features, [cash_pct, position_pct]]).astype(np.float32)
+
+
+class RecordingStrategy(RLModelStrategy):
+    """记录每根K线的状态、参照状态和推理网络的输出"""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.outputs = []
+        traced = self.agent
+
+        def agent(state_tensor):
+            output = traced(state_tensor)
+            self.outputs.append((len(self.data), output.numpy()[0].copy()))
+            return output
+
+        self.agent = agent
+
+    def next(self):
+        self._update_window()
+        state = self._get_state()
+        if state is not None:
+            self.records.append((len(self.data), state.copy(), reference_state(self)))
+        super().next()
+
+
+def run_strategy(model_path, window_size=10, strategy_class=RLModelStrategy, frame=None):
+    if frame is None:
+        index = pd.bdate_range('2024-01-01', periods=40)
+        close = np.linspace(10, 12, len(index))
+        frame = pd.DataFrame({'open': close, 'high': close, 'low': close, 'close': close,
+                              'volume': np.full(len(index), 1e5)}, index=index)
+    cerebro = bt.Cerebro(stdstats=False)
+    cerebro.adddata(bt.feeds.PandasData(dataname=frame))
+    cerebro.addstrategy(strategy_class, model_path=model_path, window_size=window_size)
+    return cerebro.run()[0]
+
+
+def test_load_agent_matching_checkpoint(tmp_path):
+    strategy = run_strategy(save_checkpoint(tmp_path / 'actor.pt', 10 * 11 + 2, 3))
+    assert strategy.state_dim == 112
+
+
+@pytest.mark.parametrize('window_size', [5, 10])
+def test_ring_buffer_state_matches_per_offset_formula(tmp_path, window_size):
+    state_dim = window_size * 11 + 2
+    path = save_checkpoint(tmp_path / 'actor.pt', state_dim, 3)
+    strategy = run_strategy(path, window_size=window_size, strategy_class=RecordingStrategy,
+                            frame=random_walk_frame())
+
+    # 第一个完整状态出现在第window_size + 19根K线（ma20需要20根K线）
+    assert strategy.records[0][0] == window_size + RLModelStrategy.FEATURE_LOOKBACK - 1
+    for _, state, expected in strategy.records:
+        np.testing.assert_allclose(state, expected, rtol=1e-6, atol=1e-6)
+
+    # 动作由追踪的推理网络给出，与原始actor网络在参照状态上的输出一致
+    assert strategy.outputs
+    actor = ActorNetwork(state_dim, 3, 16)
+    actor.load_state_dict(torch.load(path)['actor_state_dict'])
+    actor.eval()
+    expected = {bar: state for bar, _, state in strategy.records}
+    bars = [bar for bar, _ in strategy.outputs]
+    with torch.no_grad():
+        expected_outputs = actor(torch.from_numpy(np.stack([expected[bar] for bar in bars]))).numpy()
+    outputs = np.stack([output for _, output in strategy.outputs])
+    np.testing.assert_allclose(outputs, expected_outputs, rtol=1e-5, atol=1e-6)
+    assert set(outputs.argmax(axis=1)) <= {0, 1, 2}
+
+
+def test_load_agent_rejects_multi_etf_checkpoint(tmp_path):
+    # ETFTradingEnv训练的模型：状态维度和动作维度都按ETF数量展开
+    path = save_checkpoint(tmp_path / 'etf_actor.pt', 3 * 20 + 6, 3 * 5)
+    with pytest.raises(ValueError, match='状态维度'):
+        run_strategy(path)
@@ -0,0 +1,86 @@
+import os
+import pickle
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+from multiprocessing import shared_memory
+
+from src.strategies.rl_model_finrl.applications.stock_trading.shared_env import (
+    ENV_PARAMS,
+    SharedEnvFactory,
+    SharedMarketData,
+)
+
+
+def test_shared_market_data_round_trip(etf_env):
+    """在当前进程中挂载共享内存并创建环境，不需要子进程"""
+    expected = etf_env.get_market_data()
+    shared_data = SharedMarketData(expected)
+    block_names = [meta[0] for meta in shared_data.spec['arrays'].values() if meta is not None]
+    try:
+        market_data, blocks = SharedMarketData.attach(shared_data.spec)
+        for name in SharedMarketData.ARRAYS:
+            if expected[name] is None:
+                assert market_data[name] is None
+                continue
+            assert not market_data[name].flags.writeable
+            np.testing.assert_array_equal(market_data[name], expected[name])
+        del market_data
+        for block in blocks:
+            block.close()
+
+        env_kwargs = {name: getattr(etf_env, name) for name in ENV_PARAMS}
+        env = SharedEnvFactory(type(etf_env), shared_data.spec, env_kwargs, seed=0)()
+        np.testing.assert_allclose(env.reset(), etf_env.reset(), rtol=1e-6)
+        rng = np.random.default_rng(0)
+        for _ in range(10):
+            actions = rng.uniform(-1, 1, etf_env.stock_dim)
+            obs, reward, _, _ = env.step(actions)
+            expected_obs, expected_reward, _, _ = etf_env.step(actions)
+            np.testing.assert_allclose(obs, expected_obs, rtol=1e-6)
+            assert reward == pytest.approx(expected_reward, rel=1e-6)
+        blocks = env.shared_blocks
+        del env
+        for block in blocks:
+            block.close()
+    finally:
+        shared_data.close()
+
+    assert shared_data.nbytes == 0
+    for block_name in block_names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=block_name)
+
+
+# 在独立的Python进程中挂载共享内存后退出，模拟Ray rollout worker
+ATTACH_SCRIPT = """
+import pickle, sys
+sys.path.insert(0, sys.argv[1])
+import conftest
+from src.strategies.rl_model_finrl.applications.stock_trading.shared_env import SharedMarketData
+spec = pickle.loads(bytes.fromhex(sys.argv[2]))
+market_data, blocks = SharedMarketData.attach(spec, track=False)
+assert market_data['close_matrix'].shape == tuple(spec['arrays']['close_matrix'][1])
+del market_data
+for block in blocks:
+    block.close()
+"""
+
+
+def test_untracked_attach_survives_independent_process_exit(etf_env):
+    with SharedMarketData(etf_env.get_market_data()) as shared_data:
+        tests_dir = os.path.dirname(os.path.abspath(__file__))
+        result = subprocess.run(
+            [sys.executable, '-c', ATTACH_SCRIPT, tests_dir, pickle.dumps(shared_data.spec).hex()],
+            capture_output=True, text=True, timeout=120,
+        )
+        assert result.returncode == 0, result.stderr
+        assert 'leaked shared_memory' not in result.stderr
+        # 独立进程退出后共享内存仍可挂载，重启的worker可以继续使用
+        market_data, blocks = SharedMarketData.attach(shared_data.spec)
+        np.testing.assert_array_equal(market_data['close_matrix'], etf_env.get_market_data()['close_matrix'])
+        del market_data
+        for block in blocks:
+            block.close()
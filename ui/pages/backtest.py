@@ -3,6 +3,8 @@ import pandas as pd
 from src.strategies.strategy_factory import StrategyFactory
 from src.data.data_loader import DataLoader
 from src.data.future_data_loader import FutureDataLoader
+from src.data.index_constituents import IndexConstituentStore
+from src.strategies.market_sentiment.dividend_store import DividendStore
 from src.utils.backtest_engine import BacktestEngine
 from src.utils.logger import setup_logger
 import os
@@ -29,30 +31,29 @@ def screen_index_stocks(params, index_code, index_name):
             ts.set_token(params['tushare_token'])
             pro = ts.pro_api()
             
-            # 获取成分股列表
-            today = datetime.now().strftime('%Y%m%d')
-            csi_index = pro.index_weight(index_code=index_code, trade_date=today)
-            if csi_index.empty:
-                # 如果当天数据不可用，尝试获取最近的数据
-                dates = pro.trade_cal(exchange='', start_date=(datetime.now() - timedelta(days=30)).strftime('%Y%m%d'), 
-                                    end_date=today, is_open='1')
-                for date in sorted(dates['cal_date'].tolist(), reverse=True):
-                    csi_index = pro.index_weight(index_code=index_code, trade_date=date)
-                    if not csi_index.empty:
-                        break
+            # 获取截至今天最新的成分股列表（本地缓存，新调整月份在后台更新）
+            constituent_store = IndexConstituentStore.shared(pro=pro)
+            csi_index = constituent_store.get_weights(index_code)
             
             if csi_index.empty:
                 st.error(f"未获取到{index_name}成分股列表")
                 return
                 
             # 获取成分股的基本信息
-            stocks = pro.stock_basic(exchange='', list_status='L')
+            stocks = constituent_store.stock_basic()
             csi_index_stocks = stocks[stocks['ts_code'].isin(csi_index['con_code'])]
             
             if csi_index_stocks.empty:
                 st.error(f"未获取到{index_name}成分股信息")
                 return
                 
+            # 策略需要处理分红时，先并发批量获取所有成分股的分红数据，逐只回测时直接读取分红存储
+            screen_strategy = StrategyFactory.get_strategy(params['strategy_name'])
+            if screen_strategy and hasattr(screen_strategy.params, 'handle_dividend'):
+                with st.spinner("正在批量获取成分股分红数据..."):
+                    DividendStore.shared().prefetch(csi_index_stocks['ts_code'].tolist(),
+                                                    params['start_date'], params['end_date'])
+            
             # 创建进度条
             progress_bar = st.progress(0)
             status_text = st.empty()
@@ -4,6 +4,8 @@ import os
 from datetime import datetime, timedelta
 from src.utils.logger import setup_logger
 from src.trading.market_executor import MarketExecutor
+from src.trading.trade_journal import TradeJournal
+from src.data.index_constituents import IndexConstituentStore
 import threading
 import tushare as ts
 
@@ -21,17 +23,8 @@ def start_trading(params):
         ts.set_token(params['tushare_token'])
         pro = ts.pro_api()
             
-        # 获取上证50成分股
-        today = datetime.now().strftime('%Y%m%d')
-        sz50 = pro.index_weight(index_code='000016.SH', trade_date=today)
-        if sz50.empty:
-            # 如果当天数据不可用，尝试获取最近的数据
-            dates = pro.trade_cal(exchange='', start_date=(datetime.now() - timedelta(days=30)).strftime('%Y%m%d'), 
-                                end_date=today, is_open='1')
-            for date in sorted(dates['cal_date'].tolist(), reverse=True):
-                sz50 = pro.index_weight(index_code='000016.SH', trade_date=date)
-                if not sz50.empty:
-                    break
+        # 获取截至今天最新的上证50成分股（本地缓存，新调整月份在后台更新）
+        sz50 = IndexConstituentStore.shared(pro=pro).get_weights('000016.SH')
         
         if sz50.empty:
             st.error("未获取到上证50成分股列表")
@@ -93,19 +86,14 @@ def render_market(params):
     status = "运行中" if st.session_state.is_trading else "已停止"
     st.info(f"实盘交易状态: {status}")
     
-    # 获取最新的交易记录文件
-    record_files = [f for f in os.listdir(records_dir) if f.endswith('.csv')]
-    if not record_files:
-        st.info("暂无交易记录")
-        return
-        
-    latest_file = max(record_files, key=lambda x: os.path.getctime(os.path.join(records_dir, x)))
-    
-    # 读取并显示交易记录
+    # 读取最近一个交易日的交易记录
     try:
-        df = pd.read_csv(os.path.join(records_dir, latest_file))
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df = df.sort_values('timestamp', ascending=False)
+        journal = TradeJournal.shared(os.path.join(records_dir, "trades.db"))
+        latest_date = journal.latest_trade_date()
+        if latest_date is None:
+            st.info("暂无交易记录")
+            return
+        df = journal.query(trade_date=latest_date)
         
         # 显示交易统计
         col1, col2, col3 = st.columns(3)